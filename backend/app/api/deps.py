@@ -2,27 +2,45 @@
 
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
+from app.core.config import get_settings
+from app.core.rate_limit import RateLimitExceeded, rate_limiter
 from app.core.security import decode_access_token
-from app.db import get_db
+from app.db import get_session_factory
 from app.models.user import User, UserRole
-from app.services.auth_service import get_user_by_id
-
+from app.services.auth_service import (
+    Principal,
+    cache_principal,
+    get_user_by_id,
+    principal_cache,
+)
+
+settings = get_settings()
 security = HTTPBearer(auto_error=False)
 
 
+async def _load_user(session_factory: sessionmaker, user_id: int) -> Optional[User]:
+    """Look up a user on a session that is released as soon as the query returns."""
+    async with session_factory() as db:
+        return await get_user_by_id(db, user_id)
+
+
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> Optional[User]:
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> Optional[Principal]:
     """Get the current user from JWT token (optional - returns None if not authenticated)."""
     if not credentials:
         return None
 
     token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
+
     payload = decode_access_token(token)
     if not payload:
         return None
@@ -31,16 +49,22 @@ async def get_current_user_optional(
     if not user_id:
         return None
 
-    user = await get_user_by_id(db, int(user_id))
-    return user
+    user = await _load_user(session_factory, int(user_id))
+    if not user:
+        return None
+    return cache_principal(token, payload, user)
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+    session_factory: sessionmaker = Depends(get_session_factory),
+) -> Principal:
     """Get the current user from JWT token (required)."""
     token = credentials.credentials
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
+
     payload = decode_access_token(token)
     if not payload:
         raise HTTPException(
@@ -56,19 +80,19 @@ async def get_current_user(
             detail="Invalid token payload",
         )
 
-    user = await get_user_by_id(db, int(user_id))
+    user = await _load_user(session_factory, int(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
 
-    return user
+    return cache_principal(token, payload, user)
 
 
 async def get_current_admin(
-    user: User = Depends(get_current_user),
-) -> User:
+    user: Principal = Depends(get_current_user),
+) -> Principal:
     """Require the current user to be an admin."""
     if user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -76,3 +100,42 @@ async def get_current_admin(
             detail="Admin access required",
         )
     return user
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    Best-effort client address, honouring X-Forwarded-For when trusted.
+
+    Callers can send any X-Forwarded-For they like, so only the entries
+    appended by our own ``RATE_LIMIT_TRUSTED_HOPS`` proxies are believed.
+    """
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        hops = [
+            hop.strip()
+            for header in request.headers.getlist("x-forwarded-for")
+            for hop in header.split(",")
+        ]
+        if 0 < settings.RATE_LIMIT_TRUSTED_HOPS <= len(hops):
+            return hops[-settings.RATE_LIMIT_TRUSTED_HOPS]
+    return request.client.host if request.client else None
+
+
+def rate_limit(route: str):
+    """Dependency factory enforcing the rate-limit budgets configured for ``route``."""
+
+    async def check_rate_limit(
+        request: Request,
+        user: Optional[Principal] = Depends(get_current_user_optional),
+    ) -> None:
+        try:
+            await rate_limiter.check(
+                route, client_ip(request), user.id if user else None
+            )
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please slow down.",
+                headers={"Retry-After": str(int(e.retry_after))},
+            )
+
+    return check_rate_limit
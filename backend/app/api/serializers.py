@@ -0,0 +1,80 @@
+"""Row-to-JSON serializers for the fast response path.
+
+Routes turn ORM rows into plain dicts exactly once and encode them straight to
+bytes, instead of building pydantic models that FastAPI then re-validates
+against ``response_model``. The dicts have the same shape as the schemas, so
+setting ``FAST_JSON_RESPONSES=false`` falls back to regular validation.
+"""
+
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import get_settings
+from app.core.serialization import json_dumps
+from app.models.answer import Answer
+from app.models.question import Question
+
+settings = get_settings()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+def respond(content: Any, status_code: int = 200) -> Any:
+    """Return pre-built content, bypassing ``response_model`` validation if enabled."""
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(content, status_code=status_code)
+    return content
+
+
+def question_to_dict(question: Question, answers_count: int = 0) -> dict:
+    """Serialize a question row in the shape of ``QuestionOut``."""
+    return {
+        "id": question.id,
+        "user_id": question.user_id,
+        "guest_name": question.guest_name,
+        "message": question.message,
+        "status": question.status,
+        "created_at": question.created_at,
+        "updated_at": question.updated_at,
+        "escalated_at": question.escalated_at,
+        "answered_at": question.answered_at,
+        "answers_count": answers_count,
+    }
+
+
+def answer_to_dict(answer: Answer, replies: Optional[list[dict]] = None) -> dict:
+    """Serialize an answer row in the shape of ``AnswerOut``."""
+    return {
+        "id": answer.id,
+        "question_id": answer.question_id,
+        "user_id": answer.user_id,
+        "parent_id": answer.parent_id,
+        "guest_name": answer.guest_name,
+        "message": answer.message,
+        "created_at": answer.created_at,
+        "upvotes": answer.upvotes,
+        "downvotes": answer.downvotes,
+        "score": answer.upvotes - answer.downvotes,
+        "replies": replies if replies is not None else [],
+    }
+
+
+def build_answer_tree(
+    answers: list[Answer], parent_id: Optional[int] = None
+) -> list[dict]:
+    """Build nested answer tree from flat list in a single pass."""
+    nodes = {answer.id: answer_to_dict(answer) for answer in answers}
+    roots = []
+    for answer in answers:
+        node = nodes[answer.id]
+        if answer.parent_id == parent_id:
+            roots.append(node)
+        elif answer.parent_id in nodes:
+            nodes[answer.parent_id]["replies"].append(node)
+    return roots
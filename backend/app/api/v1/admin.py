@@ -5,8 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_admin
 from app.db import get_db
-from app.models.user import User
-from app.services import get_question_stats
+from app.services import Principal, get_question_stats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -14,7 +13,7 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 @router.get("/stats")
 async def get_stats(
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     """Get question statistics for admin dashboard."""
     stats = await get_question_stats(db)
@@ -6,54 +6,42 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user_optional, get_current_admin
+from app.api.deps import get_current_user_optional, get_current_admin, rate_limit
+from app.api.serializers import answer_to_dict, respond
 from app.db import get_db
-from app.models.user import User
 from app.models.answer import Answer
 from app.schemas.answer import AnswerCreate, AnswerOut, RatingRequest, RatingResponse
-from app.services import create_answer, get_question_by_id
+from app.services import (
+    Principal,
+    create_answer,
+    mark_suggestion_stale,
+    question_exists,
+    refresh_indexed_question,
+)
 from app.websocket import manager
 
 router = APIRouter(prefix="/questions/{question_id}/answers", tags=["answers"])
 
 
-def build_answer_tree(answers: list[Answer], parent_id: int | None = None) -> list[dict]:
-    """Build nested answer tree from flat list."""
-    result = []
-    for answer in answers:
-        if answer.parent_id == parent_id:
-            answer_dict = {
-                "id": answer.id,
-                "question_id": answer.question_id,
-                "user_id": answer.user_id,
-                "parent_id": answer.parent_id,
-                "guest_name": answer.guest_name,
-                "message": answer.message,
-                "created_at": answer.created_at,
-                "upvotes": answer.upvotes,
-                "downvotes": answer.downvotes,
-                "score": answer.upvotes - answer.downvotes,
-                "replies": build_answer_tree(answers, answer.id),
-            }
-            result.append(answer_dict)
-    return result
-
-
-@router.post("", response_model=AnswerOut, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=AnswerOut,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("answer_create"))],
+)
 async def create_new_answer(
     question_id: int,
     answer_data: AnswerCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
 ):
     """
     Create a new answer for a question.
     Can be created by guests (no auth) or logged-in users.
     Supports threading via parent_id.
     """
-    # Check if question exists
-    question = await get_question_by_id(db, question_id)
-    if not question:
+    # Check if question exists (without loading its answers)
+    if not await question_exists(db, question_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Question not found",
@@ -69,13 +57,12 @@ async def create_new_answer(
     # If parent_id is provided, verify the parent answer exists
     if answer_data.parent_id:
         result = await db.execute(
-            select(Answer).where(
+            select(Answer.id).where(
                 Answer.id == answer_data.parent_id,
                 Answer.question_id == question_id
             )
         )
-        parent_answer = result.scalar_one_or_none()
-        if not parent_answer:
+        if result.scalar_one_or_none() is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Parent answer not found",
@@ -83,25 +70,16 @@ async def create_new_answer(
 
     user_id = current_user.id if current_user else None
     answer = await create_answer(db, question_id, answer_data, user_id)
+    if answer.parent_id is None:
+        await refresh_indexed_question(db, question_id)
+    await db.close()
 
-    answer_out = AnswerOut(
-        id=answer.id,
-        question_id=answer.question_id,
-        user_id=answer.user_id,
-        parent_id=answer.parent_id,
-        guest_name=answer.guest_name,
-        message=answer.message,
-        created_at=answer.created_at,
-        upvotes=answer.upvotes,
-        downvotes=answer.downvotes,
-        score=answer.upvotes - answer.downvotes,
-        replies=[],
-    )
+    answer_out = answer_to_dict(answer)
 
     # Broadcast to WebSocket clients
-    await manager.broadcast("new_answer", answer_out.model_dump(mode="json"))
+    await manager.broadcast("new_answer", answer_out)
 
-    return answer_out
+    return respond(answer_out, status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/{answer_id}/rate", response_model=RatingResponse)
@@ -110,7 +88,7 @@ async def rate_answer(
     answer_id: int,
     rating: RatingRequest,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     """
     Rate an answer (upvote or downvote).
@@ -181,8 +159,11 @@ async def rate_answer(
         else:
             answer.downvotes += 1
 
+    await mark_suggestion_stale(db, question_id)
     await db.commit()
     await db.refresh(answer)
+    await refresh_indexed_question(db, question_id)
+    await db.close()
 
     # Broadcast rating update
     await manager.broadcast(
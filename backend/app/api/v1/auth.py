@@ -4,6 +4,7 @@ from pydantic import BaseModel, EmailStr
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import rate_limit
 from app.core.security import create_access_token
 from app.db import get_db
 from app.schemas.user import Token, UserCreate, UserLogin, UserOut
@@ -40,7 +41,11 @@ class OTPResponse(BaseModel):
     message: str
 
 
-@router.post("/send-otp", response_model=OTPResponse)
+@router.post(
+    "/send-otp",
+    response_model=OTPResponse,
+    dependencies=[Depends(rate_limit("otp_send"))],
+)
 async def request_otp(request: OTPRequest):
     """Send OTP to email for registration verification."""
     success = await send_otp(request.email)
@@ -59,7 +64,7 @@ async def request_otp(request: OTPRequest):
 @router.post("/verify-otp", response_model=OTPResponse)
 async def verify_email_otp(request: OTPVerify):
     """Verify OTP for email verification."""
-    success, message = verify_otp(request.email, request.otp)
+    success, message = await verify_otp(request.email, request.otp)
     if success:
         return OTPResponse(success=True, message=message)
     else:
@@ -76,7 +81,7 @@ async def register(
 ):
     """Register a new admin user. Requires OTP verification first."""
     # Check if email has been verified with OTP
-    if not is_email_verified(user_data.email):
+    if not await is_email_verified(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email not verified. Please verify your email with OTP first."
@@ -101,7 +106,7 @@ async def register(
     user = await create_user(db, user_data)
 
     # Clear OTP data after successful registration
-    clear_otp(user_data.email)
+    await clear_otp(user_data.email)
 
     return user
 
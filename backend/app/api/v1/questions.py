@@ -2,31 +2,41 @@
 
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_admin, get_current_user_optional
+from app.api.deps import get_current_admin, get_current_user_optional, rate_limit
+from app.api.serializers import build_answer_tree, question_to_dict, respond
+from app.core.concurrency import CapacityExceeded
+from app.core.config import get_settings
 from app.db import get_db
 from app.models.question import QuestionStatus
-from app.models.user import User
 from app.schemas.question import (
     QuestionCreate,
+    QuestionCreateOut,
     QuestionOut,
     QuestionUpdateStatus,
     QuestionWithAnswers,
+    TypeaheadOut,
 )
 from app.services import (
+    Principal,
+    answer_context,
     create_question,
-    get_all_admin_emails,
+    find_duplicates,
+    get_or_generate_suggestion,
     get_question_by_id,
     get_questions,
-    get_suggested_answer,
-    notify_question_answered,
-    notify_question_escalated,
+    get_stored_suggestion,
+    retrieve_similar,
+    save_suggestion,
+    search_questions,
+    suggestion_fingerprint,
     update_question_status,
 )
 from app.websocket import manager
 
+settings = get_settings()
 router = APIRouter(prefix="/questions", tags=["questions"])
 
 
@@ -42,27 +52,26 @@ async def list_questions(
     Ordered by: ESCALATED first, then by created_at (newest first).
     """
     questions = await get_questions(db, limit=limit, offset=offset, status=status)
+    await db.close()
 
-    # Add answers count to response
-    result = []
-    for q in questions:
-        question_out = QuestionOut.model_validate(q)
-        question_out.answers_count = len(q.answers)
-        result.append(question_out)
+    return respond([question_to_dict(q, count) for q, count in questions])
 
-    return result
 
-
-@router.post("", response_model=QuestionOut, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "",
+    response_model=QuestionCreateOut,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("question_create"))],
+)
 async def create_new_question(
     question_data: QuestionCreate,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[Principal] = Depends(get_current_user_optional),
 ):
     """
     Create a new question.
     Can be created by guests (no auth) or logged-in users.
+    Likely duplicates of existing questions are returned in ``possible_duplicates``.
     """
     # Non-blank validation (also in schema, but double-check)
     if not question_data.message.strip():
@@ -72,14 +81,22 @@ async def create_new_question(
         )
 
     user_id = current_user.id if current_user else None
-    question = await create_question(db, question_data, user_id)
+    duplicates = await find_duplicates(db, question_data.message)
+    duplicate_of = None
+    if duplicates and settings.DUPLICATE_AUTO_LINK:
+        duplicate_of = duplicates[0]
+    question = await create_question(
+        db, question_data, user_id, duplicate_of=duplicate_of
+    )
+    # Everything below is DB-free; hand the connection back to the pool
+    await db.close()
 
     # Broadcast to WebSocket clients
-    question_out = QuestionOut.model_validate(question)
-    question_out.answers_count = 0
-    await manager.broadcast("new_question", question_out.model_dump(mode="json"))
+    question_out = question_to_dict(question, 0)
+    await manager.broadcast("new_question", question_out)
 
-    # If question was marked as urgent/escalated on creation, send email to admins
+    # If question was marked as urgent/escalated on creation, alert connected admins
+    # (the escalation email/webhook was queued in the outbox with the question)
     if question_data.is_escalated:
         # Broadcast urgent notification to all connected clients (for admin popup)
         await manager.broadcast(
@@ -88,22 +105,48 @@ async def create_new_question(
                 "question_id": question.id,
                 "guest_name": question.guest_name or "Anonymous",
                 "message": question.message[:100] + ("..." if len(question.message) > 100 else ""),
-                "created_at": question_out.created_at.isoformat(),
+                "created_at": question.created_at.isoformat(),
             }
         )
 
-        # Send email notification in background
-        admin_emails = await get_all_admin_emails(db)
-        background_tasks.add_task(
-            notify_question_escalated,
-            question_id=question.id,
-            question_message=question.message,
-            guest_name=question.guest_name or "Anonymous",
-            escalated_at=question_out.escalated_at.isoformat() if question_out.escalated_at else question_out.created_at.isoformat(),
-            admin_emails=admin_emails,
-        )
+    return respond(
+        {
+            **question_out,
+            "possible_duplicates": [
+                {
+                    "id": d.question_id,
+                    "message": d.message,
+                    "status": d.status,
+                    "similarity": round(d.similarity, 3),
+                }
+                for d in duplicates
+            ],
+            "duplicate_of": duplicate_of.question_id if duplicate_of else None,
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
+
 
-    return question_out
+@router.get(
+    "/typeahead",
+    response_model=list[TypeaheadOut],
+    dependencies=[Depends(rate_limit("typeahead"))],
+)
+async def typeahead(
+    q: str = Query("", max_length=200),
+    limit: Optional[int] = Query(None, ge=1, le=20),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Existing questions matching a partly typed question.
+    Cheap enough to call on every (debounced) keystroke.
+    """
+    matches = await search_questions(db, q, limit)
+    await db.close()
+
+    return respond([
+        {"id": m.question_id, "message": m.message, "status": m.status} for m in matches
+    ])
 
 
 @router.get("/{question_id}", response_model=QuestionWithAnswers)
@@ -119,109 +162,69 @@ async def get_question(
             detail="Question not found",
         )
 
-    # Build nested answer tree from flat list
-    def build_answer_tree(answers, parent_id=None):
-        result = []
-        for answer in answers:
-            if answer.parent_id == parent_id:
-                answer_dict = {
-                    "id": answer.id,
-                    "question_id": answer.question_id,
-                    "user_id": answer.user_id,
-                    "parent_id": answer.parent_id,
-                    "guest_name": answer.guest_name,
-                    "message": answer.message,
-                    "created_at": answer.created_at,
-                    "upvotes": answer.upvotes,
-                    "downvotes": answer.downvotes,
-                    "score": answer.upvotes - answer.downvotes,
-                    "replies": build_answer_tree(answers, answer.id),
-                }
-                result.append(answer_dict)
-        return result
+    await db.close()
 
     # Build the response with nested answers
-    nested_answers = build_answer_tree(question.answers)
-
-    return {
-        "id": question.id,
-        "user_id": question.user_id,
-        "guest_name": question.guest_name,
-        "message": question.message,
-        "status": question.status,
-        "created_at": question.created_at,
-        "updated_at": question.updated_at,
-        "escalated_at": question.escalated_at,
-        "answered_at": question.answered_at,
-        "answers_count": len(question.answers),
-        "answers": nested_answers,
-    }
+    question_out = question_to_dict(question, len(question.answers))
+    question_out["answers"] = build_answer_tree(question.answers)
+    return respond(question_out)
 
 
 @router.patch("/{question_id}/status", response_model=QuestionOut)
 async def change_question_status(
     question_id: int,
     status_update: QuestionUpdateStatus,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
     """Update question status (admin only)."""
-    question = await update_question_status(db, question_id, status_update.status)
-    if not question:
+    updated = await update_question_status(db, question_id, status_update.status)
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Question not found",
         )
 
-    question_out = QuestionOut.model_validate(question)
-    question_out.answers_count = len(question.answers)
+    await db.close()
+
+    question, answers_count = updated
+    question_out = question_to_dict(question, answers_count)
 
     # Broadcast status change
     await manager.broadcast(
         "status_change",
         {
             "question_id": question_id,
-            "status": question_out.status.value,
-            "escalated_at": question_out.escalated_at.isoformat() if question_out.escalated_at else None,
-            "answered_at": question_out.answered_at.isoformat() if question_out.answered_at else None,
+            "status": question.status.value,
+            "escalated_at": (
+                question.escalated_at.isoformat() if question.escalated_at else None
+            ),
+            "answered_at": (
+                question.answered_at.isoformat() if question.answered_at else None
+            ),
         },
     )
 
-    # If marked as answered, send notifications in background
-    if status_update.status == QuestionStatus.ANSWERED:
-        admin_emails = await get_all_admin_emails(db)
-        background_tasks.add_task(
-            notify_question_answered,
-            question_id=question_id,
-            question_message=question.message,
-            answered_at=question_out.answered_at.isoformat() if question_out.answered_at else "",
-            answers_count=len(question.answers),
-            admin_emails=admin_emails,
-        )
-
-    # If escalated, send escalation notifications in background
-    if status_update.status == QuestionStatus.ESCALATED:
-        admin_emails = await get_all_admin_emails(db)
-        background_tasks.add_task(
-            notify_question_escalated,
-            question_id=question_id,
-            question_message=question.message,
-            guest_name=question.guest_name or "Admin",
-            escalated_at=question_out.escalated_at.isoformat() if question_out.escalated_at else "",
-            admin_emails=admin_emails,
-        )
-
-    return question_out
+    # Notifications were written to the outbox with the status change
+    return respond(question_out)
 
 
-@router.post("/{question_id}/suggest")
+@router.post("/{question_id}/suggest", dependencies=[Depends(rate_limit("suggest"))])
 async def suggest_answer(
     question_id: int,
+    stream: bool = False,
     db: AsyncSession = Depends(get_db),
-    admin: User = Depends(get_current_admin),
+    admin: Principal = Depends(get_current_admin),
 ):
-    """Get RAG-powered answer suggestion (admin only)."""
+    """
+    Get RAG-powered answer suggestion (admin only).
+
+    With ``stream=true`` the text is also sent as ``suggestion_chunk`` events
+    to WebSocket clients subscribed to the question: incrementally when this
+    request runs the generation, otherwise (stored, cached or shared with a
+    concurrent request) as one chunk holding the whole text. The
+    ``suggestion`` broadcast still carries the full text.
+    """
     question = await get_question_by_id(db, question_id)
     if not question:
         raise HTTPException(
@@ -229,19 +232,61 @@ async def suggest_answer(
             detail="Question not found",
         )
 
-    # Get previous answers for context
-    previous_answers = [a.message for a in question.answers]
-
-    suggestion = await get_suggested_answer(
-        question_message=question.message,
-        previous_answers=previous_answers,
+    # Get previous answers and similar resolved questions for context
+    previous_answers = answer_context(question.answers)
+    examples = await retrieve_similar(
+        db, question.message, exclude_question_id=question_id
     )
+    fingerprint = suggestion_fingerprint(question.message, question.answers)
+    stored = await get_stored_suggestion(db, question_id)
+    # Don't hold a pooled connection for the duration of the LLM call
+    await db.close()
+
+    chunks_sent = 0
+
+    async def send_chunk(delta: str) -> None:
+        nonlocal chunks_sent
+        await manager.send_to_question(
+            question_id,
+            "suggestion_chunk",
+            {"question_id": question_id, "index": chunks_sent, "delta": delta},
+        )
+        chunks_sent += 1
+
+    if stored is not None and stored.fingerprint == fingerprint:
+        if stream:
+            await send_chunk(stored.suggested_answer)
+        await manager.broadcast(
+            "suggestion",
+            {"question_id": question_id, "suggested_answer": stored.suggested_answer},
+        )
+        return {"question_id": question_id, "suggested_answer": stored.suggested_answer}
+
+    try:
+        suggestion = await get_or_generate_suggestion(
+            fingerprint,
+            question_message=question.message,
+            previous_answers=previous_answers,
+            examples=examples,
+            on_chunk=send_chunk if stream else None,
+        )
+    except CapacityExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many suggestions in progress. Please try again shortly.",
+            headers={"Retry-After": "5"},
+        )
 
     if not suggestion:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="RAG service unavailable. Please check GROQ_API_KEY configuration.",
         )
+    if stream and not chunks_sent:
+        # Cached or generated by a concurrent request, so nothing was streamed
+        await send_chunk(suggestion)
+
+    await save_suggestion(db, question_id, fingerprint, suggestion, "on_demand")
 
     # Broadcast suggestion to WebSocket
     await manager.broadcast(
@@ -0,0 +1,58 @@
+"""Helpers for sharing and bounding expensive async work."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one execution.
+
+    The first caller starts the work as a task; callers arriving while it runs
+    await the same task and receive its result (or exception). A caller that
+    is cancelled stops waiting without cancelling the shared work.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class CapacityExceeded(Exception):
+    """Raised when a limiter's wait queue is full."""
+
+
+class ConcurrencyLimiter:
+    """Run at most ``limit`` calls at once with at most ``max_waiting`` queued."""
+
+    def __init__(self, limit: int, max_waiting: int):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            raise CapacityExceeded(f"{self.waiting} calls already waiting")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.active -= 1
+        self._semaphore.release()
@@ -1,7 +1,7 @@
 """Application configuration loaded from environment variables."""
 
 from functools import lru_cache
-from typing import List
+from typing import Any, Dict, List
 
 from pydantic_settings import BaseSettings
 
@@ -17,6 +17,18 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Password hashing (bcrypt runs on a bounded worker pool off the event loop)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+
+    # Authenticated-principal cache (decoded token -> user id/role)
+    PRINCIPAL_CACHE_SIZE: int = 4096
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # Admin notification recipients; the TTL bounds how long other processes
+    # (web workers, the outbox worker) miss user changes made elsewhere
+    ADMIN_RECIPIENTS_TTL_SECONDS: int = 60
+
     # CORS - use "*" to allow all origins, or comma-separated list
     ALLOWED_ORIGINS: str = "*"
 
@@ -27,21 +39,158 @@ class Settings(BaseSettings):
             return ["*"]
         return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
 
+    # Rate limiting: token buckets per route and scope ("global", "ip", "user").
+    # Budgets are "<count>/<second|minute|hour|day>" or "<count>/<seconds>".
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" or "redis" (shared across workers)
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # use X-Forwarded-For behind a proxy
+    # Proxies in front of the app that append to X-Forwarded-For; the client is
+    # the entry this many hops from the right (earlier ones are caller-supplied)
+    RATE_LIMIT_TRUSTED_HOPS: int = 1
+    RATE_LIMITS: Dict[str, Dict[str, str]] = {
+        "question_create": {
+            "ip": "10/minute",
+            "user": "30/minute",
+            "global": "600/minute",
+        },
+        "answer_create": {
+            "ip": "20/minute",
+            "user": "60/minute",
+            "global": "1200/minute",
+        },
+        "otp_send": {"ip": "5/hour", "global": "100/minute"},
+        "suggest": {"user": "10/minute", "global": "60/minute"},
+        "typeahead": {"ip": "300/minute"},
+    }
+
+    # Response compression (brotli is used when the "brotli" package is installed)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_CONTENT_TYPES: str = (
+        "application/json,text/plain,text/html,text/css,"
+        "application/javascript,text/event-stream"
+    )
+
+    @property
+    def compression_content_types_list(self) -> List[str]:
+        """Parse COMPRESSION_CONTENT_TYPES as a list."""
+        return [
+            ct.strip() for ct in self.COMPRESSION_CONTENT_TYPES.split(",") if ct.strip()
+        ]
+
+    # Serve pre-built JSON straight from rows, skipping response_model validation
+    FAST_JSON_RESPONSES: bool = True
+
+    # Prometheus-format metrics at /metrics and the request timing middleware
+    METRICS_ENABLED: bool = True
+    # Per-request query accounting: X-DB-Queries/X-DB-Time-Ms headers and log thresholds
+    DB_QUERY_DEBUG_HEADERS: bool = False
+    DB_N_PLUS_ONE_THRESHOLD: int = 5  # same statement this often in one request
+    DB_QUERY_WARN_THRESHOLD: int = 20
+
+    # Near-duplicate question detection (estimated Jaccard of character shingles)
+    DUPLICATE_DETECTION_ENABLED: bool = True
+    DUPLICATE_MIN_SIMILARITY: float = 0.5
+    DUPLICATE_MAX_RESULTS: int = 3
+    DUPLICATE_AUTO_LINK: bool = False  # record a link to the closest match
+
+    # Search-as-you-type: "auto" uses pg_trgm on Postgres, else the in-memory index
+    TYPEAHEAD_BACKEND: str = "auto"
+    TYPEAHEAD_MIN_CHARS: int = 2
+    TYPEAHEAD_MAX_RESULTS: int = 8
+
     # Groq API
     GROQ_API_KEY: str = ""
 
+    # LLM provider for suggestions: "groq", or "stub" for offline use/benchmarks
+    LLM_PROVIDER: str = "groq"
+    LLM_MODEL: str = "openai/gpt-oss-20b"
+    LLM_TEMPERATURE: float = 0.7
+    LLM_MAX_TOKENS: int = 500
+    LLM_WARMUP: bool = False  # build the client during startup
+    LLM_STUB_LATENCY_MS: int = 0
+
+    # Retrieval over answered questions for suggestions
+    RAG_EMBEDDING_DIM: int = 1024
+    RAG_TOP_K: int = 3
+    RAG_MIN_SIMILARITY: float = 0.1
+    RAG_INDEX_ANSWERS: int = 2  # top-rated answers embedded with each question
+    # Directory for the memory-mapped index shared by all workers ("" = in-memory)
+    RAG_INDEX_DIR: str = ""
+    # Rows scored per step; each step reads rows * dim * 4 bytes
+    RAG_SEARCH_BLOCK_ROWS: int = 8192
+    RAG_INDEX_COMPACT_RATIO: float = 0.25
+    RAG_INDEX_COMPACT_INTERVAL_SECONDS: int = 3600
+
+    # Suggestions are reused while the question and its context are unchanged
+    SUGGESTION_CACHE_SIZE: int = 1024
+    SUGGESTION_CACHE_TTL_SECONDS: int = 3600
+    # Prompt context is ranked, deduplicated and packed into this many tokens
+    SUGGESTION_CONTEXT_TOKEN_BUDGET: int = 800
+    SUGGESTION_CONTEXT_ITEM_TOKENS: int = 200
+    # Concurrent LLM calls per process, and how many may wait before we shed load
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_MAX_QUEUE: int = 32
+
+    # Background suggestions for open questions; runs wherever the outbox
+    # worker runs (see OUTBOX_WORKER_MODE). Set it on web processes too, which
+    # flag stored suggestions stale when answers or votes change.
+    SUGGESTION_PRECOMPUTE_ENABLED: bool = False
+    SUGGESTION_PRECOMPUTE_CONCURRENCY: int = 2
+    SUGGESTION_PRECOMPUTE_BATCH_SIZE: int = 20
+    SUGGESTION_PRECOMPUTE_INTERVAL_SECONDS: float = 15.0
+    SUGGESTION_PRECOMPUTE_TOKENS_PER_HOUR: int = 200000
+
     # SMTP Email (fallback if Resend not configured)
     SMTP_HOST: str = "smtp.gmail.com"
     SMTP_PORT: int = 587
     SMTP_USER: str = ""
     SMTP_PASSWORD: str = ""
     EMAIL_FROM: str = "noreply@querysync.ai"
+    SMTP_START_TLS: bool = True
+    # Authenticated connections kept open between notifications
+    SMTP_POOL_SIZE: int = 2
+    SMTP_MAX_IDLE_SECONDS: float = 60.0
 
     # Resend Email API (preferred for cloud deployments)
     RESEND_API_KEY: str = ""
 
-    # Webhook
+    # OTP store: "memory" (single worker) or "database" (shared across workers)
+    OTP_STORE: str = "memory"
+    OTP_MAX_ATTEMPTS: int = 5
+    OTP_MAX_ENTRIES: int = 10000
+    OTP_VERIFIED_TTL_MINUTES: int = 30
+    OTP_SWEEP_INTERVAL_SECONDS: int = 60
+
+    # Notification outbox. "inprocess" runs the delivery worker inside the web
+    # app; "external" expects a separate `python -m app.worker` process.
+    OUTBOX_WORKER_MODE: str = "inprocess"
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 2.0
+    OUTBOX_LEASE_SECONDS: float = 120.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE_SECONDS: float = 5.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 600.0
+    OUTBOX_CHANNEL_CONCURRENCY: Dict[str, int] = {"webhook": 10, "email": 2}
+
+    # Email digests: events are grouped per recipient for this many seconds
+    # (0 sends every event immediately). Escalations can skip the digest.
+    NOTIFICATION_DIGEST_WINDOW_SECONDS: float = 60.0
+    NOTIFICATION_DIGEST_EXEMPT_ESCALATIONS: bool = True
+
+    # Webhooks. WEBHOOK_URL receives every event; WEBHOOK_SUBSCRIBERS adds more
+    # endpoints as JSON, e.g. [{"url": "...", "events": ["question_escalated"],
+    # "max_concurrency": 4}].
     WEBHOOK_URL: str = ""
+    WEBHOOK_SUBSCRIBERS: List[Dict[str, Any]] = []
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    WEBHOOK_MAX_CONNECTIONS: int = 100
+    WEBHOOK_HTTP2: bool = False
+    WEBHOOK_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    WEBHOOK_CIRCUIT_RESET_SECONDS: float = 30.0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,255 @@
+"""Request and database instrumentation feeding the metrics registry."""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries",
+    "Database queries run per HTTP request.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+HTTP_REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds",
+    "Time spent in database queries per HTTP request.",
+    ("route",),
+)
+DB_QUERIES = registry.counter("db_queries_total", "Database statements executed.")
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds",
+    "Database statement latency.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|%s|:\w+|\b\d+(?:\.\d+)?\b")
+_CAST_RE = re.compile(r"::\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_fingerprint(statement: str) -> str:
+    """
+    Normalise a SQL statement so executions of the same query compare equal.
+
+    Literals and bind placeholders of any paramstyle become ``?`` (casts
+    dropped), IN lists collapse to ``(...)`` and whitespace is squeezed.
+    """
+    normalized = _CAST_RE.sub("", _SPACE_RE.sub(" ", statement).strip())
+    normalized = _LITERAL_RE.sub("?", normalized)
+    return _IN_LIST_RE.sub("(...)", normalized)
+
+
+@dataclass
+class RequestStats:
+    """Database work done on behalf of one request (or one recorded block)."""
+
+    queries: int = 0
+    db_seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_seconds += elapsed
+        self.statements[statement_fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Fingerprints run at least ``threshold`` times, most frequent first."""
+        return [(fp, n) for fp, n in self.statements.most_common() if n >= threshold]
+
+    def summary(self) -> str:
+        return "\n".join(f"  {n}x {fp}" for fp, n in self.statements.most_common())
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+_recorders: list[RequestStats] = []
+
+
+@contextmanager
+def record_queries() -> Iterator[RequestStats]:
+    """Collect every statement run on instrumented engines inside the block."""
+    stats = RequestStats()
+    _recorders.append(stats)
+    try:
+        yield stats
+    finally:
+        _recorders.remove(stats)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for recorder in _recorders:
+        recorder.record(statement, elapsed)
+
+
+def _handle_error(context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    # so the stack on this pooled connection stays paired with its statements
+    connection = context.connection
+    if connection is not None and not connection.invalidated:
+        started = connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run on ``engine`` (pass ``AsyncEngine.sync_engine``)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def register_pool_metrics(engine: Engine) -> None:
+    """Expose connection pool usage (pools without counters, e.g. StaticPool, don't)."""
+
+    def read(method: str):
+        # Look the pool up on each scrape; dispose() replaces it
+        return lambda: (
+            getattr(engine.pool, method)() if hasattr(engine.pool, method) else None
+        )
+
+    registry.gauge(
+        "db_pool_size", "Connections the pool keeps open.", callback=read("size")
+    )
+    registry.gauge(
+        "db_pool_checked_out", "Connections in use.", callback=read("checkedout")
+    )
+    registry.gauge(
+        "db_pool_checked_in",
+        "Idle connections in the pool.",
+        callback=read("checkedin"),
+    )
+    registry.gauge(
+        "db_pool_overflow",
+        "Connections open beyond the pool size.",
+        callback=read("overflow"),
+    )
+
+
+def route_template(scope: Scope) -> str:
+    """
+    The matched route's path template, e.g. ``/api/v1/questions/{question_id}``.
+
+    Included routers may leave only the innermost route in the scope, whose
+    path lacks the router prefixes; those are taken from the request path.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope.get("path", "")
+    depth = template.count("/")
+    if depth and path.count("/") > depth:
+        return path.rsplit("/", depth)[0] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Record latency and database usage of each HTTP request.
+
+    Requests are labelled by route template (``/api/v1/questions/{question_id}``)
+    so the number of series stays bounded; unmatched paths share one label.
+    With ``debug_headers`` the query count and time so far are sent as
+    ``X-DB-Queries`` / ``X-DB-Time-Ms``. A statement repeated
+    ``n_plus_one_threshold`` times in one request is logged as a likely N+1,
+    and requests over ``query_warn_threshold`` queries are logged with their
+    statement breakdown.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        debug_headers: bool = False,
+        n_plus_one_threshold: int = 5,
+        query_warn_threshold: int = 20,
+    ):
+        self.app = app
+        self.debug_headers = debug_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.query_warn_threshold = query_warn_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.debug_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Queries"] = str(stats.queries)
+                    headers["X-DB-Time-Ms"] = f"{stats.db_seconds * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_stats.reset(token)
+            route_path = route_template(scope)
+            HTTP_REQUEST_SECONDS.observe(
+                elapsed, method=scope["method"], route=route_path, status=status_code
+            )
+            HTTP_REQUEST_DB_QUERIES.observe(stats.queries, route=route_path)
+            HTTP_REQUEST_DB_SECONDS.observe(stats.db_seconds, route=route_path)
+            self._log(scope["method"], route_path, stats, elapsed)
+
+    def _log(
+        self, method: str, route: str, stats: RequestStats, elapsed: float
+    ) -> None:
+        for fingerprint, count in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                f"Possible N+1 in {method} {route}: {count}x {fingerprint[:300]}"
+            )
+        if stats.queries > self.query_warn_threshold:
+            logger.warning(
+                f"{method} {route} ran {stats.queries} queries "
+                f"({stats.db_seconds * 1000:.1f}ms):\n{stats.summary()}"
+            )
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"{method} {route}: {stats.queries} queries, "
+                f"{stats.db_seconds * 1000:.1f}ms DB, {elapsed * 1000:.1f}ms total"
+            )
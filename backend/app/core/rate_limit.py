@@ -0,0 +1,193 @@
+"""Token-bucket rate limiting with pluggable backends."""
+
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True)
+class Rate:
+    """Bucket capacity and the period over which it fully refills."""
+
+    capacity: int
+    period: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(spec: str) -> Rate:
+    """Parse ``"20/minute"`` or ``"20/60"`` (seconds) into a Rate."""
+    count, _, period = spec.strip().partition("/")
+    period = period.strip().lower().rstrip("s") or "second"
+    seconds = _PERIODS.get(period)
+    if seconds is None:
+        seconds = float(period)
+    return Rate(capacity=int(count), period=float(seconds))
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a bucket has no tokens left."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class RateLimitBackend(ABC):
+    """Storage for token buckets."""
+
+    @abstractmethod
+    async def acquire(self, key: str, rate: Rate, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0 if allowed, else seconds until allowed."""
+
+    async def reset(self) -> None:
+        """Forget all buckets."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Process-local buckets, LRU-bounded to ``max_keys``."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def acquire(self, key: str, rate: Rate, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (float(rate.capacity), now))
+        tokens = min(
+            float(rate.capacity), tokens + (now - updated) * rate.refill_per_second
+        )
+
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / rate.refill_per_second
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def reset(self) -> None:
+        self._buckets.clear()
+
+
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local refill = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill)
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  retry = (cost - tokens) / refill
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill) + 1)
+return tostring(retry)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by all workers, updated atomically with a Lua script."""
+
+    def __init__(self, url: str, prefix: str = "querysync:ratelimit:"):
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, key: str, rate: Rate, cost: float = 1.0) -> float:
+        retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[rate.capacity, rate.refill_per_second, time.time(), cost],
+        )
+        return float(retry_after)
+
+
+class RateLimiter:
+    """Apply per-IP, per-user and global budgets configured per route."""
+
+    # Narrowest first: a request rejected by its own bucket must not spend the
+    # shared global budget, or one throttled client would lock out everyone
+    SCOPES = ("user", "ip", "global")
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        rules: dict[str, dict[str, str]],
+        enabled: bool = True,
+    ):
+        self.backend = backend
+        self.enabled = enabled
+        self.rules = {
+            route: {scope: parse_rate(spec) for scope, spec in scopes.items()}
+            for route, scopes in rules.items()
+        }
+
+    async def check(
+        self, route: str, ip: Optional[str], user_id: Optional[int]
+    ) -> None:
+        """Consume one token from each applicable bucket or raise RateLimitExceeded."""
+        if not self.enabled:
+            return
+
+        rates = self.rules.get(route)
+        if not rates:
+            return
+
+        identities = {"global": "*", "ip": ip, "user": user_id}
+        for scope in self.SCOPES:
+            rate = rates.get(scope)
+            identity = identities[scope]
+            if rate is None or identity is None:
+                continue
+            try:
+                retry_after = await self.backend.acquire(
+                    f"{route}:{scope}:{identity}", rate
+                )
+            except Exception as e:
+                # A broken shared backend must not take the API down with it
+                logger.error(f"Rate limit backend error: {e}")
+                return
+            if retry_after > 0:
+                raise RateLimitExceeded(scope, math.ceil(retry_after))
+
+    async def reset(self) -> None:
+        await self.backend.reset()
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter configured by the ``RATE_LIMIT_*`` settings."""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        backend: RateLimitBackend = RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    else:
+        backend = InMemoryRateLimitBackend()
+    return RateLimiter(
+        backend, settings.RATE_LIMITS, enabled=settings.RATE_LIMIT_ENABLED
+    )
+
+
+rate_limiter = create_rate_limiter()
@@ -1,12 +1,18 @@
 """Security utilities for JWT and password hashing."""
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 import bcrypt
 from jose import JWTError, jwt
 
 from app.core.config import get_settings
+from app.core.metrics import registry
 
 settings = get_settings()
 
@@ -23,11 +29,116 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     # Encode to bytes and truncate to 72 bytes (bcrypt limit)
     password_bytes = password.encode('utf-8')[:72]
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a bcrypt hash was produced with a different cost factor."""
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.BCRYPT_ROUNDS
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class HashPoolStats:
+    """Counters for the password hashing pool."""
+
+    completed: int = 0
+    queued: int = 0
+    running: int = 0
+    queue_seconds_total: float = 0.0
+    queue_seconds_max: float = 0.0
+    run_seconds_total: float = 0.0
+
+
+class PasswordHasher:
+    """
+    Run bcrypt on a bounded thread pool instead of the event loop.
+
+    bcrypt releases the GIL, so at most ``max_workers`` hashes run in parallel
+    while the loop keeps serving requests; extra work waits in the pool queue
+    and the wait is recorded in ``stats``.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.stats = HashPoolStats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        submitted = time.perf_counter()
+        with self._lock:
+            self.stats.queued += 1
+
+        def job() -> T:
+            started = time.perf_counter()
+            waited = started - submitted
+            with self._lock:
+                self.stats.queued -= 1
+                self.stats.running += 1
+                self.stats.queue_seconds_total += waited
+                self.stats.queue_seconds_max = max(self.stats.queue_seconds_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.stats.running -= 1
+                    self.stats.completed += 1
+                    self.stats.run_seconds_total += time.perf_counter() - started
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), job)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password on the worker pool."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the worker pool."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
+
+registry.gauge(
+    "password_hash_queued", "Password hashes waiting for a pool thread.",
+    callback=lambda: password_hasher.stats.queued,
+)
+registry.gauge(
+    "password_hash_running", "Password hashes running.",
+    callback=lambda: password_hasher.stats.running,
+)
+registry.gauge(
+    "password_hash_completed", "Password hashes completed since start.",
+    callback=lambda: password_hasher.stats.completed,
+)
+registry.gauge(
+    "password_hash_queue_seconds_max", "Longest wait for a pool thread since start.",
+    callback=lambda: password_hasher.stats.queue_seconds_max,
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -0,0 +1,30 @@
+"""Fast JSON encoding shared by HTTP responses and WebSocket broadcasts."""
+
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is a declared dependency
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Encode the types the stdlib encoder can't, matching pydantic's JSON mode."""
+    if isinstance(obj, datetime):
+        text = obj.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serialize plain Python data (dicts, lists, datetimes, enums) to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_UTC_Z)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
@@ -1,6 +1,19 @@
 """Database module initialization."""
 
 from app.db.base import Base
-from app.db.session import AsyncSessionLocal, engine, get_db
+from app.db.session import (
+    AsyncSessionLocal,
+    engine,
+    get_db,
+    get_session_factory,
+    refresh_unloaded,
+)
 
-__all__ = ["Base", "engine", "AsyncSessionLocal", "get_db"]
+__all__ = [
+    "Base",
+    "engine",
+    "AsyncSessionLocal",
+    "get_db",
+    "get_session_factory",
+    "refresh_unloaded",
+]
@@ -1,5 +1,6 @@
 """Database session and engine configuration."""
 
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -33,9 +34,36 @@ AsyncSessionLocal = sessionmaker(
 
 
 async def get_db() -> AsyncSession:
-    """Dependency to get database session."""
+    """
+    Dependency to get database session.
+
+    The session only checks out a pooled connection on its first query, so
+    routes that never touch the database never hold one. Routes should
+    ``await db.close()`` once their last query is done to hand the connection
+    back before slow, DB-free work such as broadcasts or LLM calls.
+    """
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
             await session.close()
+
+
+async def get_session_factory() -> sessionmaker:
+    """Dependency for code that opens its own short-lived sessions on demand."""
+    return AsyncSessionLocal
+
+
+async def refresh_unloaded(db: AsyncSession, instance) -> None:
+    """
+    Load server-generated columns that the INSERT did not return.
+
+    Backends with RETURNING (Postgres, SQLite) already fill them in, so this
+    usually costs no query, unlike a blanket ``db.refresh``.
+    """
+    state = inspect(instance)
+    unloaded = [
+        key for key in state.mapper.column_attrs.keys() if key in state.unloaded
+    ]
+    if unloaded:
+        await db.refresh(instance, unloaded)
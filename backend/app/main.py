@@ -1,14 +1,38 @@
 """FastAPI application entry point."""
 
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.v1 import router as v1_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import get_settings
-from app.db import Base, engine
+from app.core.instrumentation import (
+    MetricsMiddleware,
+    instrument_engine,
+    register_pool_metrics,
+)
+from app.core.metrics import registry
+from app.core.security import password_hasher
+from app.db import AsyncSessionLocal, Base, engine
+from app.services.duplicate_service import rebuild_duplicate_index
+from app.services.llm_provider import close_llm_provider, get_llm_provider
+from app.services.mail_transport import close_mail_transports
+from app.services.notification_service import email_digest
+from app.services.otp_service import run_otp_sweeper
+from app.services.outbox_service import create_outbox_worker
+from app.services.retrieval_service import (
+    ensure_retrieval_index,
+    flush_index_writes,
+    run_index_compactor,
+)
+from app.services.suggestion_service import create_suggestion_precomputer
+from app.services.typeahead_service import setup_typeahead
+from app.services.webhook_service import webhook_dispatcher
 from app.websocket import manager
 
 # Configure logging
@@ -29,11 +53,45 @@ async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created/verified")
+    await ensure_retrieval_index(AsyncSessionLocal)
+    await rebuild_duplicate_index(AsyncSessionLocal)
+    await setup_typeahead(engine, AsyncSessionLocal)
+    if settings.LLM_WARMUP:
+        await get_llm_provider().warmup()
+
+    background_tasks = [
+        asyncio.create_task(run_otp_sweeper(settings.OTP_SWEEP_INTERVAL_SECONDS)),
+    ]
+    if settings.RAG_INDEX_DIR:
+        background_tasks.append(
+            asyncio.create_task(
+                run_index_compactor(settings.RAG_INDEX_COMPACT_INTERVAL_SECONDS)
+            )
+        )
+    if settings.OUTBOX_WORKER_MODE == "inprocess":
+        outbox_worker = create_outbox_worker(AsyncSessionLocal)
+        background_tasks.append(asyncio.create_task(outbox_worker.run()))
+        if email_digest.enabled:
+            background_tasks.append(
+                asyncio.create_task(email_digest.run(AsyncSessionLocal))
+            )
+        if settings.SUGGESTION_PRECOMPUTE_ENABLED:
+            precomputer = create_suggestion_precomputer(AsyncSessionLocal)
+            background_tasks.append(asyncio.create_task(precomputer.run()))
 
     yield
 
     # Shutdown
     logger.info("Shutting down QuerySync AI Backend...")
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await flush_index_writes()
+    await webhook_dispatcher.close()
+    await close_mail_transports()
+    await close_llm_provider()
+    password_hasher.shutdown()
     await engine.dispose()
 
 
@@ -53,6 +111,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+        content_types=settings.compression_content_types_list,
+    )
+
+# Request latency and per-request DB usage for /metrics (outermost, so it times
+# everything)
+if settings.METRICS_ENABLED:
+    instrument_engine(engine.sync_engine)
+    register_pool_metrics(engine.sync_engine)
+    app.add_middleware(
+        MetricsMiddleware,
+        debug_headers=settings.DB_QUERY_DEBUG_HEADERS,
+        n_plus_one_threshold=settings.DB_N_PLUS_ONE_THRESHOLD,
+        query_warn_threshold=settings.DB_QUERY_WARN_THRESHOLD,
+    )
+
 # Include API routes
 app.include_router(v1_router)
 
@@ -63,6 +143,14 @@ async def health_check():
     return {"status": "healthy", "service": "querysync-backend"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Process metrics in the Prometheus text exposition format."""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates."""
@@ -71,8 +159,8 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             # Keep connection alive, listen for messages
             data = await websocket.receive_text()
-            # Could handle client messages here (e.g., subscribe to specific questions)
-            logger.debug(f"Received WebSocket message: {data}")
+            # Clients may subscribe to per-question events (e.g. suggestion chunks)
+            manager.handle_message(websocket, data)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         logger.info("WebSocket client disconnected")
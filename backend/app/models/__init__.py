@@ -1,8 +1,25 @@
 """Models module initialization."""
 
 from app.models.answer import Answer
+from app.models.otp import OTPCode
+from app.models.outbox import NotificationOutbox, OutboxStatus
 from app.models.question import Question, QuestionStatus
+from app.models.question_link import QuestionLink
+from app.models.suggestion import Suggestion, SuggestionClaim
 from app.models.user import User, UserRole
 from app.models.vote import Vote
 
-__all__ = ["User", "UserRole", "Question", "QuestionStatus", "Answer", "Vote"]
+__all__ = [
+    "User",
+    "UserRole",
+    "Question",
+    "QuestionStatus",
+    "QuestionLink",
+    "Answer",
+    "Vote",
+    "OTPCode",
+    "NotificationOutbox",
+    "OutboxStatus",
+    "Suggestion",
+    "SuggestionClaim",
+]
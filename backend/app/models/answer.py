@@ -20,7 +20,7 @@ class Answer(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     question_id: Mapped[int] = mapped_column(
-        ForeignKey("questions.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True
     )
     user_id: Mapped[Optional[int]] = mapped_column(
         ForeignKey("users.id", ondelete="SET NULL"), nullable=True
@@ -0,0 +1,19 @@
+"""OTP code model for the database-backed OTP store."""
+
+from sqlalchemy import Boolean, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class OTPCode(Base):
+    """Pending or verified email OTP, shared by all workers."""
+
+    __tablename__ = "otp_codes"
+
+    email: Mapped[str] = mapped_column(String(255), primary_key=True)
+    otp: Mapped[str] = mapped_column(String(10), nullable=False)
+    # Unix timestamp; a float keeps comparisons portable across backends
+    expires_at: Mapped[float] = mapped_column(Float, nullable=False, index=True)
+    verified: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,47 @@
+"""Notification outbox model."""
+
+from datetime import datetime
+from enum import Enum as PyEnum
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Float, Index, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class OutboxStatus(str, PyEnum):
+    """Delivery state of an outbox entry."""
+
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    # Email held for the next digest; marked SENT once the summary goes out
+    DIGESTED = "DIGESTED"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
+class NotificationOutbox(Base):
+    """A notification for one channel, written in the same transaction as its event."""
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    event: Mapped[str] = mapped_column(String(50), nullable=False)
+    channel: Mapped[str] = mapped_column(String(20), nullable=False)
+    # Channel-specific destination, e.g. the webhook URL; None = channel default
+    target: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    status: Mapped[str] = mapped_column(
+        String(20), default=OutboxStatus.PENDING.value, nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Unix timestamps; floats keep comparisons portable across backends
+    next_attempt_at: Mapped[float] = mapped_column(Float, nullable=False)
+    locked_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    __table_args__ = (Index("ix_notification_outbox_due", "status", "next_attempt_at"),)
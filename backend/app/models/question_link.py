@@ -0,0 +1,27 @@
+"""Question link model for detected duplicates."""
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class QuestionLink(Base):
+    """Marks a question as a likely duplicate of an earlier one."""
+
+    __tablename__ = "question_links"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    duplicate_of_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    # Estimated Jaccard similarity of the two messages
+    similarity: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -0,0 +1,41 @@
+"""Stored answer suggestions and pre-computation claims."""
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Suggestion(Base):
+    """Latest generated suggestion for a question and the context it was built from."""
+
+    __tablename__ = "suggestions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
+    # suggestion_fingerprint() of the prompt inputs; a mismatch means it is stale
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    suggested_answer: Mapped[str] = mapped_column(Text, nullable=False)
+    # "precomputed" by the background scheduler or "on_demand" from the route
+    source: Mapped[str] = mapped_column(String(20), nullable=False)
+    # Set when answers or votes change so the precomputer regenerates it
+    stale: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class SuggestionClaim(Base):
+    """A pre-computation worker's lease on generating a question's suggestion."""
+
+    __tablename__ = "suggestion_claims"
+
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Unix timestamp; other workers leave the question alone until then
+    claimed_until: Mapped[float] = mapped_column(Float, nullable=False)
@@ -2,10 +2,13 @@
 
 from app.schemas.answer import AnswerCreate, AnswerOut
 from app.schemas.question import (
+    DuplicateOut,
     QuestionCreate,
+    QuestionCreateOut,
     QuestionOut,
     QuestionUpdateStatus,
     QuestionWithAnswers,
+    TypeaheadOut,
 )
 from app.schemas.user import Token, TokenData, UserCreate, UserLogin, UserOut
 
@@ -16,9 +19,12 @@ __all__ = [
     "Token",
     "TokenData",
     "QuestionCreate",
+    "QuestionCreateOut",
+    "DuplicateOut",
     "QuestionOut",
     "QuestionUpdateStatus",
     "QuestionWithAnswers",
+    "TypeaheadOut",
     "AnswerCreate",
     "AnswerOut",
 ]
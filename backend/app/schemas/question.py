@@ -45,6 +45,30 @@ class QuestionOut(BaseModel):
         from_attributes = True
 
 
+class DuplicateOut(BaseModel):
+    """An existing question that looks like a re-ask of a new one."""
+
+    id: int
+    message: str
+    status: QuestionStatus
+    similarity: float
+
+
+class TypeaheadOut(BaseModel):
+    """An existing question matching what the user is typing."""
+
+    id: int
+    message: str
+    status: QuestionStatus
+
+
+class QuestionCreateOut(QuestionOut):
+    """Schema for a newly created question with its likely duplicates."""
+
+    possible_duplicates: list[DuplicateOut] = []
+    duplicate_of: Optional[int] = None
+
+
 class QuestionWithAnswers(QuestionOut):
     """Schema for question with answers list."""
 
@@ -2,6 +2,7 @@
 
 from app.services.answer_service import create_answer, get_answers_for_question
 from app.services.auth_service import (
+    Principal,
     authenticate_user,
     create_user,
     get_all_admin_emails,
@@ -9,20 +10,48 @@ from app.services.auth_service import (
     get_user_by_id,
     get_user_by_username,
 )
-from app.services.notification_service import (
-    notify_question_answered,
-    notify_question_escalated,
+from app.services.duplicate_service import (
+    DuplicateMatch,
+    duplicate_index,
+    find_duplicates,
+    rebuild_duplicate_index,
 )
 from app.services.question_service import (
     create_question,
     get_question_by_id,
     get_question_stats,
     get_questions,
+    question_exists,
     update_question_status,
 )
-from app.services.rag_service import get_suggested_answer
+from app.services.rag_service import (
+    answer_context,
+    get_or_generate_suggestion,
+    get_suggested_answer,
+    suggestion_cache,
+    suggestion_fingerprint,
+)
+from app.services.retrieval_service import (
+    RetrievedExample,
+    rebuild_retrieval_index,
+    refresh_indexed_question,
+    retrieve_similar,
+)
+from app.services.suggestion_service import (
+    create_suggestion_precomputer,
+    get_stored_suggestion,
+    mark_suggestion_stale,
+    save_suggestion,
+)
+from app.services.typeahead_service import (
+    TypeaheadMatch,
+    search_questions,
+    setup_typeahead,
+    typeahead_index,
+)
 
 __all__ = [
+    "Principal",
     "authenticate_user",
     "create_user",
     "get_all_admin_emails",
@@ -33,10 +62,29 @@ __all__ = [
     "get_question_by_id",
     "get_question_stats",
     "get_questions",
+    "question_exists",
     "update_question_status",
+    "DuplicateMatch",
+    "duplicate_index",
+    "find_duplicates",
+    "rebuild_duplicate_index",
     "create_answer",
     "get_answers_for_question",
-    "notify_question_answered",
-    "notify_question_escalated",
+    "answer_context",
+    "get_or_generate_suggestion",
     "get_suggested_answer",
+    "suggestion_cache",
+    "suggestion_fingerprint",
+    "RetrievedExample",
+    "rebuild_retrieval_index",
+    "refresh_indexed_question",
+    "retrieve_similar",
+    "create_suggestion_precomputer",
+    "get_stored_suggestion",
+    "mark_suggestion_stale",
+    "save_suggestion",
+    "TypeaheadMatch",
+    "search_questions",
+    "setup_typeahead",
+    "typeahead_index",
 ]
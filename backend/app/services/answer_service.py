@@ -5,8 +5,10 @@ from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db.session import refresh_unloaded
 from app.models.answer import Answer
 from app.schemas.answer import AnswerCreate
+from app.services.suggestion_service import mark_suggestion_stale
 
 
 async def create_answer(
@@ -26,8 +28,9 @@ async def create_answer(
         downvotes=0,
     )
     db.add(answer)
+    await mark_suggestion_stale(db, question_id)
     await db.commit()
-    await db.refresh(answer)
+    await refresh_unloaded(db, answer)
     return answer
 
 
@@ -1,14 +1,115 @@
 """Authentication service for user management."""
 
+import time
+from dataclasses import dataclass
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.security import needs_rehash, password_hasher
 from app.models.user import User, UserRole
 from app.schemas.user import UserCreate
 
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Lightweight authenticated identity resolved from a JWT."""
+
+    id: int
+    role: UserRole
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+
+# Decoded access token -> Principal. Entries never outlive their token.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def cache_principal(token: str, payload: dict, user: User) -> Principal:
+    """Cache the principal for ``token`` until the cache TTL or token expiry."""
+    principal = Principal(id=user.id, role=user.role)
+    ttl = settings.PRINCIPAL_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if exp is not None:
+        ttl = min(ttl, float(exp) - time.time())
+    principal_cache.set(token, principal, ttl=ttl)
+    return principal
+
+
+def invalidate_principals(user_id: int) -> None:
+    """Drop every cached principal belonging to ``user_id``."""
+    principal_cache.discard_where(lambda principal: principal.id == user_id)
+
+
+class AdminRecipientCache:
+    """
+    Admin notification recipients, cached in memory.
+
+    User writes in this process invalidate the list immediately; writes made
+    by other processes are picked up once the list is ``ttl`` seconds old.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.version = 0
+        self._emails: Optional[list[str]] = None
+        self._loaded_version = -1
+        self._expires_at = 0.0
+
+    def invalidate(self) -> None:
+        """Mark the cached list stale; the next ``get`` reloads it."""
+        self.version += 1
+
+    async def get(self, session_factory) -> list[str]:
+        """Return admin emails, scanning users only when the cache is stale."""
+        if (
+            self._emails is not None
+            and self._loaded_version == self.version
+            and time.monotonic() < self._expires_at
+        ):
+            return list(self._emails)
+
+        version = self.version
+        async with session_factory() as db:
+            emails = await get_all_admin_emails(db)
+
+        # A user write that raced with the load leaves the cache stale
+        if version == self.version:
+            self._emails = emails
+            self._loaded_version = version
+            self._expires_at = time.monotonic() + self.ttl
+        return list(emails)
+
+
+admin_recipients = AdminRecipientCache(ttl=settings.ADMIN_RECIPIENTS_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _on_user_created_or_deleted(mapper, connection, target: User) -> None:
+    """Keep identity and recipient caches coherent with new or removed users."""
+    invalidate_principals(target.id)
+    admin_recipients.invalidate()
+
+
+@event.listens_for(User, "after_update")
+def _on_user_updated(mapper, connection, target: User) -> None:
+    """Keep identity caches coherent; refresh recipients on role/email changes."""
+    invalidate_principals(target.id)
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("role", "email")):
+        admin_recipients.invalidate()
+
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get a user by email."""
@@ -33,7 +134,7 @@ async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
     user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await password_hasher.hash(user_data.password),
         role=UserRole.ADMIN,  # All registered users are admins
     )
     db.add(user)
@@ -49,8 +150,13 @@ async def authenticate_user(
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    if not await password_hasher.verify(password, user.password_hash):
         return None
+
+    # Transparently upgrade hashes made with an old cost factor
+    if needs_rehash(user.password_hash):
+        user.password_hash = await password_hasher.hash(password)
+        await db.commit()
     return user
 
 
@@ -0,0 +1,228 @@
+"""Near-duplicate question detection with MinHash LSH."""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.question import Question, QuestionStatus
+from app.services.retrieval_service import STOPWORDS
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_PRIME = (1 << 31) - 1
+
+
+def normalize(text: str) -> str:
+    """Lowercased words without stopwords, single-spaced."""
+    words = _WORD_RE.findall(text.lower())
+    return " ".join([w for w in words if w not in STOPWORDS] or words)
+
+
+def shingle_codes(text: str, size: int = 3) -> np.ndarray:
+    """
+    Distinct character ``size``-grams of the normalised text as integers.
+
+    Code points are packed 21 bits apiece, so the grams are built with numpy
+    instead of a Python loop over substrings.
+    """
+    normalized = normalize(text)
+    if not normalized:
+        return np.empty(0, dtype=np.uint64)
+    points = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(
+        np.uint64
+    )
+    if len(points) < size:
+        points = np.pad(points, (0, size - len(points)))
+    count = len(points) - size + 1
+    codes = np.zeros(count, dtype=np.uint64)
+    for offset, end in enumerate(range(count, count + size)):
+        codes = (codes << np.uint64(21)) | points[offset:end]
+    return np.unique(codes % np.uint64(_PRIME))
+
+
+class MinHasher:
+    """MinHash signatures from ``num_perm`` seeded multiply-shift hash functions."""
+
+    def __init__(self, num_perm: int = 60, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(
+            1, 2**64 - 1, size=num_perm, dtype=np.uint64
+        ) | np.uint64(1)
+        self._b = rng.integers(0, 2**64 - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        codes = shingle_codes(text)
+        if not len(codes):
+            return None
+        # Products wrap modulo 2**64; the high 32 bits are the hash
+        hashed = (np.outer(codes, self._a) + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+
+class DuplicateIndex:
+    """
+    MinHash LSH over character shingles.
+
+    Signatures are split into ``bands`` bands; questions sharing any whole
+    band land in the same bucket and become candidates, whose Jaccard
+    similarity is then estimated from the full signatures in one vectorised
+    comparison. With 20 bands of 3 rows, pairs at 0.5 similarity are found
+    ~93% of the time and pairs at 0.6 ~99%, while unrelated questions rarely
+    share a bucket, so lookups touch a handful of rows however large the
+    index grows.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 60, bands: int = 20):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self._band_rows = num_perm // bands
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self._row_of
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        bands = signature[: self.bands * self._band_rows].reshape(
+            self.bands, self._band_rows
+        )
+        return [band.tobytes() for band in bands]
+
+    def add_signature(self, question_id: int, signature: np.ndarray) -> None:
+        self.remove(question_id)
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = len(self._row_of)
+            if row == len(self._matrix):
+                grown = np.zeros(
+                    (max(2 * row, 1024), self.hasher.num_perm), dtype=np.uint32
+                )
+                grown[:row] = self._matrix
+                self._matrix = grown
+        self._matrix[row] = signature
+        self._row_of[question_id] = row
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, set()).add(question_id)
+
+    def add(self, question_id: int, text: str) -> None:
+        signature = self.hasher.signature(text)
+        if signature is not None:
+            self.add_signature(question_id, signature)
+
+    def remove(self, question_id: int) -> None:
+        row = self._row_of.pop(question_id, None)
+        if row is None:
+            return
+        for band, key in enumerate(self._band_keys(self._matrix[row])):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(question_id)
+                if not bucket:
+                    del self._buckets[band][key]
+        self._free.append(row)
+
+    def clear(self) -> None:
+        self._matrix = np.zeros((0, self.hasher.num_perm), dtype=np.uint32)
+        self._row_of: dict[int, int] = {}
+        self._free: list[int] = []
+        self._buckets: list[dict[bytes, set[int]]] = [{} for _ in range(self.bands)]
+
+    def find_signature(
+        self, signature: np.ndarray, limit: int = 5
+    ) -> list[tuple[int, float]]:
+        """(question_id, estimated Jaccard) pairs above the threshold, best first."""
+        candidates: set[int] = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket:
+                candidates |= bucket
+        if not candidates:
+            return []
+
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        rows = np.fromiter(
+            (self._row_of[i] for i in candidates), dtype=np.int64, count=len(ids)
+        )
+        similarity = (self._matrix[rows] == signature).mean(axis=1)
+        keep = np.flatnonzero(similarity >= self.threshold)
+        best = keep[np.lexsort((ids[keep], -similarity[keep]))][:limit]
+        return [(int(ids[i]), float(similarity[i])) for i in best]
+
+    def find(self, text: str, limit: int = 5) -> list[tuple[int, float]]:
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return []
+        return self.find_signature(signature, limit)
+
+
+duplicate_index = DuplicateIndex(settings.DUPLICATE_MIN_SIMILARITY)
+
+
+@dataclass
+class DuplicateMatch:
+    """An existing question that looks like a re-ask of a new one."""
+
+    question_id: int
+    message: str
+    status: QuestionStatus
+    similarity: float
+
+
+async def find_duplicates(db: AsyncSession, message: str) -> list[DuplicateMatch]:
+    """Existing questions whose message is a near-duplicate of ``message``."""
+    if not settings.DUPLICATE_DETECTION_ENABLED:
+        return []
+    hits = duplicate_index.find(message, settings.DUPLICATE_MAX_RESULTS)
+    if not hits:
+        return []
+
+    result = await db.execute(
+        select(Question.id, Question.message, Question.status).where(
+            Question.id.in_([question_id for question_id, _ in hits])
+        )
+    )
+    rows = {row.id: row for row in result}
+    return [
+        DuplicateMatch(
+            question_id, rows[question_id].message, rows[question_id].status, similarity
+        )
+        for question_id, similarity in hits
+        if question_id in rows
+    ]
+
+
+async def rebuild_duplicate_index(session_factory, batch_size: int = 5000) -> int:
+    """Fingerprint every question; returns the number indexed."""
+    duplicate_index.clear()
+    if not settings.DUPLICATE_DETECTION_ENABLED:
+        return 0
+    last_id = 0
+    async with session_factory() as db:
+        while True:
+            result = await db.execute(
+                select(Question.id, Question.message)
+                .where(Question.id > last_id)
+                .order_by(Question.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            for row in rows:
+                duplicate_index.add(row.id, row.message)
+            last_id = rows[-1].id
+    logger.info(f"Duplicate index built with {len(duplicate_index)} questions")
+    return len(duplicate_index)
@@ -0,0 +1,198 @@
+"""LLM providers used for answer suggestions."""
+
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You are a helpful Q&A assistant for QuerySync AI, \
+a real-time Q&A dashboard.
+Your task is to provide clear, concise, and helpful answers to user questions.
+Keep your responses professional and to the point.
+If you're unsure about something, acknowledge it rather than making things up."""
+
+HUMAN_PROMPT = """Question: {question}
+{context}
+
+Please provide a helpful answer to this question:"""
+
+
+class LLMProvider(ABC):
+    """Generates an answer for a question and its prompt context."""
+
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, question: str, context: str) -> Optional[str]:
+        """Return the generated answer, or None if the provider is unavailable."""
+
+    async def stream(self, question: str, context: str) -> AsyncIterator[str]:
+        """Yield the answer incrementally; by default as a single chunk."""
+        text = await self.generate(question, context)
+        if text:
+            yield text
+
+    async def warmup(self) -> None:
+        """Pay one-off setup costs (imports, clients) before the first request."""
+
+    async def close(self) -> None:
+        """Release clients held by the provider."""
+
+
+class GroqProvider(LLMProvider):
+    """
+    Groq through LangChain, with the client and prompt built once.
+
+    LangChain is imported on first use (or in ``warmup``) so processes that
+    never suggest don't pay for it. The provider owns the async HTTP client
+    ChatGroq uses, so connections stay alive between calls and ``close``
+    releases them.
+    """
+
+    name = "groq"
+
+    def __init__(self, api_key: str, model: str, temperature: float, max_tokens: int):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self._chain = None
+        self._http_client = None
+        self._build_lock = asyncio.Lock()
+
+    def _build_chain(self):
+        from groq import DefaultAsyncHttpxClient
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_groq import ChatGroq
+
+        self._http_client = DefaultAsyncHttpxClient()
+        llm = ChatGroq(
+            api_key=self.api_key,
+            model_name=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            http_async_client=self._http_client,
+        )
+        prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", SYSTEM_PROMPT),
+                ("human", HUMAN_PROMPT),
+            ]
+        )
+        return prompt | llm
+
+    async def _get_chain(self):
+        if self._chain is None:
+            async with self._build_lock:
+                if self._chain is None:
+                    # Importing LangChain takes seconds; keep it off the event loop
+                    self._chain = await asyncio.to_thread(self._build_chain)
+        return self._chain
+
+    async def warmup(self) -> None:
+        if self.api_key:
+            await self._get_chain()
+            logger.info(f"LLM provider '{self.name}' warmed up ({self.model})")
+
+    async def close(self) -> None:
+        # The sync client ChatGroq also builds is never called, so it holds no
+        # connections; only the async pool needs releasing
+        async with self._build_lock:
+            if self._http_client is not None:
+                await self._http_client.aclose()
+            self._http_client = None
+            self._chain = None
+
+    async def generate(self, question: str, context: str) -> Optional[str]:
+        if not self.api_key:
+            logger.warning("GROQ_API_KEY not configured, skipping RAG suggestion")
+            return None
+
+        try:
+            chain = await self._get_chain()
+        except ImportError as e:
+            logger.error(f"LangChain/Groq not properly installed: {e}")
+            return None
+
+        response = await chain.ainvoke({"question": question, "context": context})
+        return response.content.strip()
+
+    async def stream(self, question: str, context: str) -> AsyncIterator[str]:
+        if not self.api_key:
+            logger.warning("GROQ_API_KEY not configured, skipping RAG suggestion")
+            return
+
+        try:
+            chain = await self._get_chain()
+        except ImportError as e:
+            logger.error(f"LangChain/Groq not properly installed: {e}")
+            return
+
+        async for chunk in chain.astream({"question": question, "context": context}):
+            if chunk.content:
+                yield chunk.content
+
+
+class StubProvider(LLMProvider):
+    """Deterministic offline provider for development and benchmarks."""
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def _answer(self, question: str, context: str) -> str:
+        digest = hashlib.sha256(f"{question}\0{context}".encode("utf-8")).hexdigest()[
+            :8
+        ]
+        return f"[stub {digest}] Suggested answer for: {question[:200]}"
+
+    async def generate(self, question: str, context: str) -> Optional[str]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(question, context)
+
+    async def stream(self, question: str, context: str) -> AsyncIterator[str]:
+        words = self._answer(question, context).split(" ")
+        for i, word in enumerate(words):
+            if self.latency:
+                # Spread the latency over the words like a real token stream
+                await asyncio.sleep(self.latency / len(words))
+            yield word if i == len(words) - 1 else word + " "
+
+
+_provider: Optional[LLMProvider] = None
+
+
+def create_llm_provider() -> LLMProvider:
+    """Build the provider selected by ``LLM_PROVIDER``."""
+    if settings.LLM_PROVIDER == "stub":
+        return StubProvider(latency=settings.LLM_STUB_LATENCY_MS / 1000)
+    return GroqProvider(
+        api_key=settings.GROQ_API_KEY,
+        model=settings.LLM_MODEL,
+        temperature=settings.LLM_TEMPERATURE,
+        max_tokens=settings.LLM_MAX_TOKENS,
+    )
+
+
+def get_llm_provider() -> LLMProvider:
+    """The process-wide provider, created on first use."""
+    global _provider
+    if _provider is None:
+        _provider = create_llm_provider()
+    return _provider
+
+
+async def close_llm_provider() -> None:
+    """Close the provider (called from lifespan shutdown)."""
+    global _provider
+    if _provider is not None:
+        await _provider.close()
+        _provider = None
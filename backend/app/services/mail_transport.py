@@ -0,0 +1,239 @@
+"""Mail transports that never block the event loop."""
+
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email.mime.text import MIMEText
+from typing import Optional
+
+from aiosmtplib import SMTP
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmailMessage:
+    """A plain-text email to a single recipient."""
+
+    to: str
+    subject: str
+    body: str
+    sender: str = ""
+
+    def as_mime(self) -> MIMEText:
+        msg = MIMEText(self.body, "plain", "utf-8")
+        msg["From"] = self.sender
+        msg["To"] = self.to
+        msg["Subject"] = self.subject
+        return msg
+
+
+class PartialDeliveryError(Exception):
+    """Some messages of a batch were accepted before the transport failed."""
+
+    def __init__(self, sent: list[EmailMessage], cause: Exception):
+        super().__init__(f"{len(sent)} messages sent before failure: {cause}")
+        self.sent = sent
+        self.cause = cause
+
+
+class MailTransport(ABC):
+    """Delivers batches of messages."""
+
+    @abstractmethod
+    async def send(self, messages: list[EmailMessage]) -> bool:
+        """
+        Send every message; return True only if all were accepted.
+
+        Raises PartialDeliveryError listing the accepted messages when the
+        transport fails after some of them went out, so callers only retry
+        the rest.
+        """
+
+    async def close(self) -> None:
+        """Release connections held by the transport."""
+
+
+class ResendTransport(MailTransport):
+    """Resend HTTP API using batch sends, run off the event loop."""
+
+    BATCH_LIMIT = 100  # Resend accepts up to 100 emails per batch call
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def _send_batch(self, batch: list[EmailMessage]) -> None:
+        import resend
+
+        resend.api_key = self.api_key
+        resend.Batch.send(
+            [
+                {"from": m.sender, "to": m.to, "subject": m.subject, "text": m.body}
+                for m in batch
+            ]
+        )
+
+    async def send(self, messages: list[EmailMessage]) -> bool:
+        for start in range(0, len(messages), self.BATCH_LIMIT):
+            end = start + self.BATCH_LIMIT
+            batch = messages[start:end]
+            try:
+                await asyncio.to_thread(self._send_batch, batch)
+            except Exception as e:
+                if start:
+                    raise PartialDeliveryError(messages[:start], e) from e
+                raise
+        return True
+
+
+class SMTPTransport(MailTransport):
+    """
+    SMTP with a small pool of authenticated connections.
+
+    Connections stay open between notifications; idle ones older than
+    ``max_idle_seconds`` are checked with NOOP before reuse and replaced if
+    the server dropped them. A batch is spread across up to ``pool_size``
+    connections.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        start_tls: bool = True,
+        pool_size: int = 2,
+        max_idle_seconds: float = 60.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.pool_size = pool_size
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: asyncio.LifoQueue[tuple[float, SMTP]] = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(pool_size)
+        self.connections_opened = 0
+
+    async def _connect(self) -> SMTP:
+        smtp = SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=False,
+            start_tls=self.start_tls,
+        )
+        await smtp.connect()
+        if self.username and self.password:
+            await smtp.login(self.username, self.password)
+        self.connections_opened += 1
+        return smtp
+
+    async def _acquire(self) -> SMTP:
+        while not self._idle.empty():
+            idle_since, smtp = self._idle.get_nowait()
+            if not smtp.is_connected:
+                continue
+            if time.monotonic() - idle_since > self.max_idle_seconds:
+                try:
+                    await smtp.noop()
+                except Exception:
+                    smtp.close()
+                    continue
+            return smtp
+        return await self._connect()
+
+    def _release(self, smtp: SMTP) -> None:
+        if smtp.is_connected:
+            self._idle.put_nowait((time.monotonic(), smtp))
+
+    async def _send_on_connection(
+        self, messages: list[EmailMessage], sent: list[EmailMessage]
+    ) -> None:
+        async with self._slots:
+            smtp = await self._acquire()
+            try:
+                for message in messages:
+                    try:
+                        await smtp.sendmail(
+                            message.sender, message.to, message.as_mime().as_string()
+                        )
+                    except Exception:
+                        # The pooled connection may have gone stale; retry once on
+                        # a fresh one
+                        smtp.close()
+                        smtp = await self._connect()
+                        await smtp.sendmail(
+                            message.sender, message.to, message.as_mime().as_string()
+                        )
+                    sent.append(message)
+            except Exception:
+                smtp.close()
+                raise
+            self._release(smtp)
+
+    async def send(self, messages: list[EmailMessage]) -> bool:
+        if not messages:
+            return True
+        lanes = min(self.pool_size, len(messages))
+        sent: list[EmailMessage] = []
+        results = await asyncio.gather(
+            *(
+                self._send_on_connection(messages[lane::lanes], sent)
+                for lane in range(lanes)
+            ),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            if sent:
+                raise PartialDeliveryError(sent, errors[0]) from errors[0]
+            raise errors[0]
+        return True
+
+    async def close(self) -> None:
+        while not self._idle.empty():
+            _, smtp = self._idle.get_nowait()
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+
+_transports: Optional[list[MailTransport]] = None
+
+
+def get_mail_transports() -> list[MailTransport]:
+    """Configured transports in preference order (Resend, then SMTP)."""
+    global _transports
+    if _transports is None:
+        _transports = []
+        if settings.RESEND_API_KEY:
+            _transports.append(ResendTransport(settings.RESEND_API_KEY))
+        if settings.SMTP_USER and settings.SMTP_PASSWORD:
+            _transports.append(
+                SMTPTransport(
+                    settings.SMTP_HOST,
+                    settings.SMTP_PORT,
+                    settings.SMTP_USER,
+                    settings.SMTP_PASSWORD,
+                    start_tls=settings.SMTP_START_TLS,
+                    pool_size=settings.SMTP_POOL_SIZE,
+                    max_idle_seconds=settings.SMTP_MAX_IDLE_SECONDS,
+                )
+            )
+    return _transports
+
+
+async def close_mail_transports() -> None:
+    """Close pooled connections (called from lifespan shutdown)."""
+    global _transports
+    for transport in _transports or []:
+        await transport.close()
+    _transports = None
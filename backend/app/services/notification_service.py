@@ -1,50 +1,90 @@
 """Notification service for webhooks and email."""
 
+import asyncio
 import logging
+import time
+from collections import OrderedDict
+from typing import Optional
 
-import httpx
-from aiosmtplib import SMTP
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.outbox import NotificationOutbox, OutboxStatus
+from app.services.auth_service import admin_recipients
+from app.services.mail_transport import (
+    EmailMessage,
+    PartialDeliveryError,
+    get_mail_transports,
+)
+from app.services.webhook_service import webhook_dispatcher
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+NOTIFICATIONS = registry.counter(
+    "notifications_total", "Notification deliveries by outcome.", ("channel", "outcome")
+)
+NOTIFICATION_SECONDS = registry.histogram(
+    "notification_send_seconds", "Notification delivery latency.", ("channel",)
+)
 
-async def send_webhook_notification(
-    question_id: int,
-    status: str,
-    answered_at: str,
-    answers_count: int,
-) -> bool:
-    """Send webhook notification when question is answered."""
-    if not settings.WEBHOOK_URL:
-        logger.info("No WEBHOOK_URL configured, skipping webhook")
-        return False
 
-    payload = {
-        "event": "question_answered",
-        "data": {
-            "question_id": question_id,
-            "status": status,
-            "answered_at": answered_at,
-            "answers_count": answers_count,
-        },
-    }
+def email_configured() -> bool:
+    """Whether any email transport (Resend or SMTP) is configured."""
+    smtp_configured = settings.SMTP_USER and settings.SMTP_PASSWORD
+    return bool(settings.RESEND_API_KEY or smtp_configured)
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                settings.WEBHOOK_URL,
-                json=payload,
-                timeout=10.0,
+
+async def get_admin_recipients(session_factory=AsyncSessionLocal) -> list[str]:
+    """Resolve admin notification recipients from the versioned cache."""
+    if not email_configured():
+        # Nothing will be sent, so don't load recipients at all
+        return []
+    return await admin_recipients.get(session_factory)
+
+
+async def send_email(to_emails: list[str], subject: str, body: str) -> list[str]:
+    """
+    Send an email to each recipient; returns the recipients it reached.
+
+    Resend is tried first and SMTP is the fallback. A transport that fails
+    part-way hands only the unsent recipients to the next one, so nobody is
+    mailed twice.
+    """
+    transports = get_mail_transports()
+    pending = [
+        EmailMessage(
+            to=email_addr, subject=subject, body=body, sender=settings.EMAIL_FROM
+        )
+        for email_addr in to_emails
+    ]
+    reached: list[str] = []
+
+    # Resend first (works on cloud platforms like Render), SMTP as fallback
+    for transport in transports:
+        name = type(transport).__name__
+        try:
+            await transport.send(pending)
+            logger.info(f"Email sent via {name} to {len(pending)} recipients")
+            return reached + [m.to for m in pending]
+        except PartialDeliveryError as e:
+            logger.error(
+                f"Email via {name} reached {len(e.sent)} of {len(pending)} "
+                f"recipients: {e.cause}"
             )
-            response.raise_for_status()
-            logger.info(f"Webhook sent successfully to {settings.WEBHOOK_URL}")
-            return True
-    except Exception as e:
-        logger.error(f"Failed to send webhook: {e}")
-        return False
+            reached += [m.to for m in e.sent]
+            pending = [m for m in pending if m not in e.sent]
+        except Exception as e:
+            logger.error(f"Failed to send email via {name}: {e}")
+
+    if not transports:
+        logger.warning(
+            "No email service configured (set RESEND_API_KEY or SMTP credentials)"
+        )
+    return reached
 
 
 async def send_email_notification(
@@ -58,133 +98,305 @@ async def send_email_notification(
     if not to_emails:
         logger.warning("No recipient emails provided, skipping email")
         return False
+    reached = await send_email(to_emails, subject, body)
+    return len(reached) == len(to_emails)
 
-    # Try Resend API first (works on cloud platforms like Render)
-    if settings.RESEND_API_KEY:
-        try:
-            import resend
-            resend.api_key = settings.RESEND_API_KEY
-
-            for email_addr in to_emails:
-                resend.Emails.send({
-                    "from": settings.EMAIL_FROM,
-                    "to": email_addr,
-                    "subject": subject,
-                    "text": body,
-                })
-
-            logger.info(f"Email sent via Resend to {len(to_emails)} recipients")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send email via Resend: {e}")
-            # Fall through to SMTP
 
-    # Fallback to SMTP (works locally or on VPS)
-    if settings.SMTP_USER and settings.SMTP_PASSWORD:
-        try:
-            from email.mime.text import MIMEText
-
-            smtp = SMTP(
-                hostname=settings.SMTP_HOST,
-                port=settings.SMTP_PORT,
-                use_tls=False,
-                start_tls=True,
-            )
+def answered_event(
+    question_id: int,
+    question_message: str,
+    answered_at: str,
+    answers_count: int,
+) -> dict:
+    """Payload of a ``question_answered`` notification."""
+    return {
+        "question_id": question_id,
+        "question_message": question_message,
+        "answered_at": answered_at,
+        "answers_count": answers_count,
+    }
 
-            await smtp.connect()
-            await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
 
-            for email_addr in to_emails:
-                msg = MIMEText(body, 'plain', 'utf-8')
-                msg['From'] = settings.EMAIL_FROM
-                msg['To'] = email_addr
-                msg['Subject'] = subject
-                await smtp.sendmail(settings.EMAIL_FROM, email_addr, msg.as_string())
+def escalated_event(
+    question_id: int,
+    question_message: str,
+    guest_name: str,
+    escalated_at: str,
+) -> dict:
+    """Payload of a ``question_escalated`` notification."""
+    return {
+        "question_id": question_id,
+        "question_message": question_message,
+        "guest_name": guest_name,
+        "escalated_at": escalated_at,
+    }
 
-            await smtp.quit()
-            logger.info(f"Email sent via SMTP to {len(to_emails)} recipients")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send email via SMTP: {e}")
-            return False
 
-    logger.warning("No email service configured (set RESEND_API_KEY or SMTP credentials)")
-    return False
+def webhook_data(event: str, payload: dict) -> dict:
+    """Public webhook body for an event payload."""
+    if event == "question_answered":
+        return {
+            "question_id": payload["question_id"],
+            "status": "ANSWERED",
+            "answered_at": payload["answered_at"],
+            "answers_count": payload["answers_count"],
+        }
+    return {
+        "question_id": payload["question_id"],
+        "status": "ESCALATED",
+        "escalated_at": payload["escalated_at"],
+        "guest_name": payload["guest_name"],
+    }
 
 
-async def notify_question_answered(
-    question_id: int,
-    question_message: str,
-    answered_at: str,
-    answers_count: int,
-    admin_emails: list[str],
-) -> None:
-    """Send all notifications when a question is marked as answered."""
-    # Send webhook
-    await send_webhook_notification(
-        question_id=question_id,
-        status="ANSWERED",
-        answered_at=answered_at,
-        answers_count=answers_count,
-    )
+def build_email(event: str, payload: dict) -> tuple[str, str]:
+    """Subject and body of the admin email for an event payload."""
+    question_id = payload["question_id"]
+    question_message = payload["question_message"]
 
-    # Send email to admins
-    subject = f"[QuerySync] Question #{question_id} Answered"
-    body = f"""A question has been marked as answered.
+    if event == "question_answered":
+        subject = f"[QuerySync] Question #{question_id} Answered"
+        body = f"""A question has been marked as answered.
 
 Question ID: {question_id}
 Question: {question_message[:200]}{"..." if len(question_message) > 200 else ""}
-Answered at: {answered_at}
-Total answers: {answers_count}
+Answered at: {payload["answered_at"]}
+Total answers: {payload["answers_count"]}
 
 View the full question in the QuerySync dashboard.
 """
-    await send_email_notification(admin_emails, subject, body)
-
+        return subject, body
 
-async def notify_question_escalated(
-    question_id: int,
-    question_message: str,
-    guest_name: str,
-    escalated_at: str,
-    admin_emails: list[str],
-) -> None:
-    """Send email notification when a question is escalated."""
-    # Send webhook for escalation
-    if settings.WEBHOOK_URL:
-        payload = {
-            "event": "question_escalated",
-            "data": {
-                "question_id": question_id,
-                "status": "ESCALATED",
-                "escalated_at": escalated_at,
-                "guest_name": guest_name,
-            },
-        }
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    settings.WEBHOOK_URL,
-                    json=payload,
-                    timeout=10.0,
-                )
-                response.raise_for_status()
-                logger.info(f"Escalation webhook sent to {settings.WEBHOOK_URL}")
-        except Exception as e:
-            logger.error(f"Failed to send escalation webhook: {e}")
-
-    # Send email to admins
     subject = f"🚨 [QuerySync] URGENT: Question #{question_id} Escalated!"
     body = f"""⚠️ A question has been ESCALATED and requires immediate attention!
 
 Question ID: {question_id}
-Asked by: {guest_name or 'Anonymous'}
-Escalated at: {escalated_at}
+Asked by: {payload["guest_name"] or 'Anonymous'}
+Escalated at: {payload["escalated_at"]}
 
 Question:
 {question_message}
 
 Please review this question in the QuerySync dashboard as soon as possible.
 """
-    await send_email_notification(admin_emails, subject, body)
-    logger.info(f"Escalation notification sent for question #{question_id}")
+    return subject, body
+
+
+def notification_targets(event: str) -> list[tuple[str, Optional[str]]]:
+    """(channel, target) pairs that should receive ``event``."""
+    targets: list[tuple[str, Optional[str]]] = [
+        ("webhook", url) for url in webhook_dispatcher.targets(event)
+    ]
+    if email_configured():
+        targets.append(("email", None))
+    return targets
+
+
+class EmailDigest:
+    """
+    Send email events as one summary per time window.
+
+    Email entries for digested events are written to the outbox as
+    ``DIGESTED`` and left there until a flush claims them, so a crash loses
+    nothing. Within a flush only the latest event per (event, question) is
+    kept, so repeated updates for one question collapse into a single line,
+    and the entries are marked sent only once the summary has gone out.
+    """
+
+    def __init__(self, window: float, exempt_events: frozenset[str] = frozenset()):
+        self.window = window
+        self.exempt_events = exempt_events
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def accepts(self, event: str) -> bool:
+        return self.enabled and event not in self.exempt_events
+
+    async def _claim(self, db: AsyncSession) -> list[NotificationOutbox]:
+        result = await db.execute(
+            select(NotificationOutbox)
+            .where(NotificationOutbox.status == OutboxStatus.DIGESTED.value)
+            .order_by(NotificationOutbox.id)
+            .with_for_update(skip_locked=True)
+        )
+        entries = list(result.scalars().all())
+        # Claimed like outbox deliveries: if this process dies mid-send, the
+        # outbox worker reclaims the entries after their lease and sends them singly
+        now = time.time()
+        for entry in entries:
+            entry.status = OutboxStatus.PROCESSING.value
+            entry.locked_at = now
+            entry.attempts += 1
+        await db.commit()
+        return entries
+
+    async def flush(self, session_factory) -> int:
+        """Send pending events as one summary; returns the number of entries sent."""
+        async with self._lock:
+            async with session_factory() as db:
+                entries = await self._claim(db)
+                if not entries:
+                    return 0
+
+                # Only the latest update per question is sent; older ones are
+                # superseded
+                latest: OrderedDict[tuple[str, int], NotificationOutbox] = OrderedDict()
+                for entry in entries:
+                    key = (entry.event, entry.payload["question_id"])
+                    latest.pop(key, None)
+                    latest[key] = entry
+                reached = {
+                    key: set(entry.payload.get("sent_to", ()))
+                    for key, entry in latest.items()
+                }
+
+                # Admins a failed flush already reached only get what they missed, so
+                # recipients with identical outstanding events share one email
+                admin_emails = await get_admin_recipients(session_factory)
+                groups: dict[tuple, list[str]] = {}
+                for admin in admin_emails:
+                    keys = tuple(key for key in latest if admin not in reached[key])
+                    if keys:
+                        groups.setdefault(keys, []).append(admin)
+
+                for keys, recipients in groups.items():
+                    subject, body = build_digest(
+                        [(key[0], latest[key].payload) for key in keys]
+                    )
+                    started = time.perf_counter()
+                    sent = await send_email(recipients, subject, body)
+                    NOTIFICATION_SECONDS.observe(
+                        time.perf_counter() - started, channel="email_digest"
+                    )
+                    delivered = len(sent) == len(recipients)
+                    NOTIFICATIONS.inc(
+                        channel="email_digest",
+                        outcome="delivered" if delivered else "failed",
+                    )
+                    for key in keys:
+                        reached[key].update(sent)
+
+                done = 0
+                for entry in entries:
+                    sent_to = reached[(entry.event, entry.payload["question_id"])]
+                    entry.locked_at = None
+                    if sent_to.issuperset(admin_emails):
+                        entry.status = OutboxStatus.SENT.value
+                        entry.last_error = None
+                        done += 1
+                        continue
+                    entry.payload = {**entry.payload, "sent_to": sorted(sent_to)}
+                    entry.last_error = "digest delivery failed"
+                    if entry.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                        entry.status = OutboxStatus.FAILED.value
+                    else:
+                        # Keep the event for the next window rather than dropping it
+                        entry.status = OutboxStatus.DIGESTED.value
+                await db.commit()
+                return done
+
+    async def run(self, session_factory) -> None:
+        """Flush every window until cancelled."""
+        while True:
+            await asyncio.sleep(self.window)
+            try:
+                await self.flush(session_factory)
+            except Exception as e:
+                logger.error(f"Email digest flush failed: {e}")
+
+
+def create_email_digest() -> EmailDigest:
+    """Build the digest configured by the ``NOTIFICATION_DIGEST_*`` settings."""
+    exempt = (
+        frozenset({"question_escalated"})
+        if settings.NOTIFICATION_DIGEST_EXEMPT_ESCALATIONS
+        else frozenset()
+    )
+    return EmailDigest(settings.NOTIFICATION_DIGEST_WINDOW_SECONDS, exempt)
+
+
+email_digest = create_email_digest()
+
+
+def build_digest(events: list[tuple[str, dict]]) -> tuple[str, str]:
+    """Subject and body of a summary email; a single event uses its usual email."""
+    if len(events) == 1:
+        return build_email(*events[0])
+
+    escalated = [p for event, p in events if event == "question_escalated"]
+    answered = [p for event, p in events if event == "question_answered"]
+
+    subject = f"[QuerySync] {len(events)} question updates"
+    if escalated:
+        subject = f"🚨 [QuerySync] {len(escalated)} escalated, {len(answered)} answered"
+
+    lines = []
+    if escalated:
+        lines.append("Escalated (needs attention):")
+        for p in escalated:
+            lines.append(
+                f"  #{p['question_id']} by {p['guest_name'] or 'Anonymous'}: "
+                f"{p['question_message'][:100]}"
+            )
+        lines.append("")
+    if answered:
+        lines.append("Answered:")
+        for p in answered:
+            lines.append(
+                f"  #{p['question_id']} ({p['answers_count']} answers): "
+                f"{p['question_message'][:100]}"
+            )
+        lines.append("")
+    lines.append("View the full questions in the QuerySync dashboard.")
+    return subject, "\n".join(lines) + "\n"
+
+
+async def deliver_notification(
+    channel: str, event: str, payload: dict, target: Optional[str] = None
+) -> bool:
+    """
+    Deliver one event on one channel.
+
+    Returns True when the notification was delivered or there was nothing to
+    deliver, False when the delivery should be retried.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        delivered = await _deliver_notification(channel, event, payload, target)
+        outcome = "delivered" if delivered else "failed"
+        return delivered
+    finally:
+        NOTIFICATION_SECONDS.observe(time.perf_counter() - started, channel=channel)
+        NOTIFICATIONS.inc(channel=channel, outcome=outcome)
+
+
+async def _deliver_notification(
+    channel: str, event: str, payload: dict, target: Optional[str]
+) -> bool:
+    if channel == "webhook":
+        data = webhook_data(event, payload)
+        if target is None:
+            return not await webhook_dispatcher.dispatch(event, data)
+        return await webhook_dispatcher.deliver(target, event, data)
+
+    if channel == "email":
+        admin_emails = await get_admin_recipients()
+        # Recipients an earlier, partly failed attempt already reached
+        sent_to = payload.get("sent_to", [])
+        recipients = [email for email in admin_emails if email not in sent_to]
+        if not recipients:
+            return True
+        subject, body = build_email(event, payload)
+        reached = await send_email(recipients, subject, body)
+        if len(reached) == len(recipients):
+            return True
+        # Saved with the retry so it only mails the rest
+        payload["sent_to"] = sent_to + reached
+        return False
+
+    logger.error(f"Unknown notification channel '{channel}'")
+    return True
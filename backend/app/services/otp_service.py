@@ -1,22 +1,38 @@
 """OTP service for email verification."""
 
+import asyncio
 import logging
 import random
-from datetime import datetime, timedelta
+import time
 
+from app.core.config import get_settings
+from app.db.session import AsyncSessionLocal
 from app.services.notification_service import send_email_notification
-
+from app.services.otp_store import (
+    DatabaseOTPStore,
+    InMemoryOTPStore,
+    OTPRecord,
+    OTPStore,
+)
+
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# In-memory OTP storage (in production, use Redis or database)
-# Format: {email: {"otp": "1234", "expires_at": datetime, "verified": False}}
-_otp_storage: dict[str, dict] = {}
-
 # OTP Configuration
 OTP_LENGTH = 4
 OTP_EXPIRY_MINUTES = 10
 
 
+def create_otp_store() -> OTPStore:
+    """Build the OTP store selected by ``OTP_STORE``."""
+    if settings.OTP_STORE == "database":
+        return DatabaseOTPStore(AsyncSessionLocal)
+    return InMemoryOTPStore(max_entries=settings.OTP_MAX_ENTRIES)
+
+
+otp_store = create_otp_store()
+
+
 def generate_otp() -> str:
     """Generate a 4-digit OTP."""
     return "".join([str(random.randint(0, 9)) for _ in range(OTP_LENGTH)])
@@ -25,16 +41,14 @@ def generate_otp() -> str:
 async def send_otp(email: str) -> bool:
     """Generate and send OTP to the given email."""
     otp = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MINUTES)
+    expires_at = time.time() + OTP_EXPIRY_MINUTES * 60
 
     # Store OTP
-    _otp_storage[email] = {
-        "otp": otp,
-        "expires_at": expires_at,
-        "verified": False,
-    }
+    await otp_store.put(OTPRecord(email=email, otp=otp, expires_at=expires_at))
 
-    logger.info(f"Generated OTP for {email}: {otp} (expires at {expires_at})")
+    logger.info(
+        f"Generated OTP for {email}: {otp} (expires in {OTP_EXPIRY_MINUTES} minutes)"
+    )
 
     # Send email
     subject = "[QuerySync] Your Verification Code"
@@ -53,46 +67,63 @@ If you did not request this code, please ignore this email.
     else:
         logger.error(f"Failed to send OTP email to {email}")
         # Clean up on failure
-        del _otp_storage[email]
+        await otp_store.delete(email)
 
     return success
 
 
-def verify_otp(email: str, otp: str) -> tuple[bool, str]:
+async def verify_otp(email: str, otp: str) -> tuple[bool, str]:
     """
     Verify the OTP for the given email.
     Returns (success, message).
     """
-    if email not in _otp_storage:
+    stored = await otp_store.get(email)
+    if stored is None:
         return False, "No OTP found for this email. Please request a new one."
 
-    stored = _otp_storage[email]
-
     # Check expiration
-    if datetime.utcnow() > stored["expires_at"]:
-        del _otp_storage[email]
+    if stored.expired:
+        await otp_store.delete(email)
         return False, "OTP has expired. Please request a new one."
 
     # Check OTP value
-    if stored["otp"] != otp:
+    if stored.otp != otp:
+        attempts = await otp_store.record_failed_attempt(email)
+        if attempts >= settings.OTP_MAX_ATTEMPTS:
+            await otp_store.delete(email)
+            return False, "Too many invalid attempts. Please request a new OTP."
         return False, "Invalid OTP. Please try again."
 
-    # Mark as verified
-    _otp_storage[email]["verified"] = True
+    # Mark as verified; registration must follow within the verified TTL
+    await otp_store.mark_verified(
+        email, time.time() + settings.OTP_VERIFIED_TTL_MINUTES * 60
+    )
     logger.info(f"OTP verified for {email}")
 
     return True, "OTP verified successfully."
 
 
-def is_email_verified(email: str) -> bool:
+async def is_email_verified(email: str) -> bool:
     """Check if the email has been verified with OTP."""
-    if email not in _otp_storage:
+    stored = await otp_store.get(email)
+    if stored is None or stored.expired:
         return False
-    return _otp_storage[email].get("verified", False)
+    return stored.verified
 
 
-def clear_otp(email: str) -> None:
+async def clear_otp(email: str) -> None:
     """Clear OTP data for the given email after successful registration."""
-    if email in _otp_storage:
-        del _otp_storage[email]
-        logger.info(f"Cleared OTP data for {email}")
+    await otp_store.delete(email)
+    logger.info(f"Cleared OTP data for {email}")
+
+
+async def run_otp_sweeper(interval: float) -> None:
+    """Periodically drop expired OTPs until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await otp_store.sweep()
+            if removed:
+                logger.info(f"Swept {removed} expired OTP entries")
+        except Exception as e:
+            logger.error(f"OTP sweep failed: {e}")
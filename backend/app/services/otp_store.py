@@ -0,0 +1,199 @@
+"""Pluggable storage backends for email OTP codes."""
+
+import heapq
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import delete, select, update
+
+from app.models.otp import OTPCode
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OTPRecord:
+    """An issued OTP and its verification state."""
+
+    email: str
+    otp: str
+    expires_at: float
+    verified: bool = False
+    attempts: int = 0
+
+    @property
+    def expired(self) -> bool:
+        return time.time() > self.expires_at
+
+
+class OTPStore(ABC):
+    """Interface for OTP storage backends."""
+
+    @abstractmethod
+    async def get(self, email: str) -> Optional[OTPRecord]:
+        """Return the record for ``email`` (possibly expired) or None."""
+
+    @abstractmethod
+    async def put(self, record: OTPRecord) -> None:
+        """Insert or replace the record for ``record.email``."""
+
+    @abstractmethod
+    async def delete(self, email: str) -> None:
+        """Remove the record for ``email`` if present."""
+
+    @abstractmethod
+    async def record_failed_attempt(self, email: str) -> int:
+        """Increment and return the failed attempt counter."""
+
+    @abstractmethod
+    async def mark_verified(self, email: str, expires_at: float) -> None:
+        """Flag the record as verified and extend its lifetime."""
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """Remove expired records and return how many were dropped."""
+
+
+class InMemoryOTPStore(OTPStore):
+    """
+    Process-local store with a TTL heap.
+
+    Expired entries are dropped by ``sweep``; when ``max_entries`` is reached
+    the entry closest to expiry is evicted, so memory stays bounded under
+    signup spam. Only suitable for a single worker.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._records: dict[str, OTPRecord] = {}
+        # (expires_at, email); stale heap items are skipped lazily
+        self._expiry_heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _is_current(self, expires_at: float, email: str) -> bool:
+        record = self._records.get(email)
+        return record is not None and record.expires_at == expires_at
+
+    def _schedule(self, record: OTPRecord) -> None:
+        heapq.heappush(self._expiry_heap, (record.expires_at, record.email))
+        # Rebuild once stale heap items dominate so the heap stays bounded too
+        if len(self._expiry_heap) > 2 * self.max_entries:
+            self._expiry_heap = [
+                (r.expires_at, r.email) for r in self._records.values()
+            ]
+            heapq.heapify(self._expiry_heap)
+
+    async def get(self, email: str) -> Optional[OTPRecord]:
+        return self._records.get(email)
+
+    async def put(self, record: OTPRecord) -> None:
+        if record.email not in self._records and len(self._records) >= self.max_entries:
+            await self.sweep()
+            while len(self._records) >= self.max_entries and self._expiry_heap:
+                expires_at, email = heapq.heappop(self._expiry_heap)
+                if self._is_current(expires_at, email):
+                    del self._records[email]
+        self._records[record.email] = record
+        self._schedule(record)
+
+    async def delete(self, email: str) -> None:
+        self._records.pop(email, None)
+
+    async def record_failed_attempt(self, email: str) -> int:
+        record = self._records.get(email)
+        if record is None:
+            return 0
+        record.attempts += 1
+        return record.attempts
+
+    async def mark_verified(self, email: str, expires_at: float) -> None:
+        record = self._records.get(email)
+        if record is None:
+            return
+        record.verified = True
+        record.expires_at = expires_at
+        self._schedule(record)
+
+    async def sweep(self) -> int:
+        now = time.time()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, email = heapq.heappop(self._expiry_heap)
+            if self._is_current(expires_at, email):
+                del self._records[email]
+                removed += 1
+        return removed
+
+
+class DatabaseOTPStore(OTPStore):
+    """Store backed by the ``otp_codes`` table, shared by every worker."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def get(self, email: str) -> Optional[OTPRecord]:
+        async with self.session_factory() as db:
+            row = await db.get(OTPCode, email)
+            if row is None:
+                return None
+            return OTPRecord(
+                email=row.email,
+                otp=row.otp,
+                expires_at=row.expires_at,
+                verified=row.verified,
+                attempts=row.attempts,
+            )
+
+    async def put(self, record: OTPRecord) -> None:
+        async with self.session_factory() as db:
+            await db.merge(
+                OTPCode(
+                    email=record.email,
+                    otp=record.otp,
+                    expires_at=record.expires_at,
+                    verified=record.verified,
+                    attempts=record.attempts,
+                )
+            )
+            await db.commit()
+
+    async def delete(self, email: str) -> None:
+        async with self.session_factory() as db:
+            await db.execute(delete(OTPCode).where(OTPCode.email == email))
+            await db.commit()
+
+    async def record_failed_attempt(self, email: str) -> int:
+        async with self.session_factory() as db:
+            # Atomic increment so concurrent workers can't lose attempts
+            await db.execute(
+                update(OTPCode)
+                .where(OTPCode.email == email)
+                .values(attempts=OTPCode.attempts + 1)
+            )
+            await db.commit()
+            result = await db.execute(
+                select(OTPCode.attempts).where(OTPCode.email == email)
+            )
+            return result.scalar_one_or_none() or 0
+
+    async def mark_verified(self, email: str, expires_at: float) -> None:
+        async with self.session_factory() as db:
+            await db.execute(
+                update(OTPCode)
+                .where(OTPCode.email == email)
+                .values(verified=True, expires_at=expires_at)
+            )
+            await db.commit()
+
+    async def sweep(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(OTPCode).where(OTPCode.expires_at <= time.time())
+            )
+            await db.commit()
+            return result.rowcount or 0
@@ -0,0 +1,221 @@
+"""Transactional notification outbox and its delivery worker."""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.outbox import NotificationOutbox, OutboxStatus
+from app.services.notification_service import (
+    deliver_notification,
+    email_digest,
+    notification_targets,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Set whenever new entries are committed so an in-process worker wakes early
+outbox_wakeup = asyncio.Event()
+
+
+def enqueue_notification(db: AsyncSession, event: str, payload: dict) -> None:
+    """
+    Add an outbox entry for every channel/target subscribed to ``event``.
+
+    Entries are only added to the session: the caller's commit persists them
+    atomically with the change that triggered the notification. Emails the
+    digest accepts wait for it instead of the delivery worker.
+    """
+    now = time.time()
+    for channel, target in notification_targets(event):
+        status = OutboxStatus.PENDING
+        if channel == "email" and email_digest.accepts(event):
+            status = OutboxStatus.DIGESTED
+        db.add(
+            NotificationOutbox(
+                event=event,
+                channel=channel,
+                target=target,
+                payload=payload,
+                status=status.value,
+                attempts=0,
+                next_attempt_at=now,
+            )
+        )
+
+
+def wake_outbox_worker() -> None:
+    """Signal an in-process worker that new entries were committed."""
+    outbox_wakeup.set()
+
+
+async def claim_outbox_batch(
+    db: AsyncSession, limit: int, lease_seconds: float
+) -> list[NotificationOutbox]:
+    """
+    Claim due entries for delivery.
+
+    Rows are locked with ``FOR UPDATE SKIP LOCKED`` so concurrent workers
+    never claim the same entry; entries whose worker died mid-delivery are
+    reclaimed once their lease expires. With the digest switched off, emails
+    still held for it are sent singly.
+    """
+    now = time.time()
+    due = [OutboxStatus.PENDING.value]
+    if not email_digest.enabled:
+        due.append(OutboxStatus.DIGESTED.value)
+    result = await db.execute(
+        select(NotificationOutbox)
+        .where(
+            or_(
+                and_(
+                    NotificationOutbox.status.in_(due),
+                    NotificationOutbox.next_attempt_at <= now,
+                ),
+                and_(
+                    NotificationOutbox.status == OutboxStatus.PROCESSING.value,
+                    NotificationOutbox.locked_at < now - lease_seconds,
+                ),
+            )
+        )
+        .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    entries = list(result.scalars().all())
+    for entry in entries:
+        entry.status = OutboxStatus.PROCESSING.value
+        entry.locked_at = now
+        entry.attempts += 1
+    await db.commit()
+    return entries
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff for the given attempt number."""
+    return min(
+        settings.OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)),
+        settings.OUTBOX_RETRY_MAX_SECONDS,
+    )
+
+
+async def complete_outbox_entry(
+    db: AsyncSession,
+    entry_id: int,
+    error: Optional[str] = None,
+    payload: Optional[dict] = None,
+) -> None:
+    """
+    Mark an entry sent, or schedule a retry (failing it after the last attempt).
+
+    ``payload`` replaces the stored one on failure, keeping delivery progress
+    (e.g. recipients already emailed) for the retry.
+    """
+    entry = await db.get(NotificationOutbox, entry_id)
+    if entry is None:
+        return
+    if error is not None and payload is not None:
+        entry.payload = dict(payload)
+
+    entry.locked_at = None
+    if error is None:
+        entry.status = OutboxStatus.SENT.value
+        entry.last_error = None
+    elif entry.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        entry.status = OutboxStatus.FAILED.value
+        entry.last_error = error
+        logger.error(
+            f"Giving up on {entry.channel} notification #{entry.id} after "
+            f"{entry.attempts} attempts: {error}"
+        )
+    else:
+        entry.status = OutboxStatus.PENDING.value
+        entry.last_error = error
+        entry.next_attempt_at = time.time() + retry_delay(entry.attempts)
+    await db.commit()
+
+
+class OutboxWorker:
+    """Claims outbox batches and delivers them concurrently, per-channel bounded."""
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = 50,
+        poll_interval: float = 2.0,
+        lease_seconds: float = 120.0,
+        channel_concurrency: Optional[dict[str, int]] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._limits = {
+            channel: asyncio.Semaphore(limit)
+            for channel, limit in (channel_concurrency or {}).items()
+        }
+
+    def _limit(self, channel: str) -> asyncio.Semaphore:
+        if channel not in self._limits:
+            self._limits[channel] = asyncio.Semaphore(4)
+        return self._limits[channel]
+
+    async def _deliver(self, entry: NotificationOutbox) -> Optional[str]:
+        async with self._limit(entry.channel):
+            try:
+                delivered = await deliver_notification(
+                    entry.channel, entry.event, entry.payload, entry.target
+                )
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+        return None if delivered else "delivery failed"
+
+    async def process_batch(self) -> int:
+        """Claim and deliver one batch; returns the number of entries handled."""
+        async with self.session_factory() as db:
+            entries = await claim_outbox_batch(db, self.batch_size, self.lease_seconds)
+        if not entries:
+            return 0
+
+        errors = await asyncio.gather(*(self._deliver(entry) for entry in entries))
+
+        async with self.session_factory() as db:
+            for entry, error in zip(entries, errors):
+                await complete_outbox_entry(db, entry.id, error, entry.payload)
+        return len(entries)
+
+    async def run(self) -> None:
+        """Deliver until cancelled, polling or waking on new entries."""
+        logger.info("Notification outbox worker started")
+        while True:
+            try:
+                handled = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox batch failed: {e}")
+                handled = 0
+
+            if handled >= self.batch_size:
+                continue  # more work is likely waiting
+            outbox_wakeup.clear()
+            try:
+                await asyncio.wait_for(outbox_wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+def create_outbox_worker(session_factory) -> OutboxWorker:
+    """Build a worker configured by the ``OUTBOX_*`` settings."""
+    return OutboxWorker(
+        session_factory,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+        channel_concurrency=settings.OUTBOX_CHANNEL_CONCURRENCY,
+    )
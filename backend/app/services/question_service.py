@@ -7,31 +7,85 @@ from sqlalchemy import case, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.core.config import get_settings
+from app.db.session import refresh_unloaded
+from app.models.answer import Answer
 from app.models.question import Question, QuestionStatus
+from app.models.question_link import QuestionLink
 from app.schemas.question import QuestionCreate
+from app.services.duplicate_service import DuplicateMatch, duplicate_index
+from app.services.notification_service import answered_event, escalated_event
+from app.services.outbox_service import enqueue_notification, wake_outbox_worker
+from app.services.retrieval_service import (
+    apply_index_update,
+    document_text,
+    load_top_answers,
+)
+from app.services.typeahead_service import index_question
+
+settings = get_settings()
+
+# Selected as a column so listing questions never loads their answer rows
+answers_count = (
+    select(func.count(Answer.id))
+    .where(Answer.question_id == Question.id)
+    .correlate(Question)
+    .scalar_subquery()
+)
 
 
 async def create_question(
     db: AsyncSession,
     question_data: QuestionCreate,
     user_id: Optional[int] = None,
+    duplicate_of: Optional[DuplicateMatch] = None,
 ) -> Question:
-    """Create a new question."""
+    """Create a new question, optionally linked as a duplicate of an earlier one."""
     status = (
         QuestionStatus.ESCALATED
         if question_data.is_escalated
         else QuestionStatus.PENDING
     )
+    now = datetime.now(timezone.utc)
     question = Question(
         user_id=user_id,
         guest_name=question_data.guest_name if not user_id else None,
         message=question_data.message,
         status=status,
-        escalated_at=datetime.now(timezone.utc) if question_data.is_escalated else None,
+        escalated_at=now if question_data.is_escalated else None,
+        answered_at=None,
     )
     db.add(question)
+
+    if question_data.is_escalated or duplicate_of is not None:
+        # Flush for the id so the outbox entry and link commit with the question
+        await db.flush()
+    if duplicate_of is not None:
+        db.add(
+            QuestionLink(
+                question_id=question.id,
+                duplicate_of_id=duplicate_of.question_id,
+                similarity=duplicate_of.similarity,
+            )
+        )
+    if question_data.is_escalated:
+        enqueue_notification(
+            db,
+            "question_escalated",
+            escalated_event(
+                question.id,
+                question.message,
+                question.guest_name or "Anonymous",
+                now.isoformat(),
+            ),
+        )
+
     await db.commit()
-    await db.refresh(question)
+    await refresh_unloaded(db, question)
+    duplicate_index.add(question.id, question.message)
+    index_question(question.id, question.message)
+    if question_data.is_escalated:
+        wake_outbox_worker()
     return question
 
 
@@ -40,13 +94,13 @@ async def get_questions(
     limit: int = 50,
     offset: int = 0,
     status: Optional[QuestionStatus] = None,
-) -> list[Question]:
+) -> list[tuple[Question, int]]:
     """
-    Get questions ordered by:
+    Get questions with their answer counts, ordered by:
     1. Escalated first
     2. Then by created_at (newest first)
     """
-    query = select(Question).options(selectinload(Question.answers))
+    query = select(Question, answers_count)
 
     if status:
         query = query.where(Question.status == status)
@@ -62,7 +116,7 @@ async def get_questions(
 
     query = query.limit(limit).offset(offset)
     result = await db.execute(query)
-    return list(result.scalars().all())
+    return [(question, count) for question, count in result.all()]
 
 
 async def get_question_by_id(
@@ -78,27 +132,63 @@ async def get_question_by_id(
     return result.scalar_one_or_none()
 
 
+async def question_exists(db: AsyncSession, question_id: int) -> bool:
+    """Whether a question exists, without loading it or its answers."""
+    result = await db.execute(select(Question.id).where(Question.id == question_id))
+    return result.scalar_one_or_none() is not None
+
+
 async def update_question_status(
     db: AsyncSession,
     question_id: int,
     new_status: QuestionStatus,
-) -> Optional[Question]:
-    """Update question status."""
-    question = await get_question_by_id(db, question_id)
-    if not question:
+) -> Optional[tuple[Question, int]]:
+    """Update question status; returns the question and its answer count."""
+    result = await db.execute(
+        select(Question, answers_count).where(Question.id == question_id)
+    )
+    row = result.one_or_none()
+    if row is None:
         return None
+    question, count = row
 
     question.status = new_status
     now = datetime.now(timezone.utc)
 
     if new_status == QuestionStatus.ESCALATED:
         question.escalated_at = now
+        enqueue_notification(
+            db,
+            "question_escalated",
+            escalated_event(
+                question.id,
+                question.message,
+                question.guest_name or "Admin",
+                now.isoformat(),
+            ),
+        )
     elif new_status == QuestionStatus.ANSWERED:
         question.answered_at = now
-
+        enqueue_notification(
+            db,
+            "question_answered",
+            answered_event(
+                question.id, question.message, now.isoformat(), count
+            ),
+        )
+
+    # Only an answered question is indexed, with just its best answers
+    index_text = None
+    if new_status == QuestionStatus.ANSWERED:
+        answers = await load_top_answers(db, question.id, settings.RAG_INDEX_ANSWERS)
+        index_text = document_text(question, answers)
     await db.commit()
-    await db.refresh(question)
-    return question
+    # Only updated_at is server-generated, so refresh just that column
+    await db.refresh(question, ["updated_at"])
+    if new_status in (QuestionStatus.ESCALATED, QuestionStatus.ANSWERED):
+        wake_outbox_worker()
+    apply_index_update(question.id, index_text)
+    return question, count
 
 
 async def get_question_stats(db: AsyncSession) -> dict:
@@ -1,87 +1,297 @@
-"""RAG service for auto-suggesting answers using LangChain + Groq."""
+"""RAG service for auto-suggesting answers."""
 
+import hashlib
 import logging
-from typing import Optional
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, Optional, Sequence, Union
 
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.concurrency import ConcurrencyLimiter, SingleFlight
 from app.core.config import get_settings
+from app.core.metrics import registry
+from app.models.answer import Answer
+from app.services.llm_provider import get_llm_provider
+from app.services.retrieval_service import RetrievedExample, retrieval_index, tokenize
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+suggestion_cache = TTLCache(
+    maxsize=settings.SUGGESTION_CACHE_SIZE, ttl=settings.SUGGESTION_CACHE_TTL_SECONDS
+)
+suggestion_flight = SingleFlight()
+llm_limiter = ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE)
+
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_duration_seconds",
+    "LLM suggestion latency.",
+    ("provider", "mode", "outcome"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total",
+    "Estimated LLM tokens by provider and kind.",
+    ("provider", "kind"),
+)
+registry.gauge(
+    "llm_calls_active", "LLM calls running.", callback=lambda: llm_limiter.active
+)
+registry.gauge(
+    "llm_calls_waiting",
+    "LLM calls queued for a slot.",
+    callback=lambda: llm_limiter.waiting,
+)
+
+
+_TOKEN_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate.
+
+    BPE vocabularies keep common words whole and split long ones, and
+    punctuation is usually its own token: count one token per ~6 characters
+    of each word and one per punctuation mark.
+    """
+    return sum((len(piece) + 5) // 6 for piece in _TOKEN_PIECE_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to roughly ``max_tokens`` tokens on a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[: max_tokens * 6].rsplit(" ", 1)[0]
+    while cut and estimate_tokens(cut) > max_tokens:
+        cut = cut[: int(len(cut) * 0.9)].rsplit(" ", 1)[0]
+    return cut + "..."
+
+
+@dataclass
+class ContextItem:
+    """A prompt snippet: an answer to this question or a similar resolved one."""
+
+    text: str
+    score: int = 0  # net votes
+    similarity: float = 0.0
+    question: Optional[str] = None  # set for retrieved examples
+
+
+def answer_context(answers: Iterable[Answer]) -> list[ContextItem]:
+    """Context candidates from a question's answers."""
+    return [ContextItem(a.message, a.upvotes - a.downvotes) for a in answers]
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+    norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+    return float(a @ b) / norm if norm else 0.0
+
+
+def _near_duplicate(
+    tokens: set[str], seen: list[set[str]], threshold: float = 0.8
+) -> bool:
+    return any(
+        len(tokens & other) / max(len(tokens | other), 1) >= threshold for other in seen
+    )
+
+
+def pack_context(
+    question_message: str,
+    previous_answers: Sequence[Union[str, ContextItem]],
+    examples: Optional[list[RetrievedExample]] = None,
+    budget_tokens: Optional[int] = None,
+    item_tokens: Optional[int] = None,
+) -> list[ContextItem]:
+    """
+    Choose the prompt context that fits the token budget.
+
+    Candidates are ranked by similarity to the question plus a bounded bonus
+    for net votes, near-identical texts are dropped, and items are then added
+    greedily (each capped at ``item_tokens``) while they fit in the budget.
+    """
+    if budget_tokens is None:
+        budget_tokens = settings.SUGGESTION_CONTEXT_TOKEN_BUDGET
+    if item_tokens is None:
+        item_tokens = settings.SUGGESTION_CONTEXT_ITEM_TOKENS
+
+    embed = retrieval_index.embedder.embed
+    query = embed(question_message)
+    candidates = [
+        ContextItem(ex.answer, similarity=ex.similarity, question=ex.question)
+        for ex in examples or []
+    ]
+    for answer in previous_answers:
+        item = ContextItem(answer) if isinstance(answer, str) else answer
+        similarity = _cosine(query, embed(item.text))
+        candidates.append(ContextItem(item.text, item.score, similarity, item.question))
+    candidates.sort(
+        key=lambda c: c.similarity + 0.25 * math.tanh(c.score / 3), reverse=True
+    )
+
+    packed: list[ContextItem] = []
+    seen: list[set[str]] = []
+    remaining = budget_tokens
+    for candidate in candidates:
+        tokens = set(tokenize(candidate.text))
+        if not candidate.text.strip() or _near_duplicate(tokens, seen):
+            continue
+        text = truncate_to_tokens(candidate.text, item_tokens)
+        question = None
+        cost = estimate_tokens(text) + 3
+        if candidate.question:
+            question = truncate_to_tokens(candidate.question, item_tokens // 2)
+            cost += estimate_tokens(question)
+        if cost > remaining:
+            continue
+        packed.append(
+            ContextItem(text, candidate.score, candidate.similarity, question)
+        )
+        seen.append(tokens)
+        remaining -= cost
+    return packed
+
+
+def suggestion_fingerprint(question_message: str, answers: Iterable[Answer]) -> str:
+    """
+    Hash the question and its answers, the inputs a suggestion is built from.
+
+    Answer ids and vote counts stand in for answer versions. Retrieved
+    examples are left out: they come from a per-process index, and every
+    worker must compute the same fingerprint for stored suggestions to match.
+    """
+    digest = hashlib.sha256(question_message.encode("utf-8"))
+    for answer in sorted(answers, key=lambda a: a.id):
+        digest.update(f"\0a{answer.id}:{answer.upvotes}:{answer.downvotes}".encode())
+    return digest.hexdigest()
+
+
+def build_prompt_context(
+    question_message: str,
+    previous_answers: Sequence[Union[str, ContextItem]],
+    context: Optional[str] = None,
+    examples: Optional[list[RetrievedExample]] = None,
+) -> str:
+    """Context block of the prompt: packed similar resolved questions and answers."""
+    packed = pack_context(question_message, previous_answers, examples)
+    resolved = [item for item in packed if item.question is not None]
+    answers = [item for item in packed if item.question is None]
+
+    answers_context = ""
+    if resolved:
+        answers_context += "\n\nSimilar questions that were already resolved:\n"
+        answers_context += "\n".join(
+            f"Q: {item.question}\nA: {item.text}" for item in resolved
+        )
+    if answers:
+        answers_context += "\n\nPrevious answers to this question:\n" + "\n".join(
+            f"- {item.text}" for item in answers
+        )
+    if context:
+        answers_context += f"\n\nAdditional context: {context}"
+    return answers_context
+
 
 async def get_suggested_answer(
     question_message: str,
-    previous_answers: list[str],
+    previous_answers: Sequence[Union[str, ContextItem]],
     context: Optional[str] = None,
+    examples: Optional[list[RetrievedExample]] = None,
+    on_chunk: Optional[Callable[[str], Awaitable[None]]] = None,
+    on_usage: Optional[Callable[[int], None]] = None,
 ) -> Optional[str]:
     """
-    Generate a suggested answer using LangChain and Groq API.
+    Generate a suggested answer with the configured LLM provider.
 
     Args:
         question_message: The question to answer
-        previous_answers: List of previous answers for context
+        previous_answers: Answers to this question (text or scored ContextItem)
         context: Optional additional context
+        examples: Similar resolved questions retrieved from the index
+        on_chunk: If given, the answer is streamed and each chunk passed here
+        on_usage: Called with the estimated tokens once the provider answered
 
     Returns:
         Suggested answer string or None if failed
     """
-    if not settings.GROQ_API_KEY:
-        logger.warning("GROQ_API_KEY not configured, skipping RAG suggestion")
+    prompt_context = build_prompt_context(
+        question_message, previous_answers, context, examples
+    )
+    provider = get_llm_provider()
+    mode = "generate" if on_chunk is None else "stream"
+    started = time.perf_counter()
+    try:
+        if on_chunk is None:
+            suggested = await provider.generate(question_message, prompt_context)
+        else:
+            parts = []
+            async for chunk in provider.stream(question_message, prompt_context):
+                parts.append(chunk)
+                await on_chunk(chunk)
+            suggested = "".join(parts).strip() or None
+    except Exception as e:
+        LLM_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            provider=provider.name,
+            mode=mode,
+            outcome="error",
+        )
+        logger.error(f"Failed to generate RAG suggestion: {type(e).__name__}: {e}")
         return None
 
-    logger.info(f"Attempting RAG suggestion with API key: {settings.GROQ_API_KEY[:10]}...")
+    LLM_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        provider=provider.name,
+        mode=mode,
+        outcome="ok" if suggested else "empty",
+    )
+    prompt_tokens = estimate_tokens(question_message + prompt_context)
+    completion_tokens = estimate_tokens(suggested or "")
+    LLM_TOKENS.inc(prompt_tokens, provider=provider.name, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, provider=provider.name, kind="completion")
+    if on_usage is not None:
+        on_usage(prompt_tokens + completion_tokens)
+    if suggested:
+        logger.info(f"Generated RAG suggestion with provider '{provider.name}'")
+    return suggested
 
-    try:
-        from langchain_core.prompts import ChatPromptTemplate
-        from langchain_groq import ChatGroq
-
-        # Initialize Groq LLM
-        llm = ChatGroq(
-            api_key=settings.GROQ_API_KEY,
-            model_name="openai/gpt-oss-20b",
-            temperature=0.7,
-            max_tokens=500,
-        )
 
-        # Build context from previous answers
-        answers_context = ""
-        if previous_answers:
-            answers_context = "\n\nPrevious answers in the system:\n" + "\n".join(
-                f"- {ans[:200]}" for ans in previous_answers[:5]
+async def get_or_generate_suggestion(
+    fingerprint: str,
+    question_message: str,
+    previous_answers: Sequence[Union[str, ContextItem]],
+    examples: Optional[list[RetrievedExample]] = None,
+    on_chunk: Optional[Callable[[str], Awaitable[None]]] = None,
+    on_usage: Optional[Callable[[int], None]] = None,
+) -> Optional[str]:
+    """
+    Return a cached suggestion or generate one.
+
+    Concurrent requests with the same fingerprint share a single LLM call, and
+    LLM calls are bounded by ``llm_limiter`` (raises CapacityExceeded when its
+    queue is full). ``on_chunk`` streams the call this request starts; it is
+    not called for cached text or when joining an in-flight call, and neither
+    is ``on_usage``, so callers are only charged for provider calls they made.
+    """
+    cached = suggestion_cache.get(fingerprint)
+    if cached is not None:
+        return cached
+
+    async def generate() -> Optional[str]:
+        async with llm_limiter:
+            suggestion = await get_suggested_answer(
+                question_message=question_message,
+                previous_answers=previous_answers,
+                examples=examples,
+                on_chunk=on_chunk,
+                on_usage=on_usage,
             )
+        if suggestion:
+            suggestion_cache.set(fingerprint, suggestion)
+        return suggestion
 
-        # Create prompt template
-        prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                """You are a helpful Q&A assistant for QuerySync AI, a real-time Q&A dashboard.
-Your task is to provide clear, concise, and helpful answers to user questions.
-Keep your responses professional and to the point.
-If you're unsure about something, acknowledge it rather than making things up."""
-            ),
-            (
-                "human",
-                """Question: {question}
-{context}
-
-Please provide a helpful answer to this question:"""
-            ),
-        ])
-
-        # Generate response
-        chain = prompt | llm
-        response = await chain.ainvoke({
-            "question": question_message,
-            "context": answers_context + (f"\n\nAdditional context: {context}" if context else ""),
-        })
-
-        suggested = response.content.strip()
-        logger.info("Generated RAG suggestion successfully")
-        return suggested
-
-    except ImportError as e:
-        logger.error(f"LangChain/Groq not properly installed: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Failed to generate RAG suggestion: {type(e).__name__}: {e}")
-        return None
+    return await suggestion_flight.do(fingerprint, generate)
@@ -0,0 +1,632 @@
+"""Vector retrieval over answered questions for RAG suggestions."""
+
+import asyncio
+import fcntl
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.config import get_settings
+from app.models.answer import Answer
+from app.models.question import Question, QuestionStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it me my of "
+    "on or so that the this to was what when where which who why will with you "
+    "your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word unigrams and bigrams, without stopwords."""
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashedTfidfEmbedder:
+    """
+    Hash terms into a fixed number of buckets (the "hashing trick").
+
+    Vectors hold sublinear term frequencies; IDF weighting is applied at query
+    time from the index's document frequencies, so stored vectors never go
+    stale as the corpus grows. CRC32 keeps bucket ids stable across processes.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def bucket(self, term: str) -> int:
+        return zlib.crc32(term.encode("utf-8")) % self.dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for term, count in Counter(tokenize(text)).items():
+            vector[self.bucket(term)] += 1.0 + math.log(count)
+        return vector
+
+
+def top_k_cosine(
+    vectors: np.ndarray,
+    live: np.ndarray,
+    idf: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    block_rows: int = 8192,
+) -> list[tuple[int, float]]:
+    """
+    Top ``k`` (row, cosine similarity) pairs between IDF-weighted rows and ``query``.
+
+    Rows are scored a block at a time so a memory-mapped matrix is streamed
+    through rather than copied; weighted row norms are summed in place by
+    ``einsum``, so no temporary the size of a block is ever allocated.
+    """
+    weights = idf * idf
+    query_norm = float(np.linalg.norm(query * idf))
+    if query_norm == 0 or k <= 0:
+        return []
+    weighted_query = (query * weights).astype(np.float32)
+    weights = weights.astype(np.float32)
+
+    best_rows = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, len(live), block_rows):
+        end = start + block_rows
+        block = np.asarray(vectors[start:end])
+        norms = np.sqrt(np.einsum("ij,ij,j->i", block, block, weights))
+        norms[norms == 0] = 1.0
+        scores = (block @ weighted_query) / (norms * query_norm)
+        scores[~live[start:end]] = -1.0
+
+        rows = np.concatenate([best_rows, np.arange(start, start + len(block))])
+        scores = np.concatenate([best_scores, scores])
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[keep], scores[keep]
+        best_rows, best_scores = rows, scores
+
+    order = np.argsort(-best_scores)
+    return [
+        (int(best_rows[i]), float(best_scores[i])) for i in order if best_scores[i] > 0
+    ]
+
+
+class VectorIndex:
+    """
+    In-memory term-frequency matrix keyed by question id.
+
+    Searches run on worker threads while writes may come from another, so
+    both hold ``_lock``; a search sees ``_size``, ``_ids``, ``_vectors`` and
+    ``_df`` from one consistent state.
+    """
+
+    def __init__(self, embedder: HashedTfidfEmbedder, capacity: int = 256):
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._reset(capacity)
+
+    def _reset(self, capacity: int) -> None:
+        self._vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        self._rows: dict[int, int] = {}
+        self._free: list[int] = []
+        self._size = 0
+        self._df = np.zeros(self.embedder.dim, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._rows
+
+    def _allocate_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._size == len(self._ids):
+            # Grow by half, copying into a fresh matrix rather than stacking on
+            # a zeroed duplicate, so growth never holds three copies at once
+            capacity = len(self._ids) + max(len(self._ids) // 2, 1)
+            vectors = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+            vectors[: self._size] = self._vectors
+            ids = np.full(capacity, -1, dtype=np.int64)
+            ids[: self._size] = self._ids
+            self._vectors, self._ids = vectors, ids
+        self._size += 1
+        return self._size - 1
+
+    def upsert(self, doc_id: int, text: str) -> None:
+        """Add or replace the vector for ``doc_id``."""
+        vector = self.embedder.embed(text)
+        with self._lock:
+            self._remove(doc_id)
+            if not vector.any():
+                return
+            row = self._allocate_row()
+            self._vectors[row] = vector
+            self._ids[row] = doc_id
+            self._rows[doc_id] = row
+            self._df += vector > 0
+
+    def remove(self, doc_id: int) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: int) -> None:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        self._df -= self._vectors[row] > 0
+        self._vectors[row] = 0
+        self._ids[row] = -1
+        self._free.append(row)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(256)
+
+    def idf(self) -> np.ndarray:
+        return (np.log((1 + len(self._rows)) / (1 + self._df)) + 1.0).astype(np.float32)
+
+    def search(
+        self, text: str, k: int, exclude: Optional[int] = None
+    ) -> list[tuple[int, float]]:
+        """Top ``k`` (doc_id, cosine similarity) pairs for ``text``."""
+        query = self.embedder.embed(text)
+        with self._lock:
+            if not self._rows:
+                return []
+            live = self._ids[: self._size] >= 0
+            if exclude in self._rows:
+                live[self._rows[exclude]] = False
+            hits = top_k_cosine(self._vectors[: self._size], live, self.idf(), query, k)
+            return [(int(self._ids[row]), score) for row, score in hits]
+
+
+class MmapVectorIndex:
+    """
+    Append-only vector index persisted as memory-mapped files.
+
+    Layout under ``path`` (``N`` is the generation bumped by compaction)::
+
+        meta.json        {"dim": ..., "generation": N}
+        vectors.N.f32    row-major float32 vectors, appended
+        ids.N.i64        question id per row, appended last (defines row count)
+        dead.N.u8        tombstone flag per row, set in place
+        df.N.i64         document frequency per hash bucket over live rows
+
+    Every worker maps the same files read-only, so pages are shared through
+    the OS page cache. Writers serialise on an ``flock``; readers take no file
+    lock and pick up rows appended by other processes on their next call.
+    Within a process, remapping is guarded by ``_state_lock`` and searches
+    score a snapshot of the mapping. Replaced or removed documents are
+    tombstoned and reclaimed by ``compact``.
+    """
+
+    def __init__(
+        self, embedder: HashedTfidfEmbedder, path: str, block_rows: int = 8192
+    ):
+        self.embedder = embedder
+        self.path = Path(path)
+        self.block_rows = block_rows
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._meta_path = self.path / "meta.json"
+        self._meta_stat: Optional[tuple[int, int]] = None
+        self._generation = -1
+        self._state_lock = threading.RLock()
+        with self._locked():
+            if not self._meta_path.exists():
+                self._create_generation(0)
+                self._write_meta(0)
+        self._refresh()
+
+    @contextmanager
+    def _locked(self):
+        with open(self.path / "index.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _file(self, name: str, generation: Optional[int] = None) -> Path:
+        return self.path / name.replace(
+            "*", str(self._generation if generation is None else generation)
+        )
+
+    def _create_generation(self, generation: int) -> None:
+        for name in ("vectors.*.f32", "ids.*.i64", "dead.*.u8"):
+            self._file(name, generation).write_bytes(b"")
+        np.zeros(self.embedder.dim, dtype=np.int64).tofile(
+            self._file("df.*.i64", generation)
+        )
+
+    def _write_meta(self, generation: int) -> None:
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps({"dim": self.embedder.dim, "generation": generation}))
+        os.replace(tmp, self._meta_path)
+
+    def _refresh(self) -> None:
+        """Remap files if another process appended rows or compacted."""
+        with self._state_lock:
+            self._remap()
+
+    def _remap(self) -> None:
+        stat = os.stat(self._meta_path)
+        meta_stat = (stat.st_ino, stat.st_mtime_ns)
+        if meta_stat != self._meta_stat:
+            meta = json.loads(self._meta_path.read_text())
+            if meta["dim"] != self.embedder.dim:
+                raise ValueError(
+                    f"Index at {self.path} has dim {meta['dim']}, "
+                    f"expected {self.embedder.dim}"
+                )
+            self._meta_stat = meta_stat
+            self._generation = meta["generation"]
+            self._ids = np.empty(0, dtype=np.int64)
+            self._rows: dict[int, int] = {}
+            self._df = np.memmap(self._file("df.*.i64"), dtype=np.int64, mode="r+")
+
+        rows = os.path.getsize(self._file("ids.*.i64")) // 8
+        if rows == len(self._ids):
+            return
+        known = len(self._ids)
+        if rows:
+            self._ids = np.memmap(
+                self._file("ids.*.i64"), dtype=np.int64, mode="r", shape=(rows,)
+            )
+            self._vectors = np.memmap(
+                self._file("vectors.*.f32"),
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.embedder.dim),
+            )
+            self._dead = np.memmap(
+                self._file("dead.*.u8"), dtype=np.uint8, mode="r+", shape=(rows,)
+            )
+        for row in range(known, rows):
+            self._rows[int(self._ids[row])] = row
+
+    def _live_row(self, doc_id: int) -> Optional[int]:
+        row = self._rows.get(doc_id)
+        if row is None or self._dead[row]:
+            return None
+        return row
+
+    def __len__(self) -> int:
+        with self._state_lock:
+            self._remap()
+            if not len(self._ids):
+                return 0
+            return int(np.count_nonzero(self._dead == 0))
+
+    def __contains__(self, doc_id: int) -> bool:
+        with self._state_lock:
+            self._remap()
+            return self._live_row(doc_id) is not None
+
+    def _tombstone(self, row: int) -> None:
+        self._dead[row] = 1
+        self._dead.flush()
+        self._df -= self._vectors[row] > 0
+        self._df.flush()
+
+    def upsert(self, doc_id: int, text: str) -> None:
+        """Append the vector for ``doc_id``, tombstoning any previous row."""
+        vector = self.embedder.embed(text)
+        with self._locked():
+            self._refresh()
+            row = self._live_row(doc_id)
+            if row is not None:
+                self._tombstone(row)
+            if not vector.any():
+                return
+
+            rows = len(self._ids)
+            # Drop bytes left behind by a writer that died mid-append
+            os.truncate(self._file("vectors.*.f32"), rows * self.embedder.dim * 4)
+            os.truncate(self._file("dead.*.u8"), rows)
+            with open(self._file("vectors.*.f32"), "ab") as f:
+                f.write(vector.tobytes())
+            with open(self._file("dead.*.u8"), "ab") as f:
+                f.write(b"\0")
+            with open(self._file("ids.*.i64"), "ab") as f:
+                f.write(np.int64(doc_id).tobytes())
+            self._df += vector > 0
+            self._df.flush()
+            self._refresh()
+
+    def remove(self, doc_id: int) -> None:
+        with self._locked():
+            self._refresh()
+            row = self._live_row(doc_id)
+            if row is not None:
+                self._tombstone(row)
+
+    def clear(self) -> None:
+        with self._locked():
+            self._swap_generation(self._generation + 1, lambda generation: None)
+
+    def dead_ratio(self) -> float:
+        with self._state_lock:
+            self._remap()
+            if not len(self._ids):
+                return 0.0
+            return float(np.count_nonzero(self._dead)) / len(self._ids)
+
+    def compact(self) -> int:
+        """Rewrite live rows into a new generation; returns rows reclaimed."""
+        with self._locked():
+            self._refresh()
+            rows = len(self._ids)
+            if not rows:
+                return 0
+            live = np.flatnonzero(self._dead == 0)
+
+            def copy_live(generation: int) -> None:
+                with open(self._file("vectors.*.f32", generation), "ab") as f:
+                    for start in range(0, len(live), self.block_rows):
+                        end = start + self.block_rows
+                        f.write(np.asarray(self._vectors[live[start:end]]).tobytes())
+                np.asarray(self._ids[live]).tofile(self._file("ids.*.i64", generation))
+                np.zeros(len(live), dtype=np.uint8).tofile(
+                    self._file("dead.*.u8", generation)
+                )
+                np.asarray(self._df).tofile(self._file("df.*.i64", generation))
+
+            self._swap_generation(self._generation + 1, copy_live)
+            return rows - len(live)
+
+    def _swap_generation(self, generation: int, populate) -> None:
+        """Build ``generation`` with ``populate``, publish it, drop the old files."""
+        old = self._generation
+        self._create_generation(generation)
+        populate(generation)
+        self._write_meta(generation)
+        for name in ("vectors.*.f32", "ids.*.i64", "dead.*.u8", "df.*.i64"):
+            # Readers that still map the old files keep valid pages after unlink
+            self._file(name, old).unlink(missing_ok=True)
+        self._refresh()
+
+    def idf(self) -> np.ndarray:
+        live = len(self)
+        return (np.log((1 + live) / (1 + np.asarray(self._df))) + 1.0).astype(
+            np.float32
+        )
+
+    def search(
+        self, text: str, k: int, exclude: Optional[int] = None
+    ) -> list[tuple[int, float]]:
+        """Top ``k`` (doc_id, cosine similarity) pairs for ``text``."""
+        with self._state_lock:
+            self._remap()
+            if not len(self._ids):
+                return []
+            ids, vectors = self._ids, self._vectors
+            live = np.asarray(self._dead) == 0
+            row = self._live_row(exclude) if exclude is not None else None
+            if row is not None:
+                live[row] = False
+            idf = self.idf()
+        # Mappings replaced by a later remap stay valid, so score without the lock
+        hits = top_k_cosine(
+            vectors, live, idf, self.embedder.embed(text), k, self.block_rows
+        )
+        return [(int(ids[row]), score) for row, score in hits]
+
+
+def create_retrieval_index():
+    """Persistent index under ``RAG_INDEX_DIR`` if set, otherwise in-memory."""
+    embedder = HashedTfidfEmbedder(settings.RAG_EMBEDDING_DIM)
+    if settings.RAG_INDEX_DIR:
+        return MmapVectorIndex(
+            embedder, settings.RAG_INDEX_DIR, settings.RAG_SEARCH_BLOCK_ROWS
+        )
+    return VectorIndex(embedder)
+
+
+retrieval_index = create_retrieval_index()
+
+# Index writes may wait on the file lock (e.g. during compaction), so they run
+# off the event loop on one thread, which also keeps them in submission order
+_index_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval-index")
+
+
+async def _run_index_write(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_index_writer, fn, *args)
+
+
+def _log_index_write_failure(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Retrieval index update failed: {future.exception()}")
+
+
+async def flush_index_writes() -> None:
+    """Wait until every index write queued so far has been applied."""
+    await _run_index_write(lambda: None)
+
+
+@dataclass
+class RetrievedExample:
+    """A resolved question and its best answer, used as LLM context."""
+
+    question_id: int
+    question: str
+    answer: str
+    similarity: float
+
+
+def top_answers(question: Question, limit: int) -> list[Answer]:
+    """Best-rated top-level answers, oldest first among ties."""
+    answers = [a for a in question.answers if a.parent_id is None]
+    answers.sort(key=lambda a: (-(a.upvotes - a.downvotes), a.id))
+    return answers[:limit]
+
+
+async def load_top_answers(
+    db: AsyncSession, question_id: int, limit: int
+) -> list[Answer]:
+    """``top_answers`` selected in SQL, without loading the question's other answers."""
+    result = await db.execute(
+        select(Answer)
+        .where(Answer.question_id == question_id, Answer.parent_id.is_(None))
+        .order_by((Answer.upvotes - Answer.downvotes).desc(), Answer.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+def document_text(
+    question: Question, answers: Optional[list[Answer]] = None
+) -> Optional[str]:
+    """
+    Text indexed for a question, or None if it should not be indexed.
+
+    ``answers`` are its best answers when already selected (see
+    ``load_top_answers``); otherwise they come from ``question.answers``.
+    """
+    if question.status != QuestionStatus.ANSWERED:
+        return None
+    if answers is None:
+        answers = top_answers(question, settings.RAG_INDEX_ANSWERS)
+    return "\n".join([question.message] + [a.message for a in answers])
+
+
+def _apply_index_updates(updates: list[tuple[int, Optional[str]]]) -> None:
+    for question_id, text in updates:
+        if text is None:
+            retrieval_index.remove(question_id)
+        else:
+            retrieval_index.upsert(question_id, text)
+
+
+def apply_index_update(question_id: int, text: Optional[str]) -> Future:
+    """
+    Queue an upsert or removal using text from ``document_text``.
+
+    Returns without waiting, so request latency never depends on index
+    maintenance; failures are logged when the write completes.
+    """
+    future = _index_writer.submit(_apply_index_updates, [(question_id, text)])
+    future.add_done_callback(_log_index_write_failure)
+    return future
+
+
+async def refresh_indexed_question(db: AsyncSession, question_id: int) -> None:
+    """Queue a re-embed of an indexed question after its answers or votes changed."""
+    if question_id not in retrieval_index:
+        return
+    result = await db.execute(
+        select(Question)
+        .options(selectinload(Question.answers))
+        .where(Question.id == question_id)
+        .execution_options(populate_existing=True)
+    )
+    question = result.scalar_one_or_none()
+    apply_index_update(question_id, document_text(question) if question else None)
+
+
+async def rebuild_retrieval_index(session_factory, batch_size: int = 500) -> int:
+    """Index every answered question; returns the number indexed."""
+    await _run_index_write(retrieval_index.clear)
+    last_id = 0
+    async with session_factory() as db:
+        while True:
+            result = await db.execute(
+                select(Question)
+                .options(selectinload(Question.answers))
+                .where(
+                    Question.status == QuestionStatus.ANSWERED, Question.id > last_id
+                )
+                .order_by(Question.id)
+                .limit(batch_size)
+            )
+            questions = list(result.scalars().all())
+            if not questions:
+                break
+            await _run_index_write(
+                _apply_index_updates, [(q.id, document_text(q)) for q in questions]
+            )
+            last_id = questions[-1].id
+            db.expunge_all()
+    logger.info(f"Retrieval index built with {len(retrieval_index)} answered questions")
+    return len(retrieval_index)
+
+
+async def ensure_retrieval_index(session_factory) -> None:
+    """Build the index at startup unless a persisted one is already populated."""
+    if len(retrieval_index):
+        logger.info(
+            f"Retrieval index loaded with {len(retrieval_index)} answered questions"
+        )
+        return
+    await rebuild_retrieval_index(session_factory)
+
+
+async def run_index_compactor(interval: float) -> None:
+    """Compact a persisted index once enough rows are tombstoned, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        if not isinstance(retrieval_index, MmapVectorIndex):
+            continue
+        try:
+            if retrieval_index.dead_ratio() >= settings.RAG_INDEX_COMPACT_RATIO:
+                reclaimed = await _run_index_write(retrieval_index.compact)
+                logger.info(f"Compacted retrieval index, reclaimed {reclaimed} rows")
+        except Exception as e:
+            logger.error(f"Retrieval index compaction failed: {e}")
+
+
+async def retrieve_similar(
+    db: AsyncSession,
+    text: str,
+    k: Optional[int] = None,
+    exclude_question_id: Optional[int] = None,
+) -> list[RetrievedExample]:
+    """Most similar resolved Q&A pairs for ``text``, best first."""
+    # Scoring is NumPy-bound and releases the GIL, so keep it off the event loop
+    hits = await asyncio.to_thread(
+        retrieval_index.search, text, k or settings.RAG_TOP_K, exclude_question_id
+    )
+    hits = [
+        (doc_id, score)
+        for doc_id, score in hits
+        if score >= settings.RAG_MIN_SIMILARITY
+    ]
+    if not hits:
+        return []
+
+    result = await db.execute(
+        select(Question)
+        .options(selectinload(Question.answers))
+        .where(Question.id.in_([doc_id for doc_id, _ in hits]))
+    )
+    questions = {q.id: q for q in result.scalars().all()}
+
+    examples = []
+    for doc_id, score in hits:
+        question = questions.get(doc_id)
+        answers = top_answers(question, 1) if question else []
+        if answers:
+            examples.append(
+                RetrievedExample(doc_id, question.message, answers[0].message, score)
+            )
+    return examples
@@ -0,0 +1,297 @@
+"""Stored suggestions and their background pre-computation."""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import case, delete, desc, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.concurrency import CapacityExceeded
+from app.core.config import get_settings
+from app.models.question import Question, QuestionStatus
+from app.models.suggestion import Suggestion, SuggestionClaim
+from app.services.question_service import get_question_by_id
+from app.services.rag_service import (
+    answer_context,
+    get_or_generate_suggestion,
+    suggestion_fingerprint,
+)
+from app.services.retrieval_service import retrieve_similar
+from app.websocket import manager
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+async def get_stored_suggestion(
+    db: AsyncSession, question_id: int
+) -> Optional[Suggestion]:
+    """The stored suggestion for a question, if any."""
+    result = await db.execute(
+        select(Suggestion).where(Suggestion.question_id == question_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def save_suggestion(
+    db: AsyncSession,
+    question_id: int,
+    fingerprint: str,
+    suggested_answer: str,
+    source: str,
+) -> None:
+    """Insert or replace the stored suggestion for a question."""
+    stored = await get_stored_suggestion(db, question_id)
+    if stored is None:
+        db.add(
+            Suggestion(
+                question_id=question_id,
+                fingerprint=fingerprint,
+                suggested_answer=suggested_answer,
+                source=source,
+            )
+        )
+    else:
+        stored.fingerprint = fingerprint
+        stored.suggested_answer = suggested_answer
+        stored.source = source
+        stored.stale = False
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another worker stored one first; either suggestion is fine
+        await db.rollback()
+
+
+async def mark_suggestion_stale(db: AsyncSession, question_id: int) -> None:
+    """
+    Flag a question's stored suggestion for re-computation; the caller commits.
+
+    Called when answers or votes change. Only the precomputer reads the flag
+    (requests compare fingerprints), so nothing is written unless it runs.
+    """
+    if settings.SUGGESTION_PRECOMPUTE_ENABLED:
+        await db.execute(
+            update(Suggestion)
+            .where(Suggestion.question_id == question_id)
+            .values(stale=True)
+        )
+
+
+async def claim_precompute_batch(
+    db: AsyncSession, limit: int, lease_seconds: float
+) -> list[int]:
+    """
+    Claim open questions whose stored suggestion is missing or stale.
+
+    Question rows are locked with ``FOR UPDATE SKIP LOCKED`` while the claims
+    are written, so concurrent workers never pick the same question; a claim
+    lapses after ``lease_seconds`` if its worker died. Escalated questions
+    come first, then the newest.
+    """
+    now = time.time()
+    result = await db.execute(
+        select(Question.id, SuggestionClaim)
+        .outerjoin(Suggestion, Suggestion.question_id == Question.id)
+        .outerjoin(SuggestionClaim, SuggestionClaim.question_id == Question.id)
+        .where(
+            Question.status.in_([QuestionStatus.PENDING, QuestionStatus.ESCALATED]),
+            or_(Suggestion.id.is_(None), Suggestion.stale),
+            or_(
+                SuggestionClaim.question_id.is_(None),
+                SuggestionClaim.claimed_until <= now,
+            ),
+        )
+        .order_by(
+            case((Question.status == QuestionStatus.ESCALATED, 0), else_=1),
+            desc(Question.created_at),
+            desc(Question.id),
+        )
+        .limit(limit)
+        .with_for_update(skip_locked=True, of=Question)
+    )
+    claimed = []
+    for question_id, claim in result.all():
+        if claim is None:
+            db.add(
+                SuggestionClaim(
+                    question_id=question_id, claimed_until=now + lease_seconds
+                )
+            )
+            claimed.append(question_id)
+            continue
+        # Re-check the expiry in the UPDATE: a worker that read the same
+        # lapsed claim may have renewed it since
+        renewed = await db.execute(
+            update(SuggestionClaim)
+            .where(
+                SuggestionClaim.question_id == question_id,
+                SuggestionClaim.claimed_until <= now,
+            )
+            .values(claimed_until=now + lease_seconds)
+        )
+        if renewed.rowcount:
+            claimed.append(question_id)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Another worker inserted a claim first; try again next pass
+        await db.rollback()
+        return []
+    return claimed
+
+
+async def release_precompute_claim(
+    db: AsyncSession, question_id: int, retry_at: Optional[float] = None
+) -> None:
+    """Drop a claim, or keep other workers away until ``retry_at``."""
+    if retry_at is None:
+        await db.execute(
+            delete(SuggestionClaim).where(SuggestionClaim.question_id == question_id)
+        )
+    else:
+        await db.execute(
+            update(SuggestionClaim)
+            .where(SuggestionClaim.question_id == question_id)
+            .values(claimed_until=retry_at)
+        )
+    await db.commit()
+
+
+class TokenBudget:
+    """Estimated LLM tokens that may be spent per rolling hour."""
+
+    def __init__(self, tokens_per_hour: int):
+        self.tokens_per_hour = tokens_per_hour
+        self.used = 0
+        self._window_start = time.monotonic()
+
+    def _roll(self) -> None:
+        if time.monotonic() - self._window_start >= 3600:
+            self._window_start = time.monotonic()
+            self.used = 0
+
+    def available(self) -> bool:
+        self._roll()
+        return self.used < self.tokens_per_hour
+
+    def spend(self, tokens: int) -> None:
+        self._roll()
+        self.used += tokens
+
+
+class SuggestionPrecomputer:
+    """
+    Generate suggestions for open questions before an admin asks.
+
+    Each pass claims questions that are PENDING or ESCALATED and whose stored
+    suggestion is missing or stale, so several workers can run without
+    generating for the same question. It generates with bounded concurrency
+    until the hourly token budget runs out; only calls that reach the provider
+    are charged. Questions whose generation failed are left claimed for
+    ``retry_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        concurrency: int = 2,
+        batch_size: int = 20,
+        poll_interval: float = 15.0,
+        tokens_per_hour: int = 200000,
+        retry_after: float = 600.0,
+        lease_seconds: float = 600.0,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.budget = TokenBudget(tokens_per_hour)
+        self.retry_after = retry_after
+        self.lease_seconds = lease_seconds
+        self._limit = asyncio.Semaphore(concurrency)
+
+    async def _generate(self, question_id: int) -> Optional[bool]:
+        """True if stored, False if generation failed, None if not attempted."""
+        if not self.budget.available():
+            return None
+
+        async with self.session_factory() as db:
+            question = await get_question_by_id(db, question_id)
+            if question is None or question.status == QuestionStatus.ANSWERED:
+                return None
+            previous_answers = answer_context(question.answers)
+            examples = await retrieve_similar(
+                db, question.message, exclude_question_id=question_id
+            )
+            fingerprint = suggestion_fingerprint(question.message, question.answers)
+
+        try:
+            suggestion = await get_or_generate_suggestion(
+                fingerprint,
+                question_message=question.message,
+                previous_answers=previous_answers,
+                examples=examples,
+                on_usage=self.budget.spend,
+            )
+        except CapacityExceeded:
+            return None  # interactive requests have the LLM busy; retry next pass
+        if not suggestion:
+            return False
+
+        async with self.session_factory() as db:
+            await save_suggestion(
+                db, question_id, fingerprint, suggestion, "precomputed"
+            )
+        await manager.broadcast(
+            "suggestion",
+            {"question_id": question_id, "suggested_answer": suggestion},
+        )
+        return True
+
+    async def _precompute(self, question_id: int) -> bool:
+        async with self._limit:
+            # If generation raises, the claim is left to lapse with its lease
+            stored = await self._generate(question_id)
+            retry_at = time.time() + self.retry_after if stored is False else None
+            async with self.session_factory() as db:
+                await release_precompute_claim(db, question_id, retry_at)
+        return bool(stored)
+
+    async def process_batch(self) -> int:
+        """Run one pass; returns the number of suggestions stored."""
+        if not self.budget.available():
+            return 0
+        async with self.session_factory() as db:
+            question_ids = await claim_precompute_batch(
+                db, self.batch_size, self.lease_seconds
+            )
+        results = await asyncio.gather(*(self._precompute(qid) for qid in question_ids))
+        return sum(results)
+
+    async def run(self) -> None:
+        """Pre-compute until cancelled."""
+        logger.info("Suggestion pre-computation started")
+        while True:
+            try:
+                stored = await self.process_batch()
+                if stored:
+                    logger.info(f"Pre-computed {stored} suggestions")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Suggestion pre-computation failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+
+def create_suggestion_precomputer(session_factory) -> SuggestionPrecomputer:
+    """Build a precomputer configured by the ``SUGGESTION_PRECOMPUTE_*`` settings."""
+    return SuggestionPrecomputer(
+        session_factory,
+        concurrency=settings.SUGGESTION_PRECOMPUTE_CONCURRENCY,
+        batch_size=settings.SUGGESTION_PRECOMPUTE_BATCH_SIZE,
+        poll_interval=settings.SUGGESTION_PRECOMPUTE_INTERVAL_SECONDS,
+        tokens_per_hour=settings.SUGGESTION_PRECOMPUTE_TOKENS_PER_HOUR,
+    )
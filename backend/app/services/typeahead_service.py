@@ -0,0 +1,234 @@
+"""Search-as-you-type over existing questions."""
+
+import logging
+import re
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import String, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import get_settings
+from app.models.question import Question, QuestionStatus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def word_trigrams(text: str) -> set[str]:
+    """
+    Trigrams of each word, with a leading space marking the word start.
+
+    "reset" gives " re", "res", "ese", "set", so a partly typed "rese" only
+    matches words that begin with it.
+    """
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = " " + word
+        for start in range(max(len(padded) - 2, 1)):
+            end = start + 3
+            grams.add(padded[start:end])
+    return grams
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index used when pg_trgm is not available.
+
+    Each trigram keeps a sorted array of question ids (new ids are nearly
+    always appended at the end), and the arrays are intersected rarest-first
+    with binary searches. Matches must contain every trigram of the query;
+    the most recent ``rank_window`` of them are ranked by how much of the
+    question the query covers.
+    """
+
+    def __init__(self, rank_window: int = 200):
+        self.rank_window = rank_window
+        self.clear()
+
+    def __len__(self) -> int:
+        return len(self._sizes) - len(self._removed)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self._sizes and question_id not in self._removed
+
+    def add(self, question_id: int, message: str) -> None:
+        if question_id in self._sizes:
+            return  # messages never change
+        grams = word_trigrams(message)
+        if not grams:
+            return
+        in_order = question_id > self._max_id
+        self._max_id = max(self._max_id, question_id)
+        self._sizes[question_id] = len(grams)
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("q")
+            if in_order:
+                postings.append(question_id)
+            else:
+                # Concurrent creates can commit out of id order; keep postings sorted
+                postings.insert(bisect_left(postings, question_id), question_id)
+
+    def remove(self, question_id: int) -> None:
+        if question_id in self._sizes:
+            self._removed.add(question_id)
+
+    def clear(self) -> None:
+        self._postings: dict[str, array] = {}
+        self._sizes: dict[int, int] = {}
+        self._removed: set[int] = set()
+        self._max_id = -1
+
+    def search(self, query: str, limit: int = 8) -> list[int]:
+        """Question ids matching ``query``, best first."""
+        grams = word_trigrams(query)
+        # A one-letter word still being typed has no full trigram yet
+        grams = {gram for gram in grams if len(gram) == 3} or grams
+        if not grams:
+            return []
+        postings = []
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is None:
+                return []
+            postings.append(ids)
+        postings.sort(key=len)
+
+        # Zero-copy views; nothing can append to the arrays while we search
+        matches = np.frombuffer(postings[0], dtype=np.int64)
+        for ids in postings[1:]:
+            if not len(matches):
+                return []
+            other = np.frombuffer(ids, dtype=np.int64)
+            positions = np.searchsorted(other, matches).clip(max=len(other) - 1)
+            matches = matches[other[positions] == matches]
+
+        start = max(len(matches) - self.rank_window - len(self._removed), 0)
+        tail = matches[start:].tolist()
+        recent = [i for i in reversed(tail) if i not in self._removed]
+        recent = recent[: self.rank_window]
+        recent.sort(key=lambda i: (len(grams) / self._sizes[i], i), reverse=True)
+        return recent[:limit]
+
+
+typeahead_index = TrigramIndex()
+_backend = "memory"
+
+
+@dataclass
+class TypeaheadMatch:
+    """An existing question matching what the user is typing."""
+
+    question_id: int
+    message: str
+    status: QuestionStatus
+
+
+def typeahead_backend() -> str:
+    """The backend in use: "pg_trgm" or "memory"."""
+    return _backend
+
+
+def index_question(question_id: int, message: str) -> None:
+    """Make a new question searchable (no-op when pg_trgm serves the queries)."""
+    if _backend == "memory":
+        typeahead_index.add(question_id, message)
+
+
+async def rebuild_typeahead_index(session_factory, batch_size: int = 5000) -> int:
+    """Load every question into the in-memory index; returns the number indexed."""
+    typeahead_index.clear()
+    last_id = 0
+    async with session_factory() as db:
+        while True:
+            result = await db.execute(
+                select(Question.id, Question.message)
+                .where(Question.id > last_id)
+                .order_by(Question.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            for row in rows:
+                typeahead_index.add(row.id, row.message)
+            last_id = rows[-1].id
+    logger.info(f"Typeahead index built with {len(typeahead_index)} questions")
+    return len(typeahead_index)
+
+
+async def setup_typeahead(engine: AsyncEngine, session_factory) -> str:
+    """
+    Pick the typeahead backend per ``TYPEAHEAD_BACKEND`` and prepare it.
+
+    On Postgres this creates the pg_trgm extension and a GiST trigram index on
+    ``questions.message``; if that fails (e.g. no permission to create the
+    extension) the in-memory index is used instead.
+    """
+    global _backend
+    _backend = "memory"
+    if settings.TYPEAHEAD_BACKEND != "memory" and engine.dialect.name == "postgresql":
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                await conn.execute(
+                    text(
+                        "CREATE INDEX IF NOT EXISTS ix_questions_message_trgm "
+                        "ON questions USING gist (message gist_trgm_ops)"
+                    )
+                )
+            _backend = "pg_trgm"
+        except Exception as e:
+            logger.error(
+                f"pg_trgm unavailable, using the in-memory typeahead index: {e}"
+            )
+
+    if _backend == "memory":
+        await rebuild_typeahead_index(session_factory)
+    else:
+        typeahead_index.clear()
+    logger.info(f"Typeahead backend: {_backend}")
+    return _backend
+
+
+async def search_questions(
+    db: AsyncSession, query: str, limit: Optional[int] = None
+) -> list[TypeaheadMatch]:
+    """Existing questions matching a partly typed ``query``, best first."""
+    limit = limit or settings.TYPEAHEAD_MAX_RESULTS
+    query = query.strip()
+    if len(query) < settings.TYPEAHEAD_MIN_CHARS:
+        return []
+
+    if _backend == "pg_trgm":
+        # word_similarity: how well the query matches some run of words in the message
+        term = literal(query, String)
+        result = await db.execute(
+            select(Question.id, Question.message, Question.status)
+            .where(term.op("<%")(Question.message))
+            .order_by(term.op("<<->")(Question.message), Question.id.desc())
+            .limit(limit)
+        )
+        return [TypeaheadMatch(row.id, row.message, row.status) for row in result]
+
+    question_ids = typeahead_index.search(query, limit)
+    if not question_ids:
+        return []
+    result = await db.execute(
+        select(Question.id, Question.message, Question.status).where(
+            Question.id.in_(question_ids)
+        )
+    )
+    rows = {row.id: row for row in result}
+    return [
+        TypeaheadMatch(question_id, rows[question_id].message, rows[question_id].status)
+        for question_id in question_ids
+        if question_id in rows
+    ]
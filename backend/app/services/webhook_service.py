@@ -0,0 +1,198 @@
+"""Webhook delivery over a shared, pooled HTTP client."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Stop calling an endpoint after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """Forget a call that ended without an outcome, freeing the trial slot."""
+        self._trial_in_flight = False
+
+
+@dataclass
+class WebhookSubscriber:
+    """A webhook endpoint and the events it wants."""
+
+    url: str
+    events: Optional[frozenset[str]] = None  # None = every event
+    max_concurrency: int = 4
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    def __post_init__(self):
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+
+    def wants(self, event: str) -> bool:
+        return self.events is None or event in self.events
+
+
+def load_subscribers() -> list[WebhookSubscriber]:
+    """Build subscribers from ``WEBHOOK_URL`` and ``WEBHOOK_SUBSCRIBERS``."""
+    specs = list(settings.WEBHOOK_SUBSCRIBERS)
+    if settings.WEBHOOK_URL:
+        specs.insert(0, {"url": settings.WEBHOOK_URL})
+
+    subscribers = []
+    for spec in specs:
+        events = spec.get("events")
+        subscribers.append(
+            WebhookSubscriber(
+                url=spec["url"],
+                events=frozenset(events) if events else None,
+                max_concurrency=int(spec.get("max_concurrency", 4)),
+                breaker=CircuitBreaker(
+                    settings.WEBHOOK_CIRCUIT_FAILURE_THRESHOLD,
+                    settings.WEBHOOK_CIRCUIT_RESET_SECONDS,
+                ),
+            )
+        )
+    return subscribers
+
+
+class WebhookDispatcher:
+    """Fans events out to subscribers over one keep-alive connection pool."""
+
+    def __init__(
+        self,
+        subscribers: list[WebhookSubscriber],
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.subscribers = {subscriber.url: subscriber for subscriber in subscribers}
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = settings.WEBHOOK_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(
+                    "WEBHOOK_HTTP2 set but 'h2' is not installed; using HTTP/1.1"
+                )
+                http2 = False
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            ),
+            transport=self._transport,
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def close(self) -> None:
+        """Close the pooled client (called from lifespan shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def targets(self, event: str) -> list[str]:
+        """URLs of subscribers interested in ``event``."""
+        return [
+            url
+            for url, subscriber in self.subscribers.items()
+            if subscriber.wants(event)
+        ]
+
+    async def deliver(self, url: str, event: str, data: dict) -> bool:
+        """POST one event to one subscriber, honouring its limit and breaker."""
+        subscriber = self.subscribers.get(url)
+        if subscriber is None:
+            logger.warning(
+                f"Webhook subscriber {url} is no longer configured, dropping"
+            )
+            return True
+
+        if not subscriber.breaker.allow():
+            logger.warning(f"Webhook circuit open for {url}, skipping '{event}'")
+            return False
+
+        try:
+            async with subscriber._limit:
+                response = await self.client.post(
+                    url, json={"event": event, "data": data}
+                )
+                response.raise_for_status()
+        except Exception as e:
+            subscriber.breaker.record_failure()
+            logger.error(f"Failed to send webhook '{event}' to {url}: {e}")
+            return False
+        except BaseException:
+            # Cancelled mid-call; a stuck trial flag would block the endpoint forever
+            subscriber.breaker.abandon()
+            raise
+
+        subscriber.breaker.record_success()
+        logger.info(f"Webhook '{event}' sent successfully to {url}")
+        return True
+
+    async def dispatch(self, event: str, data: dict) -> list[str]:
+        """Send ``event`` to interested subscribers concurrently; return failed URLs."""
+        urls = self.targets(event)
+        results = await asyncio.gather(
+            *(self.deliver(url, event, data) for url in urls)
+        )
+        return [url for url, ok in zip(urls, results) if not ok]
+
+
+webhook_dispatcher = WebhookDispatcher(load_subscribers())
@@ -2,18 +2,38 @@
 
 import json
 import logging
+import time
 from typing import Any
 
 from fastapi import WebSocket
 
+from app.core.metrics import registry
+from app.core.serialization import json_dumps
+
 logger = logging.getLogger(__name__)
 
+BROADCAST_SECONDS = registry.histogram(
+    "websocket_broadcast_seconds",
+    "Time to fan one event out to its recipients.",
+    ("event",),
+)
+BROADCAST_RECIPIENTS = registry.histogram(
+    "websocket_broadcast_recipients",
+    "Connections one event was sent to.",
+    ("event",),
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates."""
 
     def __init__(self):
         self.active_connections: list[WebSocket] = []
+        # question_id -> connections that asked for that question's live events
+        self.subscriptions: dict[int, set[WebSocket]] = {}
+        # Sends started by broadcasts but not yet completed
+        self.pending_sends = 0
 
     async def connect(self, websocket: WebSocket):
         """Accept and store a new WebSocket connection."""
@@ -25,22 +45,66 @@ class ConnectionManager:
         """Remove a WebSocket connection."""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+        for question_id in list(self.subscriptions):
+            self.unsubscribe(websocket, question_id)
         logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
 
+    def subscribe(self, websocket: WebSocket, question_id: int):
+        """Receive per-question events (e.g. suggestion chunks) for a question."""
+        self.subscriptions.setdefault(question_id, set()).add(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, question_id: int):
+        """Stop receiving per-question events for a question."""
+        subscribers = self.subscriptions.get(question_id)
+        if subscribers is None:
+            return
+        subscribers.discard(websocket)
+        if not subscribers:
+            del self.subscriptions[question_id]
+
+    def handle_message(self, websocket: WebSocket, raw: str):
+        """Apply a message such as ``{"action": "subscribe", "question_id": 1}``."""
+        try:
+            message = json.loads(raw)
+            action = message.get("action")
+            question_id = int(message["question_id"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            logger.debug(f"Ignoring WebSocket message: {raw}")
+            return
+
+        if action == "subscribe":
+            self.subscribe(websocket, question_id)
+        elif action == "unsubscribe":
+            self.unsubscribe(websocket, question_id)
+
     async def broadcast(self, event_type: str, data: Any):
         """Broadcast a message to all connected clients."""
-        message = json.dumps({
+        await self._send_all(self.active_connections, event_type, data)
+
+    async def send_to_question(self, question_id: int, event_type: str, data: Any):
+        """Send a message to the clients subscribed to a question."""
+        subscribers = list(self.subscriptions.get(question_id, ()))
+        await self._send_all(subscribers, event_type, data)
+
+    async def _send_all(self, connections: list[WebSocket], event_type: str, data: Any):
+        message = json_dumps({
             "type": event_type,
             "data": data,
-        })
+        }).decode("utf-8")
 
+        started = time.perf_counter()
+        self.pending_sends += len(connections)
         disconnected = []
-        for connection in self.active_connections:
+        for connection in connections:
             try:
                 await connection.send_text(message)
             except Exception as e:
                 logger.warning(f"Failed to send to connection: {e}")
                 disconnected.append(connection)
+            finally:
+                self.pending_sends -= 1
+        BROADCAST_SECONDS.observe(time.perf_counter() - started, event=event_type)
+        BROADCAST_RECIPIENTS.observe(len(connections), event=event_type)
 
         # Clean up disconnected connections
         for connection in disconnected:
@@ -53,3 +117,16 @@ class ConnectionManager:
 
 # Global connection manager instance
 manager = ConnectionManager()
+
+registry.gauge(
+    "websocket_connections", "Open WebSocket connections.",
+    callback=lambda: len(manager.active_connections),
+)
+registry.gauge(
+    "websocket_subscribed_questions", "Questions with live per-question subscribers.",
+    callback=lambda: len(manager.subscriptions),
+)
+registry.gauge(
+    "websocket_pending_sends", "Broadcast sends queued behind slower clients.",
+    callback=lambda: manager.pending_sends,
+)
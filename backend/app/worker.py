@@ -0,0 +1,59 @@
+"""Standalone worker for notification delivery and other background jobs.
+
+Run with ``python -m app.worker`` and set ``OUTBOX_WORKER_MODE=external`` on
+the web processes so deliveries never compete with request handling.
+"""
+
+import asyncio
+import logging
+
+from app.core.config import get_settings
+from app.db import AsyncSessionLocal, Base, engine
+from app.services.llm_provider import close_llm_provider
+from app.services.mail_transport import close_mail_transports
+from app.services.notification_service import email_digest
+from app.services.outbox_service import create_outbox_worker
+from app.services.retrieval_service import ensure_retrieval_index
+from app.services.suggestion_service import create_suggestion_precomputer
+from app.services.webhook_service import webhook_dispatcher
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+async def main() -> None:
+    """Run the outbox worker (and optional background jobs) until interrupted."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    workers = [create_outbox_worker(AsyncSessionLocal).run()]
+    if email_digest.enabled:
+        workers.append(email_digest.run(AsyncSessionLocal))
+    if settings.SUGGESTION_PRECOMPUTE_ENABLED:
+        if not settings.RAG_INDEX_DIR:
+            logger.warning(
+                "Pre-computed suggestions will use retrieval examples from this "
+                "worker's own index, which only changes on restart; set "
+                "RAG_INDEX_DIR to share the web processes' index"
+            )
+        await ensure_retrieval_index(AsyncSessionLocal)
+        workers.append(create_suggestion_precomputer(AsyncSessionLocal).run())
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        await webhook_dispatcher.close()
+        await close_mail_transports()
+        await close_llm_provider()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Notification worker stopped")
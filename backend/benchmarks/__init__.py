@@ -0,0 +1 @@
+"""Reproducible backend benchmarks: synthetic data generators and a runner."""
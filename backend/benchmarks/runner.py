@@ -0,0 +1,416 @@
+"""
+Run the backend benchmarks and compare them with a stored baseline.
+
+The app is driven in-process through httpx's ASGI transport against a
+freshly seeded database, so results measure the application and the
+database, not the network. Examples (from ``backend/``)::
+
+    python -m benchmarks.runner --shape small --output results.json
+    python -m benchmarks.runner --shape small --baseline results.json \
+        --fail-on-regression
+    python -m benchmarks.runner --database-url postgresql+asyncpg://... --shape medium
+
+The target database is dropped and recreated; never point it at real data.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.api.serializers import build_answer_tree
+from app.core.instrumentation import instrument_engine, record_queries
+from app.core.rate_limit import rate_limiter
+from app.core.security import create_access_token
+from app.db import get_db, get_session_factory
+from app.main import app
+from app.services.duplicate_service import DuplicateIndex
+from app.services.question_service import get_question_by_id
+from benchmarks.seed import (
+    SHAPES,
+    SeedResult,
+    SeedShape,
+    seed_database,
+    synthetic_questions,
+)
+
+SCENARIOS = (
+    "list_questions",
+    "get_question",
+    "create_new_answer",
+    "rate_answer",
+    "admin_stats",
+    "build_answer_tree",
+    "duplicate_lookup",
+)
+# In-process work without HTTP, measured one call at a time
+OFFLINE_SCENARIOS = ("build_answer_tree", "duplicate_lookup")
+
+# Compared against the baseline: (metric, True if higher is worse)
+GATED_METRICS = (("p50_ms", True), ("p95_ms", True), ("throughput_per_s", False))
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(
+    latencies: list[float], errors: int, elapsed: float, queries: int
+) -> dict:
+    """Latency percentiles (ms), throughput and queries per operation."""
+    ordered = sorted(latencies)
+    ops = len(ordered)
+    return {
+        "ops": ops,
+        "errors": errors,
+        "throughput_per_s": round(ops / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / ops * 1000, 3) if ops else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ops else 0.0,
+        "queries_per_op": round(queries / ops, 2) if ops else 0.0,
+    }
+
+
+async def measure(
+    op: Callable[[int], Awaitable[bool]], requests: int, concurrency: int, warmup: int
+) -> dict:
+    """Run ``op(i)`` ``requests`` times with bounded concurrency after a warmup."""
+    for i in range(warmup):
+        await op(-1 - i)
+
+    latencies: list[float] = []
+    errors = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with limit:
+            started = time.perf_counter()
+            ok = await op(i)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    with record_queries() as stats:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, errors, elapsed, stats.queries)
+
+
+class Workload:
+    """Scenario operations against one seeded database."""
+
+    def __init__(
+        self, client: AsyncClient, session_factory, seeded: SeedResult, seed: int
+    ):
+        self.client = client
+        self.session_factory = session_factory
+        self.seeded = seeded
+        self.rng = random.Random(seed)
+        token = create_access_token(data={"sub": str(seeded.admin_id), "role": "admin"})
+        self.admin_headers = {"Authorization": f"Bearer {token}"}
+        self.answerable = [qid for qid, ids in seeded.answer_ids.items() if ids]
+        self._last_vote: dict[int, str] = {}
+        self._vote_locks: dict[int, asyncio.Lock] = {}
+
+    async def list_questions(self, i: int) -> bool:
+        offset = self.rng.randrange(0, max(len(self.seeded.question_ids) - 50, 1))
+        response = await self.client.get(
+            "/api/v1/questions", params={"limit": 50, "offset": offset}
+        )
+        return response.status_code == 200
+
+    async def get_question(self, i: int) -> bool:
+        question_id = self.rng.choice(self.seeded.question_ids)
+        response = await self.client.get(f"/api/v1/questions/{question_id}")
+        return response.status_code == 200
+
+    async def create_new_answer(self, i: int) -> bool:
+        question_id = self.rng.choice(self.seeded.question_ids)
+        response = await self.client.post(
+            f"/api/v1/questions/{question_id}/answers",
+            json={"message": f"Benchmark answer {i}", "guest_name": "Bench"},
+        )
+        return response.status_code == 201
+
+    async def rate_answer(self, i: int) -> bool:
+        question_id = self.rng.choice(self.answerable)
+        answer_id = self.rng.choice(self.seeded.answer_ids[question_id])
+        # One admin may not repeat a vote, so alternate up/down per answer
+        async with self._vote_locks.setdefault(answer_id, asyncio.Lock()):
+            vote = "down" if self._last_vote.get(answer_id) == "up" else "up"
+            response = await self.client.post(
+                f"/api/v1/questions/{question_id}/answers/{answer_id}/rate",
+                json={"vote": vote},
+                headers=self.admin_headers,
+            )
+            if response.status_code == 200:
+                self._last_vote[answer_id] = vote
+        return response.status_code == 200
+
+    async def admin_stats(self, i: int) -> bool:
+        response = await self.client.get(
+            "/api/v1/admin/stats", headers=self.admin_headers
+        )
+        return response.status_code == 200
+
+    async def build_answer_tree_op(self) -> Callable[[int], Awaitable[bool]]:
+        """Tree building alone, over the answers of the busiest question."""
+        async with self.session_factory() as db:
+            question = await get_question_by_id(db, self.seeded.busiest_question_id)
+        answers = list(question.answers)
+
+        async def op(i: int) -> bool:
+            build_answer_tree(answers)
+            return True
+
+        return op
+
+    async def duplicate_lookup_op(self) -> Callable[[int], Awaitable[bool]]:
+        """Near-duplicate lookups of re-asks, one index entry per seeded question."""
+        texts = synthetic_questions(
+            len(self.seeded.question_ids), self.rng.randrange(2**32)
+        )
+        index = DuplicateIndex()
+        for question_id, text in enumerate(texts):
+            index.add(question_id, text)
+
+        async def op(i: int) -> bool:
+            question_id = self.rng.randrange(len(texts))
+            hits = index.find(texts[question_id] + " please")
+            return bool(hits) and hits[0][0] == question_id
+
+        return op
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmarks(
+    database_url: str,
+    shape: SeedShape,
+    scenarios: tuple[str, ...] = SCENARIOS,
+    requests: int = 300,
+    concurrency: int = 8,
+    warmup: int = 10,
+) -> dict:
+    """Seed ``database_url`` with ``shape``, then run ``scenarios`` and report them."""
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    engine_kwargs = {"poolclass": NullPool} if database_url.startswith("sqlite") else {}
+    engine = create_async_engine(database_url, **engine_kwargs)
+    instrument_engine(engine.sync_engine)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    seed_started = time.perf_counter()
+    seeded = await seed_database(engine, shape)
+    seed_seconds = time.perf_counter() - seed_started
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides.update(
+        {get_db: override_get_db, get_session_factory: lambda: session_factory}
+    )
+    rate_limiter_enabled, rate_limiter.enabled = rate_limiter.enabled, False
+    results = {}
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            workload = Workload(client, session_factory, seeded, shape.seed)
+            for name in scenarios:
+                if name in OFFLINE_SCENARIOS:
+                    op = await getattr(workload, f"{name}_op")()
+                    results[name] = await measure(op, requests, 1, warmup)
+                else:
+                    op = getattr(workload, name)
+                    results[name] = await measure(op, requests, concurrency, warmup)
+    finally:
+        app.dependency_overrides.clear()
+        app.dependency_overrides.update(previous_overrides)
+        rate_limiter.enabled = rate_limiter_enabled
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "shape": shape.as_dict(),
+            "seeded": {
+                "questions": len(seeded.question_ids),
+                "answers": seeded.answers,
+                "votes": seeded.votes,
+                "seconds": round(seed_seconds, 2),
+            },
+            "requests": requests,
+            "concurrency": concurrency,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.15) -> list[str]:
+    """
+    Regressions of ``current`` against ``baseline``, as readable lines.
+
+    Latency percentiles may grow and throughput may drop by at most
+    ``tolerance`` (a fraction); scenarios missing from either side are skipped.
+    """
+    regressions = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        for metric, higher_is_worse in GATED_METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def format_table(current: dict, baseline: Optional[dict] = None) -> str:
+    """Human-readable summary, with the change against the baseline when given."""
+    lines = [
+        f"{'scenario':<20}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+        f"{'queries':>9}{'errors':>8}"
+    ]
+    for name, r in current["scenarios"].items():
+        line = (
+            f"{name:<20}{r['throughput_per_s']:>10.1f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+            f"{r['queries_per_op']:>9.2f}{r['errors']:>8}"
+        )
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base and base.get("p95_ms"):
+            change = (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"]
+            line += f"   p95 {change:+.1%} vs baseline"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def build_shape(args: argparse.Namespace) -> SeedShape:
+    shape = SHAPES[args.shape]
+    overrides = {
+        key: value
+        for key, value in {
+            "questions": args.questions,
+            "answers": args.answers,
+            "reply_chains": args.reply_chains,
+            "reply_chain_depth": args.reply_chain_depth,
+            "votes_per_answer": args.votes_per_answer,
+            "seed": args.seed,
+        }.items()
+        if value is not None
+    }
+    return replace(shape, **overrides)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--database-url",
+        help="Database to seed and benchmark (default: temporary SQLite file)",
+    )
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="small")
+    parser.add_argument("--questions", type=int)
+    parser.add_argument(
+        "--answers",
+        help="Answers per question: fixed:N, uniform:LO-HI, poisson:MEAN, zipf:A",
+    )
+    parser.add_argument("--reply-chains", type=int)
+    parser.add_argument("--reply-chain-depth", type=int)
+    parser.add_argument("--votes-per-answer", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--output", help="Write the JSON results here (default: stdout)"
+    )
+    parser.add_argument("--baseline", help="Results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = (
+            args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        results = asyncio.run(
+            run_benchmarks(
+                database_url,
+                build_shape(args),
+                tuple(s.strip() for s in args.scenarios.split(",") if s.strip()),
+                requests=args.requests,
+                concurrency=args.concurrency,
+                warmup=args.warmup,
+            )
+        )
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+    print(format_table(results, baseline), file=sys.stderr)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Synthetic data generators for the benchmark suite."""
+
+import random
+import string
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.base import Base
+from app.models.answer import Answer
+from app.models.question import Question, QuestionStatus
+from app.models.user import User, UserRole
+from app.models.vote import Vote
+
+# bcrypt of "benchmark" at 4 rounds; seeded users never log in
+_PASSWORD_HASH = "$2b$04$w893CLcvCrjRlc2WSB80heJB2qUxvFl3W6l1POhVkWkXvCzQntyIa"
+
+_WORDS = (
+    "password reset login portal account email schedule keynote session room wifi "
+    "badge parking lunch speaker slides recording ticket refund venue hotel shuttle "
+    "certificate workshop registration survey app download export dashboard access"
+).split()
+
+
+@dataclass
+class SeedShape:
+    """
+    The data a benchmark runs against.
+
+    ``answers`` is a distribution spec for top-level answers per question:
+    ``fixed:N``, ``uniform:LO-HI``, ``poisson:MEAN`` or ``zipf:A`` (all capped
+    at ``max_answers``). ``reply_chains`` questions get ``reply_chain_depth``
+    nested replies under their first answer. Each answer receives a Poisson
+    number of votes with mean ``votes_per_answer`` from ``voters`` admins.
+    """
+
+    questions: int = 1000
+    answers: str = "poisson:4"
+    max_answers: int = 200
+    reply_chains: int = 20
+    reply_chain_depth: int = 10
+    votes_per_answer: float = 1.0
+    voters: int = 10
+    answered_fraction: float = 0.4
+    escalated_fraction: float = 0.05
+    seed: int = 42
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+SHAPES = {
+    "tiny": SeedShape(questions=50, reply_chains=3, reply_chain_depth=4, voters=3),
+    "small": SeedShape(questions=1000),
+    "medium": SeedShape(questions=20000, reply_chains=200),
+    "large": SeedShape(questions=100000, answers="zipf:1.8", reply_chains=1000),
+    "deep": SeedShape(
+        questions=500, answers="fixed:2", reply_chains=100, reply_chain_depth=200
+    ),
+    "hot": SeedShape(
+        questions=200, answers="uniform:100-400", max_answers=400, votes_per_answer=5.0
+    ),
+}
+
+
+@dataclass
+class SeedResult:
+    """Ids of the seeded rows the scenarios pick from."""
+
+    question_ids: list[int] = field(default_factory=list)
+    answer_ids: dict[int, list[int]] = field(
+        default_factory=dict
+    )  # question -> top-level answers
+    voter_ids: list[int] = field(default_factory=list)
+    admin_id: int = 0
+    answers: int = 0
+    votes: int = 0
+    busiest_question_id: int = 0
+
+
+def synthetic_questions(n: int, seed: int, vocab_size: int = 3000) -> list[str]:
+    """``n`` questions over a random vocabulary; only re-asks come out similar."""
+    rng = random.Random(seed)
+    vocab = [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+        for _ in range(vocab_size)
+    ]
+    return [
+        "How do I " + " ".join(rng.choice(vocab) for _ in range(6)) for _ in range(n)
+    ]
+
+
+def sample_answer_counts(
+    spec: str, n: int, cap: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Draw ``n`` answer counts from a distribution spec such as ``poisson:4``."""
+    kind, _, arg = spec.partition(":")
+    if kind == "fixed":
+        counts = np.full(n, int(arg))
+    elif kind == "uniform":
+        low, _, high = arg.partition("-")
+        counts = rng.integers(int(low), int(high) + 1, size=n)
+    elif kind == "poisson":
+        counts = rng.poisson(float(arg), size=n)
+    elif kind == "zipf":
+        counts = rng.zipf(float(arg), size=n) - 1
+    else:
+        raise ValueError(f"Unknown answer distribution '{spec}'")
+    return np.minimum(counts, cap).astype(int)
+
+
+def _sentence(rng: np.random.Generator, words: int) -> str:
+    return " ".join(rng.choice(_WORDS, size=words)).capitalize()
+
+
+async def _insert(conn, model, rows: list[dict], chunk: int = 5000) -> None:
+    for start in range(0, len(rows), chunk):
+        end = start + chunk
+        await conn.execute(insert(model), rows[start:end])
+
+
+async def seed_database(engine: AsyncEngine, shape: SeedShape) -> SeedResult:
+    """
+    Drop and recreate the schema, then fill it according to ``shape``.
+
+    Rows are bulk-inserted with explicit ids so the generators know every id
+    without reading them back; on Postgres the id sequences are moved past
+    them afterwards.
+    """
+    rng = np.random.default_rng(shape.seed)
+    result = SeedResult()
+    now = datetime.now(timezone.utc)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+        users = [
+            {
+                "id": i + 1,
+                "username": f"bench-admin-{i + 1}",
+                "email": f"bench-admin-{i + 1}@example.com",
+                "password_hash": _PASSWORD_HASH,
+                "role": UserRole.ADMIN,
+            }
+            for i in range(shape.voters + 1)
+        ]
+        await _insert(conn, User, users)
+        # The first admin is left for the benchmark client, so its votes are all new
+        result.admin_id = users[0]["id"]
+        result.voter_ids = [u["id"] for u in users[1:]]
+
+        statuses = rng.random(shape.questions)
+        questions = []
+        for i in range(shape.questions):
+            created = now - timedelta(minutes=shape.questions - i)
+            if statuses[i] < shape.answered_fraction:
+                status, answered_at = QuestionStatus.ANSWERED, created + timedelta(
+                    minutes=5
+                )
+            elif statuses[i] < shape.answered_fraction + shape.escalated_fraction:
+                status, answered_at = QuestionStatus.ESCALATED, None
+            else:
+                status, answered_at = QuestionStatus.PENDING, None
+            questions.append(
+                {
+                    "id": i + 1,
+                    "message": _sentence(rng, int(rng.integers(5, 16))) + "?",
+                    "guest_name": f"Guest {i % 97}",
+                    "status": status,
+                    "created_at": created,
+                    "updated_at": created,
+                    "escalated_at": (
+                        created if status == QuestionStatus.ESCALATED else None
+                    ),
+                    "answered_at": answered_at,
+                }
+            )
+        await _insert(conn, Question, questions)
+        result.question_ids = [q["id"] for q in questions]
+
+        counts = sample_answer_counts(
+            shape.answers, shape.questions, shape.max_answers, rng
+        )
+        chain_questions = (
+            set(
+                rng.choice(
+                    result.question_ids,
+                    size=min(shape.reply_chains, shape.questions),
+                    replace=False,
+                ).tolist()
+            )
+            if shape.reply_chain_depth
+            else set()
+        )
+
+        answers, votes = [], []
+        next_id = 1
+        for question_id, count in zip(result.question_ids, counts.tolist()):
+            if question_id in chain_questions:
+                count = max(count, 1)
+            top_level = []
+            for _ in range(count):
+                top_level.append(next_id)
+                answers.append(_answer_row(next_id, question_id, None, rng, now))
+                next_id += 1
+            if question_id in chain_questions:
+                parent = top_level[0]
+                for _ in range(shape.reply_chain_depth):
+                    answers.append(_answer_row(next_id, question_id, parent, rng, now))
+                    parent = next_id
+                    next_id += 1
+            result.answer_ids[question_id] = top_level
+
+        vote_counts = rng.poisson(shape.votes_per_answer, size=len(answers))
+        for answer, n_votes in zip(answers, vote_counts.tolist()):
+            voters = rng.choice(
+                result.voter_ids,
+                size=min(n_votes, len(result.voter_ids)),
+                replace=False,
+            )
+            for voter in voters.tolist():
+                vote_type = "up" if rng.random() < 0.7 else "down"
+                answer["upvotes" if vote_type == "up" else "downvotes"] += 1
+                votes.append(
+                    {
+                        "answer_id": answer["id"],
+                        "user_id": voter,
+                        "vote_type": vote_type,
+                    }
+                )
+
+        await _insert(conn, Answer, answers)
+        await _insert(conn, Vote, votes)
+        result.answers = len(answers)
+        result.votes = len(votes)
+
+        busiest = await conn.execute(
+            select(Answer.question_id)
+            .group_by(Answer.question_id)
+            .order_by(func.count(Answer.id).desc(), Answer.question_id)
+            .limit(1)
+        )
+        result.busiest_question_id = busiest.scalar() or result.question_ids[0]
+
+        if conn.dialect.name == "postgresql":
+            for table in ("users", "questions", "answers", "votes"):
+                await conn.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                    )
+                )
+    return result
+
+
+def _answer_row(
+    answer_id: int, question_id: int, parent_id, rng, now: datetime
+) -> dict:
+    return {
+        "id": answer_id,
+        "question_id": question_id,
+        "parent_id": parent_id,
+        "guest_name": "Bench guest",
+        "message": _sentence(rng, int(rng.integers(8, 40))) + ".",
+        "created_at": now,
+        "upvotes": 0,
+        "downvotes": 0,
+    }
@@ -10,8 +10,18 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.db import Base, get_db
+from app.core.instrumentation import instrument_engine
+from app.core.rate_limit import rate_limiter
+from app.core.security import create_access_token
+from app.db import Base, get_db, get_session_factory
 from app.main import app
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.services.auth_service import admin_recipients, create_user, principal_cache
+from app.services.duplicate_service import duplicate_index
+from app.services.rag_service import suggestion_cache
+from app.services.retrieval_service import flush_index_writes, retrieval_index
+from app.services.typeahead_service import typeahead_index
 
 # Use in-memory SQLite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -21,6 +31,7 @@ engine = create_async_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+instrument_engine(engine.sync_engine)
 
 TestAsyncSessionLocal = sessionmaker(
     engine,
@@ -51,6 +62,15 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
+    principal_cache.clear()
+    await rate_limiter.reset()
+    admin_recipients.invalidate()
+    await flush_index_writes()
+    retrieval_index.clear()
+    suggestion_cache.clear()
+    duplicate_index.clear()
+    typeahead_index.clear()
+
 
 @pytest_asyncio.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
@@ -60,6 +80,7 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestAsyncSessionLocal
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -68,3 +89,23 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
     app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def admin_user(db_session: AsyncSession) -> User:
+    """Create an admin user directly in the database."""
+    return await create_user(
+        db_session,
+        UserCreate(
+            username="fixtureadmin", email="fixture@test.com", password="password123"
+        ),
+    )
+
+
+@pytest_asyncio.fixture
+async def admin_headers(admin_user: User) -> dict[str, str]:
+    """Authorization headers carrying a valid admin token."""
+    token = create_access_token(
+        data={"sub": str(admin_user.id), "role": admin_user.role.value}
+    )
+    return {"Authorization": f"Bearer {token}"}
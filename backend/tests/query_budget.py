@@ -0,0 +1,21 @@
+"""Assert how many SQL statements a block of test code may run."""
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.instrumentation import RequestStats, record_queries
+
+
+@contextmanager
+def assert_max_queries(budget: int) -> Iterator[RequestStats]:
+    """
+    Fail if the block runs more than ``budget`` statements on instrumented engines.
+
+    The failure lists each statement fingerprint with its count, so an added
+    query or an N+1 loop is visible straight from the CI log.
+    """
+    with record_queries() as stats:
+        yield stats
+    assert (
+        stats.queries <= budget
+    ), f"Expected at most {budget} queries, ran {stats.queries}:\n{stats.summary()}"
@@ -0,0 +1,62 @@
+"""Minimal local SMTP server that records what it receives."""
+
+import asyncio
+
+
+class SMTPSink:
+    """Accepts any login and stores delivered messages in ``messages``."""
+
+    def __init__(self):
+        self.messages: list[tuple[str, list[str], str]] = []
+        self.connections = 0
+        self.logins = 0
+        self._server: asyncio.base_events.Server | None = None
+        self.port = 0
+
+    async def start(self) -> "SMTPSink":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        sender, recipients = "", []
+
+        async def reply(line: str) -> None:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 sink ready")
+        try:
+            while line := await reader.readline():
+                command = line.decode().rstrip("\r\n")
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("EHLO", "HELO"):
+                    await reply("250-sink\r\n250 AUTH PLAIN")
+                elif verb == "AUTH":
+                    self.logins += 1
+                    await reply("235 authenticated")
+                elif verb == "MAIL":
+                    sender, recipients = command[10:].strip("<>"), []
+                    await reply("250 ok")
+                elif verb == "RCPT":
+                    recipients.append(command[8:].strip("<>"))
+                    await reply("250 ok")
+                elif verb == "DATA":
+                    await reply("354 go ahead")
+                    data = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        data.append(chunk.decode())
+                    self.messages.append((sender, recipients, "".join(data)))
+                    await reply("250 queued")
+                elif verb == "QUIT":
+                    await reply("221 bye")
+                    break
+                else:  # NOOP, RSET
+                    await reply("250 ok")
+        finally:
+            writer.close()
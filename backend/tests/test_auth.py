@@ -1,23 +1,25 @@
 """Tests for authentication endpoints."""
 
+import time
+
 import pytest
 from httpx import AsyncClient
 
-from app.services.otp_service import _otp_storage
+from app.services.otp_service import otp_store
+from app.services.otp_store import OTPRecord
 
 
-def mock_email_verified(email: str):
+async def mock_email_verified(email: str):
     """Helper to mock email verification for tests."""
-    _otp_storage[email] = {
-        "otp": "1234",
-        "expires_at": None,
-        "verified": True,
-    }
+    await otp_store.put(
+        OTPRecord(email=email, otp="1234", expires_at=time.time() + 600, verified=True)
+    )
 
 
 def clear_otp_storage():
     """Clear OTP storage between tests."""
-    _otp_storage.clear()
+    otp_store._records.clear()
+    otp_store._expiry_heap.clear()
 
 
 @pytest.mark.asyncio
@@ -25,7 +27,7 @@ async def test_register_user(client: AsyncClient):
     """Test user registration with verified email."""
     clear_otp_storage()
     # Mock email verification
-    mock_email_verified("admin@test.com")
+    await mock_email_verified("admin@test.com")
 
     response = await client.post(
         "/api/v1/auth/register",
@@ -65,7 +67,7 @@ async def test_register_duplicate_email(client: AsyncClient):
     clear_otp_storage()
 
     # First registration with verified email
-    mock_email_verified("duplicate@test.com")
+    await mock_email_verified("duplicate@test.com")
     await client.post(
         "/api/v1/auth/register",
         json={
@@ -76,7 +78,7 @@ async def test_register_duplicate_email(client: AsyncClient):
     )
 
     # Second registration with same email (re-verify for the test)
-    mock_email_verified("duplicate@test.com")
+    await mock_email_verified("duplicate@test.com")
     response = await client.post(
         "/api/v1/auth/register",
         json={
@@ -95,7 +97,7 @@ async def test_login_success(client: AsyncClient):
     clear_otp_storage()
 
     # Register first with verified email
-    mock_email_verified("login@test.com")
+    await mock_email_verified("login@test.com")
     await client.post(
         "/api/v1/auth/register",
         json={
@@ -130,3 +132,96 @@ async def test_login_invalid_credentials(client: AsyncClient):
         },
     )
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_skips_user_lookup(
+    client: AsyncClient, db_session, admin_headers
+):
+    """Test that a cached principal is served without querying users again."""
+    from sqlalchemy import delete
+
+    from app.models.user import User
+
+    q_response = await client.post("/api/v1/questions", json={"message": "Cached?"})
+    question_id = q_response.json()["id"]
+
+    # First request resolves the principal from the database and caches it
+    response = await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ESCALATED"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+
+    # A bulk delete bypasses ORM events, so only a DB lookup would notice
+    await db_session.execute(delete(User))
+    await db_session.commit()
+
+    response = await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ANSWERED"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_invalidated_on_role_change(
+    client: AsyncClient, db_session, admin_user, admin_headers
+):
+    """Test that changing a user's role evicts their cached principal."""
+    from app.models.user import UserRole
+    from app.services.auth_service import get_user_by_id
+
+    q_response = await client.post("/api/v1/questions", json={"message": "Role?"})
+    question_id = q_response.json()["id"]
+
+    response = await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ESCALATED"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+
+    # The route released the shared session, so re-load the user before editing
+    user = await get_user_by_id(db_session, admin_user.id)
+    user.role = UserRole.USER
+    await db_session.commit()
+
+    response = await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ANSWERED"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_cost_factor(
+    client: AsyncClient, db_session, admin_user
+):
+    """Test that logging in upgrades a hash made with an old bcrypt cost."""
+    import bcrypt
+
+    from app.core.security import needs_rehash, password_hasher
+    from app.services.auth_service import get_user_by_id
+
+    user = await get_user_by_id(db_session, admin_user.id)
+    user.password_hash = bcrypt.hashpw(
+        b"password123", bcrypt.gensalt(rounds=4)
+    ).decode()
+    await db_session.commit()
+    assert needs_rehash(user.password_hash)
+
+    completed_before = password_hasher.stats.completed
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "fixture@test.com", "password": "password123"},
+    )
+    assert response.status_code == 200
+
+    # One verify plus one rehash ran on the pool
+    assert password_hasher.stats.completed == completed_before + 2
+    await db_session.refresh(user)
+    assert not needs_rehash(user.password_hash)
@@ -0,0 +1,65 @@
+"""Smoke test of the benchmark runner and its baseline comparison."""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from benchmarks.runner import SCENARIOS, compare, run_benchmarks
+from benchmarks.seed import SHAPES, sample_answer_counts
+
+
+def test_sample_answer_counts_is_reproducible_and_capped():
+    """Test that answer counts depend only on the seed and respect the cap."""
+    a = sample_answer_counts("zipf:1.5", 500, 20, np.random.default_rng(1))
+    b = sample_answer_counts("zipf:1.5", 500, 20, np.random.default_rng(1))
+    assert (a == b).all()
+    assert a.max() <= 20
+    with pytest.raises(ValueError):
+        sample_answer_counts("normal:3", 5, 20, np.random.default_rng(1))
+
+
+@pytest.mark.asyncio
+async def test_run_benchmarks_on_tiny_sqlite(tmp_path):
+    """Test that every scenario runs without errors against a seeded SQLite file."""
+    shape = replace(SHAPES["tiny"], questions=20)
+    results = await run_benchmarks(
+        f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}",
+        shape,
+        requests=6,
+        concurrency=2,
+        warmup=1,
+    )
+
+    assert results["meta"]["database"] == "sqlite"
+    assert results["meta"]["seeded"]["questions"] == 20
+    assert set(results["scenarios"]) == set(SCENARIOS)
+    for name, result in results["scenarios"].items():
+        assert result["ops"] == 6, name
+        assert result["errors"] == 0, name
+        assert (
+            result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+        )
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    """Test that latency and throughput changes beyond the tolerance are reported."""
+    baseline = {
+        "scenarios": {
+            "get_question": {"p50_ms": 10.0, "p95_ms": 20.0, "throughput_per_s": 100.0}
+        }
+    }
+    current = {
+        "scenarios": {
+            "get_question": {"p50_ms": 11.0, "p95_ms": 30.0, "throughput_per_s": 80.0},
+            "admin_stats": {"p50_ms": 50.0, "p95_ms": 90.0, "throughput_per_s": 10.0},
+        }
+    }
+
+    regressions = compare(current, baseline, tolerance=0.15)
+
+    assert regressions == [
+        "get_question.p95_ms: 20.0 -> 30.0 (+50.0%)",
+        "get_question.throughput_per_s: 100.0 -> 80.0 (-20.0%)",
+    ]
+    assert compare(current, baseline, tolerance=0.6) == []
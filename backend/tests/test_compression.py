@@ -0,0 +1,81 @@
+"""Tests for response compression middleware."""
+
+import gzip
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.core.compression import CompressionMiddleware
+
+
+async def big_json(request):
+    return JSONResponse({"rows": ["x" * 100] * 50})
+
+
+async def small_json(request):
+    return JSONResponse({"ok": True})
+
+
+async def big_text(request):
+    return PlainTextResponse("y" * 5000)
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(5):
+            yield f'{{"chunk": {i}}}\n'.encode()
+
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+def make_client() -> AsyncClient:
+    app = Starlette(
+        routes=[
+            Route("/big", big_json),
+            Route("/small", small_json),
+            Route("/text", big_text),
+            Route("/stream", stream),
+        ]
+    )
+    wrapped = CompressionMiddleware(
+        app, minimum_size=500, content_types=["application/json"]
+    )
+    return AsyncClient(transport=ASGITransport(app=wrapped), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped():
+    """Test that large allowlisted responses are compressed."""
+    async with make_client() as client:
+        response = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < 5000
+    assert response.json()["rows"][0] == "x" * 100
+
+
+@pytest.mark.asyncio
+async def test_small_and_non_allowlisted_responses_untouched():
+    """Test the minimum size threshold and content-type allowlist."""
+    async with make_client() as client:
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        text = await client.get("/text", headers={"Accept-Encoding": "gzip"})
+        identity = await client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in text.headers
+    assert "content-encoding" not in identity.headers
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_is_compressed_incrementally():
+    """Test that streamed bodies are compressed chunk by chunk."""
+    async with make_client() as client:
+        async with client.stream(
+            "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+        ) as response:
+            raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode().count("chunk") == 5
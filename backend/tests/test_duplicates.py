@@ -0,0 +1,101 @@
+"""Tests for near-duplicate question detection."""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.api.v1 import questions as questions_routes
+from app.models.question import Question
+from app.models.question_link import QuestionLink
+from app.services.duplicate_service import (
+    DuplicateIndex,
+    duplicate_index,
+    rebuild_duplicate_index,
+)
+from benchmarks.seed import synthetic_questions
+from tests.conftest import TestAsyncSessionLocal
+
+
+def test_duplicate_index_matches_rewordings_only():
+    """Test that re-asks are found, unrelated questions are not, and removal works."""
+    index = DuplicateIndex(threshold=0.5)
+    index.add(1, "How do I reset my password for the portal?")
+    index.add(2, "Where is the cafeteria located?")
+    index.add(3, "When does the keynote start?")
+
+    assert [
+        qid for qid, _ in index.find("how do i reset my password for the portal")
+    ] == [1]
+    assert [qid for qid, _ in index.find("What time does the keynote start?")] == [3]
+    assert index.find("Is there wifi in the hall?") == []
+
+    index.remove(1)
+    assert 1 not in index
+    assert index.find("How do I reset my password for the portal?") == []
+
+
+def test_duplicate_lookup_finds_the_original_in_a_large_index():
+    """Test that re-asks are matched to their original among many indexed questions."""
+    texts = synthetic_questions(10000, seed=7)
+    index = DuplicateIndex()
+    for question_id, text in enumerate(texts):
+        index.add(question_id, text)
+
+    for question_id in range(0, 10000, 100):
+        hits = index.find(texts[question_id] + " please")
+        assert hits and hits[0][0] == question_id
+
+
+@pytest.mark.asyncio
+async def test_create_question_returns_possible_duplicates(client: AsyncClient):
+    """Test that a re-asked question comes back with the original as a duplicate."""
+    first = await client.post(
+        "/api/v1/questions", json={"message": "How do I reset my password?"}
+    )
+    assert first.json()["possible_duplicates"] == []
+
+    response = await client.post(
+        "/api/v1/questions", json={"message": "how do I reset my password??"}
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert [d["id"] for d in data["possible_duplicates"]] == [first.json()["id"]]
+    assert data["possible_duplicates"][0]["similarity"] > 0.9
+    assert data["duplicate_of"] is None
+
+
+@pytest.mark.asyncio
+async def test_create_question_auto_links_duplicate(
+    client: AsyncClient, db_session, monkeypatch
+):
+    """Test that auto-linking records a link to the closest earlier question."""
+    monkeypatch.setattr(questions_routes.settings, "DUPLICATE_AUTO_LINK", True)
+    first = await client.post(
+        "/api/v1/questions", json={"message": "When does the keynote session start?"}
+    )
+    second = await client.post(
+        "/api/v1/questions",
+        json={"message": "When does the keynote session start today?"},
+    )
+    assert second.json()["duplicate_of"] == first.json()["id"]
+
+    links = (await db_session.execute(select(QuestionLink))).scalars().all()
+    assert [(link.question_id, link.duplicate_of_id) for link in links] == [
+        (second.json()["id"], first.json()["id"])
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_duplicate_index_from_database(db_session):
+    """Test that the index can be rebuilt from stored questions."""
+    db_session.add_all(
+        [
+            Question(message="Can I export my questions to CSV?"),
+            Question(message="Where can I download the mobile app?"),
+        ]
+    )
+    await db_session.commit()
+
+    assert await rebuild_duplicate_index(TestAsyncSessionLocal) == 2
+    hits = duplicate_index.find("Can I export my questions as CSV?")
+    assert len(hits) == 1
@@ -0,0 +1,72 @@
+"""Tests for the in-process metrics and the /metrics endpoint."""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.metrics import MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    """Test counters, callback gauges and cumulative histogram buckets."""
+    registry = MetricsRegistry()
+    sent = registry.counter("sent_total", "Messages sent.", ("channel",))
+    registry.gauge("queue_depth", "Items queued.", callback=lambda: 3)
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    sent.inc(channel="email")
+    sent.inc(2, channel="email")
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert "# TYPE sent_total counter" in text
+    assert 'sent_total{channel="email"} 3' in text
+    assert "queue_depth 3" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert latency.sum() == pytest.approx(5.55)
+
+    with pytest.raises(ValueError):
+        sent.inc(outcome="ok")
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_latency_and_db_queries(
+    client: AsyncClient,
+):
+    """Test that requests are recorded by route template with their DB usage."""
+    created = await client.post(
+        "/api/v1/questions", json={"message": "Metrics question"}
+    )
+    await client.get(f"/api/v1/questions/{created.json()['id']}")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        "http_request_duration_seconds_count{"
+        'method="GET",route="/api/v1/questions/{question_id}",status="200"}'
+    ) in text
+    assert 'http_request_db_queries_count{route="/api/v1/questions"}' in text
+    assert "db_queries_total" in text
+    assert "websocket_connections 0" in text
+    assert "llm_calls_active 0" in text
+    assert "password_hash_queued" in text
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_does_not_leave_its_start_time_behind(db_session):
+    """Test that a statement that raises doesn't skew later query timings."""
+    with pytest.raises(OperationalError):
+        await db_session.execute(text("SELECT * FROM missing_table"))
+    await db_session.rollback()
+    await db_session.execute(text("SELECT 1"))
+
+    connection = await db_session.connection()
+    assert connection.sync_connection.info["query_started"] == []
@@ -0,0 +1,472 @@
+"""Tests for the notification pipeline."""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+from app.models.outbox import NotificationOutbox
+from app.models.user import User, UserRole
+from app.schemas.user import UserCreate
+from app.services.auth_service import admin_recipients, create_user, get_user_by_id
+from app.services.mail_transport import MailTransport, PartialDeliveryError
+from app.services.notification_service import escalated_event
+from tests.conftest import TestAsyncSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_admin_recipients_cached_until_users_change(db_session, admin_user):
+    """Test that admin recipients are served from cache until a user write."""
+    assert await admin_recipients.get(TestAsyncSessionLocal) == ["fixture@test.com"]
+
+    # Bulk deletes bypass ORM events: a cached list must not notice
+    await db_session.execute(delete(User))
+    await db_session.commit()
+    assert await admin_recipients.get(TestAsyncSessionLocal) == ["fixture@test.com"]
+
+    # Creating a user refreshes the list
+    await create_user(
+        db_session,
+        UserCreate(username="second", email="second@test.com", password="password123"),
+    )
+    assert await admin_recipients.get(TestAsyncSessionLocal) == ["second@test.com"]
+
+
+@pytest.mark.asyncio
+async def test_admin_recipients_refreshed_on_role_change(db_session, admin_user):
+    """Test that demoting an admin removes them from the recipient list."""
+    assert await admin_recipients.get(TestAsyncSessionLocal) == ["fixture@test.com"]
+
+    user = await get_user_by_id(db_session, admin_user.id)
+    user.role = UserRole.USER
+    await db_session.commit()
+
+    assert await admin_recipients.get(TestAsyncSessionLocal) == []
+
+
+@pytest.mark.asyncio
+async def test_admin_recipients_expire_for_writes_from_other_processes(
+    db_session, admin_user, monkeypatch
+):
+    """Test that user changes invisible to ORM events are seen once the TTL passes."""
+    assert await admin_recipients.get(TestAsyncSessionLocal) == ["fixture@test.com"]
+
+    # Another process deleting users fires no events here
+    await db_session.execute(delete(User))
+    await db_session.commit()
+    assert await admin_recipients.get(TestAsyncSessionLocal) == ["fixture@test.com"]
+
+    expired = time.monotonic() + admin_recipients.ttl + 1
+    monkeypatch.setattr("app.services.auth_service.time.monotonic", lambda: expired)
+    assert await admin_recipients.get(TestAsyncSessionLocal) == []
+
+
+@pytest.mark.asyncio
+async def test_status_change_writes_outbox_entries(
+    client, db_session, admin_headers, monkeypatch
+):
+    """Test that answering a question queues its notifications in the outbox."""
+    from app.services.webhook_service import WebhookSubscriber, webhook_dispatcher
+
+    url = "http://hooks.test/qs"
+    monkeypatch.setattr(
+        webhook_dispatcher, "subscribers", {url: WebhookSubscriber(url)}
+    )
+
+    q_response = await client.post("/api/v1/questions", json={"message": "Outbox?"})
+    question_id = q_response.json()["id"]
+    response = await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ANSWERED"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+
+    entries = (await db_session.execute(select(NotificationOutbox))).scalars().all()
+    assert [(e.event, e.channel, e.target, e.status) for e in entries] == [
+        ("question_answered", "webhook", url, "PENDING")
+    ]
+    assert entries[0].payload["question_id"] == question_id
+
+
+@pytest.mark.asyncio
+async def test_outbox_worker_retries_with_backoff(db_session, monkeypatch):
+    """Test that failed deliveries are retried later and then marked sent."""
+    from app.services import outbox_service
+
+    outcomes = iter([False, True])
+    delivered = []
+
+    async def fake_deliver(channel, event, payload, target=None):
+        delivered.append((channel, event))
+        return next(outcomes)
+
+    monkeypatch.setattr(outbox_service, "deliver_notification", fake_deliver)
+
+    db_session.add(
+        NotificationOutbox(
+            event="question_escalated",
+            channel="email",
+            payload={"question_id": 1},
+            status="PENDING",
+            attempts=0,
+            next_attempt_at=time.time(),
+        )
+    )
+    await db_session.commit()
+
+    worker = outbox_service.OutboxWorker(TestAsyncSessionLocal)
+    assert await worker.process_batch() == 1
+
+    async with TestAsyncSessionLocal() as db:
+        entry = (await db.execute(select(NotificationOutbox))).scalar_one()
+        assert entry.status == "PENDING"
+        assert entry.attempts == 1
+        assert entry.next_attempt_at > time.time()
+        assert entry.last_error == "delivery failed"
+
+        # Not due yet: nothing is claimed
+        assert await worker.process_batch() == 0
+
+        entry.next_attempt_at = time.time() - 1
+        await db.commit()
+
+    assert await worker.process_batch() == 1
+    async with TestAsyncSessionLocal() as db:
+        entry = (await db.execute(select(NotificationOutbox))).scalar_one()
+        assert entry.status == "SENT"
+    assert delivered == [("email", "question_escalated")] * 2
+
+
+def make_dispatcher(handler, subscribers):
+    """Dispatcher whose HTTP calls are served by ``handler``."""
+    from app.services.webhook_service import WebhookDispatcher
+
+    return WebhookDispatcher(subscribers, transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_webhook_fan_out_respects_event_filters():
+    """Test that events only reach subscribers that asked for them."""
+    from app.services.webhook_service import WebhookSubscriber
+
+    received = []
+
+    def handler(request):
+        received.append(str(request.url))
+        return httpx.Response(200)
+
+    dispatcher = make_dispatcher(
+        handler,
+        [
+            WebhookSubscriber("http://all.test/"),
+            WebhookSubscriber(
+                "http://urgent.test/", events=frozenset({"question_escalated"})
+            ),
+        ],
+    )
+
+    assert await dispatcher.dispatch("question_answered", {"question_id": 1}) == []
+    assert await dispatcher.dispatch("question_escalated", {"question_id": 1}) == []
+    await dispatcher.close()
+
+    assert sorted(received) == [
+        "http://all.test/",
+        "http://all.test/",
+        "http://urgent.test/",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_webhook_circuit_breaker_isolates_failing_endpoint():
+    """Test that a failing receiver is short-circuited without affecting others."""
+    from app.services.webhook_service import CircuitBreaker, WebhookSubscriber
+
+    calls = {"http://down.test/": 0, "http://up.test/": 0}
+
+    def handler(request):
+        calls[str(request.url)] += 1
+        return httpx.Response(500 if request.url.host == "down.test" else 200)
+
+    dispatcher = make_dispatcher(
+        handler,
+        [
+            WebhookSubscriber(
+                "http://down.test/", breaker=CircuitBreaker(2, reset_timeout=60)
+            ),
+            WebhookSubscriber("http://up.test/"),
+        ],
+    )
+
+    for _ in range(4):
+        failed = await dispatcher.dispatch("question_answered", {"question_id": 1})
+        assert failed == ["http://down.test/"]
+    await dispatcher.close()
+
+    # The circuit opened after two failures; later events skip the endpoint
+    assert calls == {"http://down.test/": 2, "http://up.test/": 4}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_lets_the_next_call_through():
+    """Test that cancelling the trial call doesn't leave the circuit stuck open."""
+    from app.services.webhook_service import CircuitBreaker, WebhookSubscriber
+
+    started, calls = asyncio.Event(), []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 2:
+            started.set()
+            await asyncio.sleep(60)
+        return httpx.Response(500 if len(calls) == 1 else 200)
+
+    breaker = CircuitBreaker(1, reset_timeout=0)
+    dispatcher = make_dispatcher(
+        handler, [WebhookSubscriber("http://flaky.test/", breaker=breaker)]
+    )
+    # One failure opens the circuit, which is immediately half-open
+    assert not await dispatcher.deliver("http://flaky.test/", "ping", {})
+
+    trial = asyncio.create_task(dispatcher.deliver("http://flaky.test/", "ping", {}))
+    await started.wait()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert await dispatcher.deliver("http://flaky.test/", "ping", {})
+    assert breaker.state == "closed"
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_smtp_transport_reuses_pooled_connections():
+    """Test that SMTP deliveries share authenticated connections across calls."""
+    from app.services.mail_transport import EmailMessage, SMTPTransport
+    from tests.smtp_sink import SMTPSink
+
+    sink = await SMTPSink().start()
+    transport = SMTPTransport(
+        "127.0.0.1", sink.port, "user", "secret", start_tls=False, pool_size=2
+    )
+    try:
+        messages = [
+            EmailMessage(
+                to=f"admin{i}@test.com", subject="Escalated", body="hi", sender="a@b.c"
+            )
+            for i in range(10)
+        ]
+        await transport.send(messages)
+        await transport.send(messages[:3])
+    finally:
+        await transport.close()
+        await sink.stop()
+
+    assert len(sink.messages) == 13
+    delivered = sorted(recipients[0] for _, recipients, _ in sink.messages[:10])
+    assert delivered == sorted(m.to for m in messages)
+    # Two lanes for the first batch; the second batch reuses them
+    assert sink.connections == 2
+    assert sink.logins == 2
+
+
+@pytest.mark.asyncio
+async def test_resend_transport_batches_off_event_loop(monkeypatch):
+    """Test that Resend deliveries go through the batch API in chunks."""
+    import resend
+
+    from app.services.mail_transport import EmailMessage, ResendTransport
+
+    calls = []
+    monkeypatch.setattr(resend.Batch, "send", lambda params: calls.append(params))
+
+    messages = [
+        EmailMessage(to=f"admin{i}@test.com", subject="s", body="b", sender="a@b.c")
+        for i in range(205)
+    ]
+    assert await ResendTransport("key").send(messages)
+    assert [len(batch) for batch in calls] == [100, 100, 5]
+
+
+@pytest.mark.asyncio
+async def test_resend_transport_reports_batches_sent_before_a_failure(monkeypatch):
+    """Test that a failing batch reports the messages earlier batches delivered."""
+    import resend
+
+    from app.services.mail_transport import (
+        EmailMessage,
+        PartialDeliveryError,
+        ResendTransport,
+    )
+
+    calls = []
+
+    def send(params):
+        if calls:
+            raise RuntimeError("Resend is down")
+        calls.append(params)
+
+    monkeypatch.setattr(resend.Batch, "send", send)
+    messages = [
+        EmailMessage(to=f"admin{i}@test.com", subject="s", body="b", sender="a@b.c")
+        for i in range(150)
+    ]
+    with pytest.raises(PartialDeliveryError) as exc:
+        await ResendTransport("key").send(messages)
+    assert exc.value.sent == messages[:100]
+
+
+class StubTransport(MailTransport):
+    """Accepts the first ``accept`` messages of each send, then fails."""
+
+    def __init__(self, name: str, mailed: list, accept: int = 1000):
+        self.name = name
+        self.mailed = mailed
+        self.accept = accept
+
+    async def send(self, messages):
+        self.mailed.extend((self.name, m.to) for m in messages[: self.accept])
+        if len(messages) > self.accept:
+            error = RuntimeError(f"{self.name} is down")
+            if self.accept:
+                raise PartialDeliveryError(messages[: self.accept], error)
+            raise error
+        return True
+
+
+@pytest.mark.asyncio
+async def test_partial_email_failure_never_mails_a_recipient_twice(monkeypatch):
+    """Test that the SMTP fallback and retries skip recipients already reached."""
+    from app.services import notification_service
+
+    admins = ["a@test.com", "b@test.com", "c@test.com"]
+    mailed = []
+
+    async def get_admins():
+        return admins
+
+    monkeypatch.setattr(notification_service, "get_admin_recipients", get_admins)
+    monkeypatch.setattr(
+        notification_service,
+        "get_mail_transports",
+        lambda: [
+            StubTransport("resend", mailed, accept=1),
+            StubTransport("smtp", mailed, accept=1),
+        ],
+    )
+    payload = escalated_event(1, "help", "Guest", "now")
+    assert not await notification_service.deliver_notification(
+        "email", "question_escalated", payload
+    )
+    # SMTP only got what Resend hadn't sent; progress is kept for the retry
+    assert mailed == [("resend", "a@test.com"), ("smtp", "b@test.com")]
+    assert payload["sent_to"] == ["a@test.com", "b@test.com"]
+
+    monkeypatch.setattr(
+        notification_service,
+        "get_mail_transports",
+        lambda: [StubTransport("resend", mailed)],
+    )
+    assert await notification_service.deliver_notification(
+        "email", "question_escalated", payload
+    )
+    assert mailed[2:] == [("resend", "c@test.com")]
+
+
+async def digested_statuses() -> list[str]:
+    async with TestAsyncSessionLocal() as db:
+        result = await db.execute(
+            select(NotificationOutbox.status).order_by(NotificationOutbox.id)
+        )
+        return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_email_digest_groups_and_dedupes(db_session, admin_user, monkeypatch):
+    """Test that digested entries become one deduplicated summary, acked once sent."""
+    from app.services import notification_service, outbox_service
+    from app.services.notification_service import (
+        EmailDigest,
+        answered_event,
+        escalated_event,
+    )
+
+    digest = EmailDigest(window=60, exempt_events=frozenset({"question_escalated"}))
+    monkeypatch.setattr(notification_service, "email_configured", lambda: True)
+    monkeypatch.setattr(outbox_service, "email_digest", digest)
+    sent = []
+
+    async def fake_send(to_emails, subject, body):
+        # Nothing is acknowledged until the summary has gone out
+        assert set(await digested_statuses()) == {"PROCESSING", "PENDING"}
+        sent.append((to_emails, subject, body))
+        return to_emails
+
+    monkeypatch.setattr(notification_service, "send_email", fake_send)
+
+    for question_id in range(1, 31):
+        for answers_count in (1, 2):  # repeated updates for the same question
+            outbox_service.enqueue_notification(
+                db_session,
+                "question_answered",
+                answered_event(question_id, "msg", "now", answers_count),
+            )
+    outbox_service.enqueue_notification(
+        db_session, "question_escalated", escalated_event(99, "help", "Guest", "now")
+    )
+    await db_session.commit()
+    assert (await digested_statuses()).count("DIGESTED") == 60
+
+    assert await digest.flush(TestAsyncSessionLocal) == 60
+    [(to_emails, subject, body)] = sent
+    assert to_emails == ["fixture@test.com"]
+    assert subject == "[QuerySync] 30 question updates"
+    assert body.count("#1 (2 answers)") == 1 and "(1 answers)" not in body
+    # The exempt escalation is left to the delivery worker
+    assert sorted(set(await digested_statuses())) == ["PENDING", "SENT"]
+
+
+@pytest.mark.asyncio
+async def test_email_digest_keeps_events_when_send_fails(
+    db_session, admin_user, monkeypatch
+):
+    """Test that a failed digest send leaves its entries queued for the next flush."""
+    from app.services import notification_service
+    from app.services.notification_service import EmailDigest, answered_event
+
+    sent = []
+
+    async def flaky_send(to_emails, subject, body):
+        # The first flush reaches only one of the two admins
+        reached = to_emails if sent else to_emails[:1]
+        sent.append(reached)
+        return reached
+
+    await create_user(
+        db_session,
+        UserCreate(username="second", email="second@test.com", password="password123"),
+    )
+    monkeypatch.setattr(notification_service, "email_configured", lambda: True)
+    monkeypatch.setattr(notification_service, "send_email", flaky_send)
+
+    db_session.add(
+        NotificationOutbox(
+            event="question_answered",
+            channel="email",
+            payload=answered_event(1, "msg", "now", 1),
+            status="DIGESTED",
+            attempts=0,
+            next_attempt_at=time.time(),
+        )
+    )
+    await db_session.commit()
+
+    digest = EmailDigest(window=60)
+    assert await digest.flush(TestAsyncSessionLocal) == 0
+    assert await digested_statuses() == ["DIGESTED"]
+    assert await digest.flush(TestAsyncSessionLocal) == 1
+    assert await digested_statuses() == ["SENT"]
+    # The retry only mailed the admin the first flush missed
+    assert sent == [["fixture@test.com"], ["second@test.com"]]
@@ -0,0 +1,67 @@
+"""Tests for OTP verification and storage backends."""
+
+import time
+
+import pytest
+
+from app.services import otp_service
+from app.services.otp_store import DatabaseOTPStore, InMemoryOTPStore, OTPRecord
+from tests.conftest import TestAsyncSessionLocal
+
+
+@pytest.mark.asyncio
+async def test_memory_store_sweeps_and_stays_bounded():
+    """Test that expired entries are swept and capacity is enforced."""
+    store = InMemoryOTPStore(max_entries=3)
+    now = time.time()
+    await store.put(OTPRecord(email="old@test.com", otp="1111", expires_at=now - 1))
+    await store.put(OTPRecord(email="a@test.com", otp="2222", expires_at=now + 60))
+
+    assert await store.sweep() == 1
+    assert await store.get("old@test.com") is None
+
+    for i in range(10):
+        await store.put(
+            OTPRecord(email=f"spam{i}@test.com", otp="0000", expires_at=now + 100 + i)
+        )
+    assert len(store) == 3
+    # The most recently issued codes survive
+    assert await store.get("spam9@test.com") is not None
+
+
+@pytest.mark.asyncio
+async def test_verify_otp_locks_out_after_max_attempts(monkeypatch):
+    """Test that repeated wrong codes invalidate the OTP."""
+    store = InMemoryOTPStore()
+    monkeypatch.setattr(otp_service, "otp_store", store)
+    await store.put(
+        OTPRecord(email="user@test.com", otp="1234", expires_at=time.time() + 60)
+    )
+
+    for _ in range(otp_service.settings.OTP_MAX_ATTEMPTS - 1):
+        success, message = await otp_service.verify_otp("user@test.com", "0000")
+        assert not success and message.startswith("Invalid OTP")
+
+    success, message = await otp_service.verify_otp("user@test.com", "0000")
+    assert not success and "Too many" in message
+
+    # Even the right code fails once locked out
+    success, _ = await otp_service.verify_otp("user@test.com", "1234")
+    assert not success
+
+
+@pytest.mark.asyncio
+async def test_database_store_round_trip(db_session):
+    """Test the shared database-backed store."""
+    store = DatabaseOTPStore(TestAsyncSessionLocal)
+    now = time.time()
+    await store.put(OTPRecord(email="db@test.com", otp="4321", expires_at=now + 60))
+    await store.put(OTPRecord(email="gone@test.com", otp="9999", expires_at=now - 1))
+
+    assert await store.record_failed_attempt("db@test.com") == 1
+    await store.mark_verified("db@test.com", now + 120)
+    record = await store.get("db@test.com")
+    assert record.verified and record.attempts == 1
+
+    assert await store.sweep() == 1
+    assert await store.get("gone@test.com") is None
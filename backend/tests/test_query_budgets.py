@@ -0,0 +1,129 @@
+"""Query budgets per endpoint and the per-request query instrumentation."""
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from app.core.instrumentation import MetricsMiddleware, statement_fingerprint
+from tests.conftest import TestAsyncSessionLocal
+from tests.query_budget import assert_max_queries
+
+
+def test_statement_fingerprint_normalises_literals_and_in_lists():
+    """Test that executions of one query with different values share a fingerprint."""
+    a = statement_fingerprint(
+        "SELECT * FROM answers WHERE id IN ($1::INTEGER, $2::INTEGER) AND x = 'a'"
+    )
+    b = statement_fingerprint(
+        "SELECT  *  FROM answers WHERE id IN ($1::INTEGER) AND x = 'b'"
+    )
+    assert a == b == "SELECT * FROM answers WHERE id IN (...) AND x = ?"
+
+
+@pytest.mark.asyncio
+async def test_question_endpoints_query_budgets(client: AsyncClient):
+    """Test that the question endpoints stay within their query budgets."""
+    with assert_max_queries(2):
+        created = await client.post(
+            "/api/v1/questions", json={"message": "Budget question"}
+        )
+    question_id = created.json()["id"]
+
+    with assert_max_queries(1):
+        await client.get("/api/v1/questions")
+    with assert_max_queries(2):
+        await client.get(f"/api/v1/questions/{question_id}")
+    with assert_max_queries(1):
+        await client.get("/api/v1/questions/typeahead", params={"q": "budget"})
+
+
+@pytest.mark.asyncio
+async def test_question_feed_counts_answers_without_loading_them(
+    client: AsyncClient, admin_headers: dict
+):
+    """Test that the feed and status changes count answers in SQL."""
+    created = await client.post("/api/v1/questions", json={"message": "Busy question"})
+    question_id = created.json()["id"]
+    for n in range(3):
+        await client.post(
+            f"/api/v1/questions/{question_id}/answers", json={"message": f"A{n}"}
+        )
+
+    with assert_max_queries(1) as listed:
+        feed = await client.get("/api/v1/questions")
+    with assert_max_queries(5) as updated:
+        changed = await client.patch(
+            f"/api/v1/questions/{question_id}/status",
+            json={"status": "ESCALATED"},
+            headers=admin_headers,
+        )
+
+    assert feed.json()[0]["answers_count"] == 3
+    assert changed.json()["answers_count"] == 3
+    for stats in (listed, updated):
+        assert not any(
+            fp.startswith("SELECT answers.") for fp in stats.statements
+        ), stats.summary()
+
+
+@pytest.mark.asyncio
+async def test_answer_endpoints_query_budgets(client: AsyncClient, admin_headers: dict):
+    """Test that creating an answer checks the question exists without its answers."""
+    created = await client.post(
+        "/api/v1/questions", json={"message": "Budget question"}
+    )
+    question_id = created.json()["id"]
+
+    with assert_max_queries(2) as stats:
+        answer = await client.post(
+            f"/api/v1/questions/{question_id}/answers", json={"message": "Top-level"}
+        )
+    assert answer.status_code == 201
+    assert not any(
+        "FROM answers WHERE answers.question_id" in fp for fp in stats.statements
+    )
+
+    with assert_max_queries(3):
+        await client.post(
+            f"/api/v1/questions/{question_id}/answers",
+            json={"message": "Reply", "parent_id": answer.json()["id"]},
+        )
+
+    with assert_max_queries(5):
+        await client.patch(
+            f"/api/v1/questions/{question_id}/status",
+            json={"status": "ANSWERED"},
+            headers=admin_headers,
+        )
+
+
+@pytest.mark.asyncio
+async def test_middleware_reports_queries_and_flags_n_plus_one(db_session, caplog):
+    """Test the debug headers and the N+1 warning for a statement repeated in a loop."""
+    app = FastAPI()
+
+    @app.get("/items/{count}")
+    async def items(count: int):
+        async with TestAsyncSessionLocal() as db:
+            for i in range(count):
+                await db.execute(text("SELECT :i"), {"i": i})
+        return {"ok": True}
+
+    instrumented = MetricsMiddleware(app, debug_headers=True, n_plus_one_threshold=5)
+    async with AsyncClient(
+        transport=ASGITransport(app=instrumented), base_url="http://test"
+    ) as ac:
+        with caplog.at_level(logging.WARNING, logger="app.core.instrumentation"):
+            few = await ac.get("/items/2")
+            many = await ac.get("/items/6")
+
+    assert few.headers["X-DB-Queries"] == "2"
+    assert many.headers["X-DB-Queries"] == "6"
+    assert float(many.headers["X-DB-Time-Ms"]) >= 0
+    warnings = [
+        r.getMessage() for r in caplog.records if "Possible N+1" in r.getMessage()
+    ]
+    assert warnings == ["Possible N+1 in GET /items/{count}: 6x SELECT ?"]
@@ -103,3 +103,53 @@ async def test_get_nonexistent_question(client: AsyncClient):
     """Test getting a question that doesn't exist."""
     response = await client.get("/api/v1/questions/99999")
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_guest_request_opens_no_auth_session(client: AsyncClient):
+    """Test that guests never acquire a session for principal resolution."""
+    from app.db import get_session_factory
+    from app.main import app
+
+    def fail_factory():
+        raise AssertionError("guest request opened an auth session")
+
+    app.dependency_overrides[get_session_factory] = lambda: fail_factory
+
+    response = await client.post(
+        "/api/v1/questions",
+        json={"message": "Guest question"},
+    )
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_fast_json_matches_validated_response(client: AsyncClient, monkeypatch):
+    """Test that the fast response path emits the same JSON as response_model."""
+    from app.api import serializers
+
+    create_response = await client.post(
+        "/api/v1/questions",
+        json={"message": "Thread question"},
+    )
+    question_id = create_response.json()["id"]
+    top = await client.post(
+        f"/api/v1/questions/{question_id}/answers",
+        json={"message": "Top-level answer"},
+    )
+    await client.post(
+        f"/api/v1/questions/{question_id}/answers",
+        json={"message": "Nested reply", "parent_id": top.json()["id"]},
+    )
+
+    fast_thread = (await client.get(f"/api/v1/questions/{question_id}")).json()
+    fast_feed = (await client.get("/api/v1/questions")).json()
+
+    monkeypatch.setattr(serializers.settings, "FAST_JSON_RESPONSES", False)
+    slow_thread = (await client.get(f"/api/v1/questions/{question_id}")).json()
+    slow_feed = (await client.get("/api/v1/questions")).json()
+
+    assert fast_thread == slow_thread
+    assert fast_feed == slow_feed
+    assert fast_thread["answers_count"] == 2
+    assert fast_thread["answers"][0]["replies"][0]["message"] == "Nested reply"
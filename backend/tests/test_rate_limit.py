@@ -0,0 +1,119 @@
+"""Tests for rate limiting."""
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.rate_limit import (
+    InMemoryRateLimitBackend,
+    RateLimiter,
+    RateLimitExceeded,
+    parse_rate,
+)
+
+
+def test_parse_rate():
+    """Test budget parsing."""
+    assert parse_rate("10/minute").capacity == 10
+    assert parse_rate("10/minute").period == 60
+    assert parse_rate("5/hours").period == 3600
+    assert parse_rate("3/30").period == 30
+
+
+@pytest.mark.asyncio
+async def test_question_create_returns_429_with_retry_after(
+    client: AsyncClient, monkeypatch
+):
+    """Test that exhausting the per-IP budget yields a fast 429."""
+    from app.core import rate_limit
+
+    limiter = RateLimiter(
+        InMemoryRateLimitBackend(),
+        {"question_create": {"ip": "2/minute"}},
+    )
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    monkeypatch.setattr("app.api.deps.rate_limiter", limiter)
+
+    for _ in range(2):
+        response = await client.post("/api/v1/questions", json={"message": "Spam?"})
+        assert response.status_code == 201
+
+    response = await client.post("/api/v1/questions", json={"message": "Spam?"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    # Other routes keep their own budgets
+    response = await client.get("/api/v1/questions")
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_user_and_global_buckets_are_independent():
+    """Test that per-user budgets don't leak between users."""
+    limiter = RateLimiter(
+        InMemoryRateLimitBackend(),
+        {"suggest": {"user": "1/minute", "global": "4/minute"}},
+    )
+    await limiter.check("suggest", "1.1.1.1", 1)
+    await limiter.check("suggest", "1.1.1.1", 2)
+
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.check("suggest", "1.1.1.1", 1)
+    assert exc.value.scope == "user"
+
+    await limiter.check("suggest", "1.1.1.1", 3)
+    await limiter.check("suggest", "1.1.1.1", 4)
+    with pytest.raises(RateLimitExceeded) as exc:
+        await limiter.check("suggest", "1.1.1.1", 5)
+    assert exc.value.scope == "global"
+
+
+@pytest.mark.asyncio
+async def test_throttled_ip_cannot_exhaust_the_global_budget():
+    """Test that one IP's rejected requests leave the global budget to others."""
+    limiter = RateLimiter(
+        InMemoryRateLimitBackend(),
+        {"question_create": {"ip": "2/minute", "global": "10/minute"}},
+    )
+    for _ in range(2):
+        await limiter.check("question_create", "1.1.1.1", None)
+    for _ in range(50):
+        with pytest.raises(RateLimitExceeded) as exc:
+            await limiter.check("question_create", "1.1.1.1", None)
+        assert exc.value.scope == "ip"
+
+    await limiter.check("question_create", "2.2.2.2", None)
+
+
+@pytest.mark.asyncio
+async def test_spoofed_forwarded_for_does_not_pick_a_fresh_ip_bucket(
+    client: AsyncClient, monkeypatch
+):
+    """Test that only the hop appended by the trusted proxy names the client."""
+    from app.api import deps
+    from app.core import rate_limit
+
+    limiter = RateLimiter(
+        InMemoryRateLimitBackend(),
+        {"question_create": {"ip": "2/minute"}},
+    )
+    monkeypatch.setattr(rate_limit, "rate_limiter", limiter)
+    monkeypatch.setattr(deps, "rate_limiter", limiter)
+    monkeypatch.setattr(deps.settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+
+    statuses = []
+    for n in range(3):
+        response = await client.post(
+            "/api/v1/questions",
+            json={"message": "Spam?"},
+            # The proxy appends the real peer after whatever the caller sent
+            headers={"X-Forwarded-For": f"10.0.0.{n}, 203.0.113.7"},
+        )
+        statuses.append(response.status_code)
+    assert statuses == [201, 201, 429]
+
+    response = await client.post(
+        "/api/v1/questions",
+        json={"message": "Spam?"},
+        headers={"X-Forwarded-For": "203.0.113.8"},
+    )
+    assert response.status_code == 201
@@ -0,0 +1,266 @@
+"""Tests for the retrieval index behind answer suggestions."""
+
+import asyncio
+import sys
+import threading
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app.services import rag_service, retrieval_service
+from app.services.retrieval_service import (
+    HashedTfidfEmbedder,
+    MmapVectorIndex,
+    VectorIndex,
+    apply_index_update,
+    flush_index_writes,
+    rebuild_retrieval_index,
+    retrieval_index,
+    top_k_cosine,
+)
+from tests.conftest import TestAsyncSessionLocal
+
+
+def test_vector_index_ranks_similar_documents_first():
+    """Test that search ranks by weighted cosine similarity and honours removals."""
+    index = VectorIndex(HashedTfidfEmbedder(dim=1024), capacity=2)
+    index.upsert(1, "How do I reset my password? Use the forgot password link.")
+    index.upsert(2, "Where can I download the mobile app? It is in the app store.")
+    index.upsert(3, "Password reset emails are not arriving in my inbox")
+
+    hits = index.search("reset password", k=2)
+    assert [doc_id for doc_id, _ in hits] == [1, 3]
+    assert hits[0][1] >= hits[1][1] > 0
+
+    index.remove(1)
+    assert 1 not in index
+    assert [doc_id for doc_id, _ in index.search("reset password", k=2)] == [3]
+    assert index.search("reset password", k=2, exclude=3) == []
+
+
+DOCS = {
+    1: "How do I reset my password? Use the forgot password link.",
+    2: "Where can I download the mobile app? It is in the app store.",
+    3: "Password reset emails are not arriving in my inbox",
+    4: "Can I export my questions to CSV?",
+}
+
+
+def test_mmap_index_persists_and_is_shared_between_instances(tmp_path):
+    """Test that written rows are visible to other instances and survive reopening."""
+    embedder = HashedTfidfEmbedder(dim=1024)
+    writer = MmapVectorIndex(embedder, str(tmp_path), block_rows=2)
+    reader = MmapVectorIndex(embedder, str(tmp_path), block_rows=2)
+    for doc_id, text in DOCS.items():
+        writer.upsert(doc_id, text)
+
+    memory = VectorIndex(embedder)
+    for doc_id, text in DOCS.items():
+        memory.upsert(doc_id, text)
+
+    # Blocked scoring over the shared mapping matches the in-memory index
+    assert len(reader) == 4
+    assert reader.search("reset password", k=3) == pytest.approx(
+        memory.search("reset password", k=3)
+    )
+
+    writer.remove(1)
+    writer.upsert(3, "Password reset mails land in spam")
+    assert 1 not in reader
+    assert [doc_id for doc_id, _ in reader.search("password reset", k=3)] == [3]
+
+    reopened = MmapVectorIndex(embedder, str(tmp_path))
+    assert len(reopened) == 3
+    assert reopened.dead_ratio() == pytest.approx(2 / 5)
+
+
+def test_mmap_index_compaction_drops_tombstones(tmp_path):
+    """Test that compaction reclaims dead rows without changing search results."""
+    embedder = HashedTfidfEmbedder(dim=1024)
+    index = MmapVectorIndex(embedder, str(tmp_path))
+    other = MmapVectorIndex(embedder, str(tmp_path))
+    for doc_id, text in DOCS.items():
+        index.upsert(doc_id, text)
+    index.remove(2)
+    index.upsert(4, "Export questions as a CSV file from the dashboard")
+    before = index.search("export csv", k=2)
+
+    assert index.compact() == 2
+    assert index.dead_ratio() == 0
+    assert index.search("export csv", k=2) == pytest.approx(before)
+    # Another instance notices the new generation
+    assert other.search("export csv", k=2) == pytest.approx(before)
+    assert len(list(tmp_path.glob("vectors.*.f32"))) == 1
+
+
+def test_vector_index_search_is_consistent_while_rows_are_added():
+    """Test that searches on other threads never see a half-grown matrix."""
+    index = VectorIndex(HashedTfidfEmbedder(dim=256), capacity=1)
+    errors, done = [], threading.Event()
+
+    def search():
+        try:
+            while not done.is_set():
+                index.search("reset password", k=3)
+        except Exception as e:
+            errors.append(e)
+
+    # Switch threads often so searches interleave with writes
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    readers = [threading.Thread(target=search) for _ in range(3)]
+    try:
+        for reader in readers:
+            reader.start()
+        for doc_id in range(2000):
+            index.upsert(doc_id, f"Password reset question {doc_id}")
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+        sys.setswitchinterval(previous)
+    assert errors == []
+
+
+def test_top_k_cosine_norms_do_not_copy_the_block():
+    """Test that scoring a block allocates far less than the block itself."""
+    rng = np.random.default_rng(0)
+    vectors = rng.random((2048, 1024), dtype=np.float32)
+    live = np.ones(len(vectors), dtype=bool)
+    idf = rng.random(1024, dtype=np.float32) + 1
+    query = rng.random(1024, dtype=np.float32)
+
+    tracemalloc.start()
+    try:
+        top_k_cosine(vectors, live, idf, query, k=3, block_rows=len(vectors))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < vectors.nbytes / 8
+
+
+@pytest.mark.asyncio
+async def test_status_change_does_not_wait_for_the_index_file_lock(
+    client, admin_headers, tmp_path, monkeypatch
+):
+    """Test that a request returns while compaction holds the index file lock."""
+    index = MmapVectorIndex(HashedTfidfEmbedder(dim=256), str(tmp_path))
+    monkeypatch.setattr(retrieval_service, "retrieval_index", index)
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with index._locked():
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    held.wait(5)
+    try:
+        question_id = await asyncio.wait_for(
+            answer_question(client, admin_headers, DOCS[1], "Use the link."), 2
+        )
+        assert question_id not in index
+    finally:
+        release.set()
+        holder.join()
+    await flush_index_writes()
+    assert question_id in index
+
+
+@pytest.mark.asyncio
+async def test_failed_index_writes_are_logged(monkeypatch, caplog):
+    """Test that a queued write that raises is reported rather than lost."""
+
+    def fail(updates):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(retrieval_service, "_apply_index_updates", fail)
+    apply_index_update(1, DOCS[1])
+    await flush_index_writes()
+    assert "Retrieval index update failed: disk full" in caplog.text
+
+
+async def answer_question(client, admin_headers, message: str, answer: str) -> int:
+    response = await client.post("/api/v1/questions", json={"message": message})
+    question_id = response.json()["id"]
+    await client.post(
+        f"/api/v1/questions/{question_id}/answers",
+        json={"message": answer},
+        headers=admin_headers,
+    )
+    await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ANSWERED"},
+        headers=admin_headers,
+    )
+    return question_id
+
+
+@pytest.mark.asyncio
+async def test_answered_questions_are_indexed_incrementally(client, admin_headers):
+    """Test that marking a question answered adds it and reopening it removes it."""
+    question_id = await answer_question(
+        client,
+        admin_headers,
+        "How do I reset my password?",
+        "Use the forgot password link.",
+    )
+    await flush_index_writes()
+    assert question_id in retrieval_index
+
+    await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ESCALATED"},
+        headers=admin_headers,
+    )
+    await flush_index_writes()
+    assert question_id not in retrieval_index
+
+    # A restart rebuilds the same index from the database
+    await client.patch(
+        f"/api/v1/questions/{question_id}/status",
+        json={"status": "ANSWERED"},
+        headers=admin_headers,
+    )
+    await flush_index_writes()
+    retrieval_index.clear()
+    assert await rebuild_retrieval_index(TestAsyncSessionLocal) == 1
+    assert question_id in retrieval_index
+
+
+@pytest.mark.asyncio
+async def test_suggest_uses_similar_resolved_questions(
+    client, admin_headers, monkeypatch
+):
+    """Test that the suggest route passes retrieved Q&A pairs to the LLM."""
+    resolved = await answer_question(
+        client,
+        admin_headers,
+        "How do I reset my password?",
+        "Use the forgot password link.",
+    )
+    await answer_question(
+        client, admin_headers, "Where is the mobile app?", "Search the app store."
+    )
+    await flush_index_writes()
+
+    captured = {}
+
+    async def fake_suggest(question_message, previous_answers, **kwargs):
+        captured["examples"] = kwargs["examples"]
+        return "Try the forgot password link."
+
+    monkeypatch.setattr(rag_service, "get_suggested_answer", fake_suggest)
+
+    response = await client.post(
+        "/api/v1/questions", json={"message": "I forgot my password"}
+    )
+    response = await client.post(
+        f"/api/v1/questions/{response.json()['id']}/suggest", headers=admin_headers
+    )
+    assert response.status_code == 200
+    examples = captured["examples"]
+    assert [ex.question_id for ex in examples] == [resolved]
+    assert examples[0].answer == "Use the forgot password link."
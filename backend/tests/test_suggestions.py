@@ -0,0 +1,410 @@
+"""Tests for the answer suggestion endpoint."""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.v1 import questions as questions_api
+from app.core.concurrency import CapacityExceeded, ConcurrencyLimiter
+from app.services import llm_provider, rag_service, suggestion_service
+from app.services.llm_provider import GroqProvider, StubProvider
+from app.services.question_service import get_question_by_id
+from app.services.rag_service import ContextItem, estimate_tokens, pack_context
+from app.services.suggestion_service import (
+    SuggestionPrecomputer,
+    claim_precompute_batch,
+    release_precompute_claim,
+)
+from tests.conftest import TestAsyncSessionLocal
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Replace the LLM call with a counter."""
+    calls = []
+
+    async def fake_suggest(question_message, previous_answers, **kwargs):
+        calls.append(question_message)
+        suggestion = f"Suggestion #{len(calls)}"
+        if kwargs.get("on_usage"):
+            kwargs["on_usage"](estimate_tokens(question_message + suggestion))
+        return suggestion
+
+    monkeypatch.setattr(rag_service, "get_suggested_answer", fake_suggest)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_suggestion_cached_until_answers_change(
+    client, admin_headers, fake_llm, monkeypatch
+):
+    """Test that repeat suggests hit the cache and broadcast; new answers miss it."""
+    broadcasts = []
+
+    async def fake_broadcast(event, data):
+        if event == "suggestion":
+            broadcasts.append(data["suggested_answer"])
+
+    monkeypatch.setattr(questions_api.manager, "broadcast", fake_broadcast)
+
+    response = await client.post(
+        "/api/v1/questions", json={"message": "How do I log in?"}
+    )
+    question_id = response.json()["id"]
+    url = f"/api/v1/questions/{question_id}/suggest"
+
+    first = await client.post(url, headers=admin_headers)
+    second = await client.post(url, headers=admin_headers)
+    assert first.json() == second.json()
+    assert len(fake_llm) == 1
+    assert broadcasts == ["Suggestion #1", "Suggestion #1"]
+
+    await client.post(
+        f"/api/v1/questions/{question_id}/answers",
+        json={"message": "Use your email address."},
+        headers=admin_headers,
+    )
+    third = await client.post(url, headers=admin_headers)
+    assert third.json()["suggested_answer"] == "Suggestion #2"
+    assert len(fake_llm) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_suggestions_share_one_llm_call(monkeypatch):
+    """Test that identical in-flight suggestions coalesce into a single LLM call."""
+    release = asyncio.Event()
+    calls = []
+
+    async def slow_suggest(question_message, previous_answers, **kwargs):
+        calls.append(question_message)
+        await release.wait()
+        return "shared"
+
+    monkeypatch.setattr(rag_service, "get_suggested_answer", slow_suggest)
+
+    waiters = [
+        asyncio.create_task(rag_service.get_or_generate_suggestion("fp", "Q?", []))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    waiters[0].cancel()  # one admin gives up; the shared call keeps going
+    release.set()
+    results = await asyncio.gather(*waiters[1:])
+
+    assert results == ["shared"] * 4
+    assert calls == ["Q?"]
+    assert len(rag_service.suggestion_flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_llm_limiter_sheds_load_when_queue_full():
+    """Test that calls beyond the limit queue, then fail fast once the queue is full."""
+    limiter = ConcurrencyLimiter(limit=1, max_waiting=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter:
+            await release.wait()
+
+    running = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    assert (limiter.active, limiter.waiting) == (1, 1)
+
+    with pytest.raises(CapacityExceeded):
+        async with limiter:
+            pass
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert (limiter.active, limiter.waiting) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_stub_provider_serves_suggest_route_offline(
+    client, admin_headers, monkeypatch
+):
+    """Test that the stub provider answers deterministically through the full route."""
+    monkeypatch.setattr(llm_provider, "_provider", StubProvider())
+
+    response = await client.post(
+        "/api/v1/questions", json={"message": "How do I log in?"}
+    )
+    response = await client.post(
+        f"/api/v1/questions/{response.json()['id']}/suggest", headers=admin_headers
+    )
+    assert response.status_code == 200
+    suggestion = response.json()["suggested_answer"]
+    assert suggestion.startswith("[stub ")
+    assert suggestion == await StubProvider().generate("How do I log in?", "")
+
+
+@pytest.mark.asyncio
+async def test_groq_provider_builds_client_once(monkeypatch):
+    """Test that the LLM client and prompt are built once and reused."""
+    builds = []
+
+    class FakeChain:
+        async def ainvoke(self, variables):
+            return SimpleNamespace(content=f" answer to {variables['question']} ")
+
+    def fake_build(self):
+        builds.append(self)
+        return FakeChain()
+
+    monkeypatch.setattr(GroqProvider, "_build_chain", fake_build)
+    provider = GroqProvider(api_key="key", model="m", temperature=0, max_tokens=10)
+
+    await provider.warmup()
+    assert await provider.generate("Q1", "") == "answer to Q1"
+    assert await provider.generate("Q2", "") == "answer to Q2"
+    assert len(builds) == 1
+
+
+@pytest.mark.asyncio
+async def test_groq_provider_close_releases_its_http_client():
+    """Test that shutdown closes the connection pool behind the Groq client."""
+    provider = GroqProvider(api_key="key", model="m", temperature=0, max_tokens=10)
+    await provider.warmup()
+    http_client = provider._http_client
+    assert not http_client.is_closed
+
+    await provider.close()
+    assert http_client.is_closed
+    # A provider used after close builds a fresh client
+    await provider.warmup()
+    assert not provider._http_client.is_closed
+    await provider.close()
+
+
+class RecordingSocket:
+    """Stands in for a WebSocket and records what is sent to it."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, message: str):
+        self.messages.append(json.loads(message))
+
+
+@pytest.mark.asyncio
+async def test_streamed_suggestion_reaches_question_subscribers(
+    client, admin_headers, monkeypatch
+):
+    """Test that stream=true sends ordered chunks before the full suggestion."""
+    monkeypatch.setattr(llm_provider, "_provider", StubProvider())
+    response = await client.post(
+        "/api/v1/questions", json={"message": "How do I log in?"}
+    )
+    question_id = response.json()["id"]
+
+    subscriber, bystander = RecordingSocket(), RecordingSocket()
+    manager = questions_api.manager
+    monkeypatch.setattr(manager, "active_connections", [subscriber, bystander])
+    monkeypatch.setattr(manager, "subscriptions", {})
+    manager.handle_message(
+        subscriber, json.dumps({"action": "subscribe", "question_id": question_id})
+    )
+
+    response = await client.post(
+        f"/api/v1/questions/{question_id}/suggest?stream=true", headers=admin_headers
+    )
+    suggestion = response.json()["suggested_answer"]
+
+    chunks = [m["data"] for m in subscriber.messages if m["type"] == "suggestion_chunk"]
+    assert len(chunks) > 1
+    assert [c["index"] for c in chunks] == list(range(len(chunks)))
+    assert "".join(c["delta"] for c in chunks) == suggestion
+    assert subscriber.messages[-1] == {
+        "type": "suggestion",
+        "data": {"question_id": question_id, "suggested_answer": suggestion},
+    }
+    # Clients that did not subscribe only get the completed suggestion
+    assert [m["type"] for m in bystander.messages] == ["suggestion"]
+
+    manager.disconnect(subscriber)
+    assert manager.subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_reused_suggestions_as_one_chunk(
+    client, admin_headers, monkeypatch
+):
+    """Test that cached and stored suggestions still reach subscribers as a chunk."""
+    monkeypatch.setattr(llm_provider, "_provider", StubProvider())
+    response = await client.post(
+        "/api/v1/questions", json={"message": "How do I log in?"}
+    )
+    question_id = response.json()["id"]
+    url = f"/api/v1/questions/{question_id}/suggest?stream=true"
+    await client.post(url, headers=admin_headers)
+
+    subscriber = RecordingSocket()
+    manager = questions_api.manager
+    monkeypatch.setattr(manager, "active_connections", [subscriber])
+    monkeypatch.setattr(manager, "subscriptions", {})
+    manager.handle_message(
+        subscriber, json.dumps({"action": "subscribe", "question_id": question_id})
+    )
+
+    async def no_stored_suggestion(db, question_id):
+        return None
+
+    # Served from storage, then from the cache once storage is bypassed
+    await client.post(url, headers=admin_headers)
+    monkeypatch.setattr(questions_api, "get_stored_suggestion", no_stored_suggestion)
+    response = await client.post(url, headers=admin_headers)
+    suggestion = response.json()["suggested_answer"]
+
+    chunks = [m["data"] for m in subscriber.messages if m["type"] == "suggestion_chunk"]
+    assert chunks == [
+        {"question_id": question_id, "index": 0, "delta": suggestion},
+        {"question_id": question_id, "index": 0, "delta": suggestion},
+    ]
+    manager.disconnect(subscriber)
+
+
+@pytest.mark.asyncio
+async def test_precomputed_suggestions_served_from_storage(
+    client, admin_headers, fake_llm
+):
+    """Test that precompute fills escalated questions first and suggest reuses them."""
+    ids = []
+    for message, escalate in (
+        ("Pending one?", False),
+        ("Escalated one?", True),
+        ("Pending two?", False),
+    ):
+        response = await client.post(
+            "/api/v1/questions", json={"message": message, "is_escalated": escalate}
+        )
+        ids.append(response.json()["id"])
+
+    precomputer = SuggestionPrecomputer(
+        TestAsyncSessionLocal, concurrency=1, batch_size=2
+    )
+    assert await precomputer.process_batch() == 2
+    assert fake_llm == ["Escalated one?", "Pending two?"]
+    assert await precomputer.process_batch() == 1
+    assert await precomputer.process_batch() == 0
+    assert len(fake_llm) == 3
+
+    rag_service.suggestion_cache.clear()
+    response = await client.post(
+        f"/api/v1/questions/{ids[1]}/suggest", headers=admin_headers
+    )
+    assert response.json()["suggested_answer"] == "Suggestion #1"
+    assert len(fake_llm) == 3
+
+
+@pytest.mark.asyncio
+async def test_precompute_stops_when_token_budget_spent(client, fake_llm):
+    """Test that pre-computation pauses once the hourly token budget is used."""
+    for i in range(3):
+        await client.post("/api/v1/questions", json={"message": f"Question {i}?"})
+
+    precomputer = SuggestionPrecomputer(
+        TestAsyncSessionLocal, concurrency=1, tokens_per_hour=5
+    )
+    assert await precomputer.process_batch() == 1
+    assert not precomputer.budget.available()
+    assert await precomputer.process_batch() == 0
+    assert len(fake_llm) == 1
+
+
+@pytest.mark.asyncio
+async def test_precompute_workers_claim_distinct_questions(client):
+    """Test that concurrent workers never claim the same question."""
+    for i in range(3):
+        await client.post("/api/v1/questions", json={"message": f"Question {i}?"})
+
+    async with TestAsyncSessionLocal() as db:
+        first = await claim_precompute_batch(db, limit=2, lease_seconds=60)
+    async with TestAsyncSessionLocal() as db:
+        second = await claim_precompute_batch(db, limit=2, lease_seconds=60)
+    assert len(first) == 2 and len(second) == 1
+    assert not set(first) & set(second)
+
+    # A failed question stays claimed; a released one is claimable again
+    async with TestAsyncSessionLocal() as db:
+        await release_precompute_claim(db, first[0], retry_at=time.time() + 60)
+        await release_precompute_claim(db, first[1])
+        assert await claim_precompute_batch(db, limit=5, lease_seconds=60) == [first[1]]
+
+
+@pytest.mark.asyncio
+async def test_precompute_refreshes_stale_suggestions(
+    client, admin_headers, fake_llm, monkeypatch
+):
+    """Test that new answers and votes send a stored suggestion back to be redone."""
+    monkeypatch.setattr(
+        suggestion_service.settings, "SUGGESTION_PRECOMPUTE_ENABLED", True
+    )
+    response = await client.post("/api/v1/questions", json={"message": "Stale?"})
+    question_id = response.json()["id"]
+    precomputer = SuggestionPrecomputer(TestAsyncSessionLocal, concurrency=1)
+    assert await precomputer.process_batch() == 1
+    assert await precomputer.process_batch() == 0
+
+    response = await client.post(
+        f"/api/v1/questions/{question_id}/answers", json={"message": "Try this."}
+    )
+    assert await precomputer.process_batch() == 1
+    await client.post(
+        f"/api/v1/questions/{question_id}/answers/{response.json()['id']}/rate",
+        json={"vote": "up"},
+        headers=admin_headers,
+    )
+    assert await precomputer.process_batch() == 1
+    assert await precomputer.process_batch() == 0
+    assert fake_llm == ["Stale?"] * 3
+
+
+@pytest.mark.asyncio
+async def test_precompute_budget_only_charged_for_provider_calls(client, fake_llm):
+    """Test that suggestions served from the cache don't spend the token budget."""
+    response = await client.post("/api/v1/questions", json={"message": "Cached?"})
+    question_id = response.json()["id"]
+    async with TestAsyncSessionLocal() as db:
+        question = await get_question_by_id(db, question_id)
+        fingerprint = rag_service.suggestion_fingerprint(question.message, [])
+    rag_service.suggestion_cache.set(fingerprint, "From an earlier request")
+
+    precomputer = SuggestionPrecomputer(TestAsyncSessionLocal, concurrency=1)
+    assert await precomputer.process_batch() == 1
+    assert precomputer.budget.used == 0
+    assert fake_llm == []
+
+
+def test_pack_context_ranks_dedupes_and_fits_budget():
+    """Test that packing prefers relevant, upvoted, distinct answers within budget."""
+    answers = [
+        ContextItem("Pizza is available in the cafeteria on Fridays.", score=0),
+        ContextItem(
+            "Reset your password from the login page using the forgot link.", score=5
+        ),
+        ContextItem(
+            "Reset your password from the login page using the forgot link!", score=1
+        ),
+        ContextItem("Password resets need the email on your account.", score=-2),
+        ContextItem("word " * 1000, score=9),  # huge off-topic answer
+    ]
+    packed = pack_context(
+        "How do I reset my password?", answers, budget_tokens=60, item_tokens=40
+    )
+
+    texts = [item.text for item in packed]
+    assert texts[0].startswith("Reset your password from the login page")
+    assert sum("forgot link" in text for text in texts) == 1  # near-duplicate dropped
+    assert sum(estimate_tokens(text) + 3 for text in texts) <= 60
+    assert all(estimate_tokens(text) <= 41 for text in texts)
+
+
+def test_estimate_tokens_tracks_word_and_punctuation_pieces():
+    """Test that the token estimator counts words, long-word pieces and punctuation."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("How do I reset it?") == 6
+    assert estimate_tokens("internationalization") == 4
@@ -0,0 +1,76 @@
+"""Tests for search-as-you-type question suggestions."""
+
+import pytest
+from httpx import AsyncClient
+
+from app.models.question import Question
+from app.services.typeahead_service import (
+    TrigramIndex,
+    rebuild_typeahead_index,
+    typeahead_index,
+)
+from tests.conftest import TestAsyncSessionLocal
+
+
+def test_trigram_index_matches_partly_typed_words():
+    """Test that every typed word must match, the last one as a prefix."""
+    index = TrigramIndex()
+    index.add(1, "How do I reset my password?")
+    index.add(2, "Where is the password for the guest wifi?")
+    index.add(3, "Can I reset the room booking?")
+
+    assert index.search("reset pass") == [1]
+    assert sorted(index.search("passw")) == [1, 2]
+    assert sorted(index.search("reset p")) == [1, 3]
+    assert index.search("qwerty") == []
+
+    index.remove(1)
+    assert index.search("reset pass") == []
+
+
+def test_trigram_index_keeps_out_of_order_ids_searchable():
+    """Test that ids committed out of order are still found."""
+    index = TrigramIndex()
+    index.add(5, "Is lunch included?")
+    index.add(3, "Is lunch vegetarian?")
+    index.add(7, "Lunch break times")
+
+    assert sorted(index.search("lunch")) == [3, 5, 7]
+    assert index.search("lunch veg") == [3]
+
+
+@pytest.mark.asyncio
+async def test_typeahead_endpoint(client: AsyncClient):
+    """Test that typeahead returns matching questions and ignores very short input."""
+    await client.post(
+        "/api/v1/questions", json={"message": "How do I reset my password?"}
+    )
+    await client.post(
+        "/api/v1/questions", json={"message": "When does the keynote start?"}
+    )
+
+    response = await client.get(
+        "/api/v1/questions/typeahead", params={"q": "reset my pa"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [m["message"] for m in data] == ["How do I reset my password?"]
+    assert data[0]["status"] == "PENDING"
+
+    short = await client.get("/api/v1/questions/typeahead", params={"q": "r"})
+    assert short.json() == []
+
+
+@pytest.mark.asyncio
+async def test_rebuild_typeahead_index_from_database(db_session):
+    """Test that the in-memory index can be rebuilt from stored questions."""
+    db_session.add_all(
+        [
+            Question(message="Can I export my questions to CSV?"),
+            Question(message="Where can I download the mobile app?"),
+        ]
+    )
+    await db_session.commit()
+
+    assert await rebuild_typeahead_index(TestAsyncSessionLocal) == 2
+    assert len(typeahead_index.search("export q")) == 1